@@ -0,0 +1,63 @@
+"""Track the startup cost of importing Flowcept.
+
+Runs ``python -X importtime -c "import flowcept; flowcept.flowcept_task"`` in fresh
+interpreters and reports the wall time, the cumulative import time of ``flowcept``, and the
+modules with the highest cumulative import time. The first run also populates the settings
+cache, so it is reported separately. Usage::
+
+    python benchmarks/import_time_bench.py --runs 10 --top 15
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from time import perf_counter
+
+STATEMENT = "import flowcept; flowcept.flowcept_task"
+
+
+def run_once():
+    """Import Flowcept in a fresh interpreter and get the wall time and the per-module times."""
+    t0 = perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STATEMENT],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = perf_counter() - t0
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return elapsed, modules
+
+
+def main():
+    """Run it."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10, help="Warm runs to aggregate.")
+    parser.add_argument("--top", type=int, default=15, help="Modules to list.")
+    args = parser.parse_args()
+
+    cold_elapsed, cold_modules = run_once()
+    runs = [run_once() for _ in range(args.runs)]
+    walls = [elapsed for elapsed, _ in runs]
+    flowcept_times = [modules["flowcept"][1] for _, modules in runs]
+    print(f"first run wall: {cold_elapsed * 1000:.1f} ms, flowcept: {cold_modules['flowcept'][1] / 1000:.1f} ms")
+    print(f"wall (median of {args.runs}): {statistics.median(walls) * 1000:.1f} ms")
+    print(f"flowcept cumulative (median): {statistics.median(flowcept_times) / 1000:.1f} ms")
+
+    names = runs[0][1].keys()
+    medians = {name: statistics.median(m[name][1] for _, m in runs if name in m) for name in names}
+    print(f"\n{'cumulative ms':>14}{'self ms':>10}  module")
+    for name in sorted(medians, key=medians.get, reverse=True)[: args.top]:
+        self_ms = statistics.median(m[name][0] for _, m in runs if name in m) / 1000
+        print(f"{medians[name] / 1000:>14.1f}{self_ms:>10.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+"""End-to-end ingestion benchmark: producers, MQ, document inserter, and databases.
+
+Everything runs on the local machine, so anyone can reproduce the numbers:
+
+- broker: a redis-server started for the run (``--broker redis-server``), one that is
+  already running (``--broker redis://host:port``), or the stand-in of ``standin_redis.py``
+  (``--broker standin``, the default when redis-server is not installed);
+- databases: LMDB in a temporary directory, plus MongoDB if ``--mongo-uri`` is given (a
+  throwaway database is created and dropped).
+
+Producer processes run a synthetic workload (``flowcept_task`` calls, ``FlowceptLoop``
+iterations, or ``flowcept_torch`` forward passes) at a given rate, while one consumer process
+runs the ``DocumentInserter``. The benchmark reports the producer overhead (time per
+operation with and without instrumentation), the end-to-end latency (from the end of a task to
+its arrival at the consumer), and the consumer throughput. Results are written as JSON, tagged
+with the git commit, so that runs of different commits can be compared. Usage::
+
+    python benchmarks/ingestion_bench.py run --workload task --processes 4 --count 20000 --output a.json
+    python benchmarks/ingestion_bench.py compare a.json b.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter, sleep, time
+from uuid import uuid4
+
+import yaml
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_SETTINGS = REPO_DIR / "resources" / "sample_settings.yaml"
+WORKLOADS = ("task", "loop", "lightweight_loop", "columnar_loop", "torch")
+
+
+##################
+#   Workloads    #
+##################
+
+
+def build_workload(name, count, instrumented):
+    """Get the ``step(i)`` function running one operation of a workload, and its ``finish()``."""
+    if name == "task":
+
+        def work(x):
+            return x * 2
+
+        if instrumented:
+            from flowcept import flowcept_task
+
+            work = flowcept_task(work)
+        return work, lambda: None
+
+    elif name.endswith("loop"):
+        iterator = iter(range(count))
+        loop = None
+        if instrumented:
+            from flowcept.instrumentation import flowcept_loop
+
+            loop_class = {
+                "loop": flowcept_loop.FlowceptLoop,
+                "lightweight_loop": flowcept_loop.FlowceptLightweightLoop,
+                "columnar_loop": flowcept_loop.FlowceptColumnarLoop,
+            }[name]
+            loop = loop_class(range(count), loop_name="bench", item_name="i")
+            iterator = iter(loop)
+
+        def step(i):
+            next(iterator)
+            if loop is not None:
+                loop.end_iter({"loss": i * 0.5})
+
+        def finish():
+            for _ in iterator:  # Ends the loop.
+                pass
+
+        return step, finish
+
+    elif name == "torch":
+        try:
+            import torch
+            from torch import nn
+        except ImportError:
+            raise SystemExit("The torch workload needs PyTorch installed.")
+
+        class Net(nn.Module):
+            def __init__(self, **kwargs):
+                super().__init__()
+                self.fc1 = nn.Linear(32, 64)
+                self.fc2 = nn.Linear(64, 10)
+
+            def forward(self, x):
+                return self.fc2(torch.relu(self.fc1(x)))
+
+        if instrumented:
+            from flowcept import flowcept_torch
+
+            Net = flowcept_torch(Net)
+        model = Net()
+        x = torch.randn(8, 32)
+        return lambda i: model(x), lambda: None
+    raise ValueError(f"Unknown workload {name}. Use one of {WORKLOADS}.")
+
+
+def run_ops(step, finish, count, rate):
+    """Run `count` operations, paced at `rate` per second (0 for as fast as possible)."""
+    from flowcept.commons.self_metrics import Histogram
+
+    op_time = Histogram("op_time")
+    interval = 1 / rate if rate else 0
+    t_start = perf_counter()
+    for i in range(count):
+        if interval:
+            delay = t_start + i * interval - perf_counter()
+            if delay > 0:
+                sleep(delay)
+        t0 = perf_counter()
+        step(i)
+        op_time.record(perf_counter() - t0)
+    finish()
+    return {"wall_s": perf_counter() - t_start, "op_time_us": op_time.snapshot()}
+
+
+def count_task_messages(messages):
+    """Count task messages the way the document inserter does, i.e., expanding task blocks."""
+    n = 0
+    for msg in messages:
+        msg_type = msg.get("type", None)
+        if msg_type == "task_block":
+            n += len(msg["columns"]["i"])
+        elif msg_type == "task" or (msg_type is None and ("task_id" in msg or "activity_id" in msg)):
+            n += 1
+    return n
+
+
+##################
+#   Processes    #
+##################
+
+
+def run_producer(index, args, results):
+    """Run the workload without and then with instrumentation, and report both."""
+    from flowcept import Flowcept
+    from flowcept.commons.self_metrics import METRICS
+    from flowcept.flowceptor.adapters.instrumentation_interceptor import InstrumentationInterceptor
+
+    baseline = run_ops(*build_workload(args.workload, args.count, False), args.count, args.rate)
+    published = [0]
+    flowcept = Flowcept(workflow_name=f"ingestion_bench_{index}", start_persistence=False).start()
+    mq_dao = InstrumentationInterceptor.get_instance()._mq_dao
+    bulk_publish = mq_dao._bulk_publish
+
+    def counting_bulk_publish(buffer, *a, **kw):
+        # Runs in the flushing thread, off the producer's critical path.
+        published[0] += count_task_messages(buffer)
+        return bulk_publish(buffer, *a, **kw)
+
+    mq_dao._bulk_publish = counting_bulk_publish
+    t0 = time()
+    instrumented = run_ops(*build_workload(args.workload, args.count, True), args.count, args.rate)
+    t1 = perf_counter()
+    flowcept.stop()
+    results.put(
+        {
+            "role": "producer",
+            "index": index,
+            "started_at": t0,
+            "baseline": baseline,
+            "instrumented": instrumented,
+            "overhead_per_op_us": instrumented["op_time_us"]["mean"] - baseline["op_time_us"]["mean"],
+            "stop_flush_s": perf_counter() - t1,
+            "tasks_published": published[0],
+            "self_metrics": METRICS.snapshot(),
+        }
+    )
+
+
+def count_stored_tasks(lmdb_path, mongo_uri, mongo_db):
+    """Count the task documents stored in LMDB and, if enabled, MongoDB."""
+    import lmdb
+
+    env = lmdb.open(lmdb_path, readonly=True, lock=False, max_dbs=16)
+    with env.begin() as txn:
+        stored = {"lmdb": txn.stat(env.open_db(b"tasks", txn=txn, create=False))["entries"]}
+    env.close()
+    if mongo_uri:
+        from pymongo import MongoClient
+
+        client = MongoClient(mongo_uri)
+        stored["mongodb"] = client[mongo_db]["tasks"].count_documents({})
+        client.drop_database(mongo_db)
+        client.close()
+    return stored
+
+
+def run_consumer(args, settings, ready, expected_queue, results):
+    """Run the document inserter until it receives all the tasks the producers published."""
+    from flowcept.commons.self_metrics import METRICS, Histogram
+    from flowcept.flowceptor.consumers.document_inserter import DocumentInserter
+
+    inserter = DocumentInserter(check_safe_stops=False)
+    latency = Histogram("latency")
+    arrivals = {"n": 0, "first": None, "last": None}
+    handle_task_message = inserter._handle_task_message
+
+    def timed_handle_task_message(message):
+        now = time()
+        arrivals["n"] += 1
+        arrivals["first"] = arrivals["first"] or now
+        arrivals["last"] = now
+        produced_at = message.get("ended_at", None) or message.get("started_at", None)
+        if isinstance(produced_at, (int, float)):
+            latency.record(max(0.0, now - produced_at))
+        handle_task_message(message)
+
+    inserter._handle_task_message = timed_handle_task_message
+    inserter.start(threaded=True)
+    ready.set()
+
+    expected = expected_queue.get()
+    deadline = time() + args.timeout
+    while arrivals["n"] < expected and time() < deadline:
+        sleep(0.01)
+    t0 = perf_counter()
+    inserter.stop()
+    drain_s = perf_counter() - t0
+    elapsed = (arrivals["last"] - arrivals["first"]) if arrivals["n"] > 1 else None
+    databases = settings["databases"]
+    results.put(
+        {
+            "role": "consumer",
+            "tasks_expected": expected,
+            "tasks_received": arrivals["n"],
+            "first_arrival_at": arrivals["first"],
+            "last_arrival_at": arrivals["last"],
+            "throughput_tasks_per_s": arrivals["n"] / elapsed if elapsed else None,
+            "latency_us": latency.snapshot(),
+            "stop_drain_s": drain_s,
+            "tasks_stored": count_stored_tasks(
+                databases["lmdb"]["path"], databases["mongodb"].get("uri", None), databases["mongodb"]["db"]
+            ),
+            "self_metrics": METRICS.snapshot(),
+        }
+    )
+
+
+##################
+#   Setup        #
+##################
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(host, port, timeout=10):
+    deadline = time() + timeout
+    while time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            sleep(0.05)
+    raise RuntimeError(f"Nothing is listening on {host}:{port}.")
+
+
+def start_broker(spec):
+    """Start or locate the broker. Get its host, port, and a function stopping it."""
+    if spec is None:
+        spec = "redis-server" if shutil.which("redis-server") else "standin"
+    if spec.startswith("redis://"):
+        host, _, port = spec[len("redis://") :].partition(":")
+        return spec, host, int(port or 6379), lambda: None
+    elif spec == "redis-server":
+        port = _free_port()
+        cmd = ["redis-server", "--port", str(port), "--save", "", "--appendonly", "no"]
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+        _wait_for_port("127.0.0.1", port)
+        return spec, "127.0.0.1", port, proc.terminate
+    elif spec == "standin":
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        from standin_redis import StandinRedis
+
+        server = StandinRedis().start()
+        return spec, server.host, server.port, server.stop
+    raise ValueError(f"Invalid broker: {spec}")
+
+
+def _set_path(settings, dotted_key, value):
+    keys = dotted_key.split(".")
+    for key in keys[:-1]:
+        settings = settings.setdefault(key, {})
+    settings[keys[-1]] = value
+
+
+def build_settings(args, host, port, work_dir):
+    """Get the sample settings, pointed at the local broker and databases."""
+    with open(SAMPLE_SETTINGS) as f:
+        settings = yaml.safe_load(f)
+    settings["log"] = {"log_path": os.path.join(work_dir, "flowcept.log"), "log_file_level": "disable"}
+    settings["log"]["log_stream_level"] = "disable"
+    settings["project"]["db_flush_mode"] = "online"
+    settings["project"]["self_metrics"] = {"enabled": args.self_metrics, "export_interval_secs": 3600, "to_mq": False}
+    if args.telemetry == "off":
+        settings["telemetry_capture"] = None
+    else:
+        settings["telemetry_capture"] = {"profile": args.telemetry, "gpu": None, "machine_info": True}
+    settings["mq"].update({"type": "redis", "host": host, "port": port})
+    settings["kv_db"] = {"host": host, "port": port}
+    settings["databases"] = {
+        "lmdb": {"enabled": True, "path": os.path.join(work_dir, "lmdb")},
+        "mongodb": {"enabled": bool(args.mongo_uri), "db": f"ingestion_bench_{uuid4().hex[:8]}"},
+    }
+    if args.mongo_uri:
+        settings["databases"]["mongodb"]["uri"] = args.mongo_uri
+    for override in args.set:
+        key, _, value = override.partition("=")
+        _set_path(settings, key, yaml.safe_load(value))
+    return settings
+
+
+def _git_commit():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "-uno"], cwd=REPO_DIR, text=True))
+        return commit, dirty
+    except Exception:
+        return None, None
+
+
+def summarize(producers, consumer):
+    """Get the headline numbers of a run, the ones compared across commits."""
+    n = len(producers)
+    first_start = min(p["started_at"] for p in producers)
+    latency = consumer["latency_us"]
+    return {
+        "tasks_published": sum(p["tasks_published"] for p in producers),
+        "tasks_received": consumer["tasks_received"],
+        "tasks_stored_lmdb": consumer["tasks_stored"]["lmdb"],
+        "baseline_op_mean_us": sum(p["baseline"]["op_time_us"]["mean"] for p in producers) / n,
+        "instrumented_op_mean_us": sum(p["instrumented"]["op_time_us"]["mean"] for p in producers) / n,
+        "instrumented_op_p99_us": max(p["instrumented"]["op_time_us"]["p99"] for p in producers),
+        "overhead_per_op_us": sum(p["overhead_per_op_us"] for p in producers) / n,
+        "producer_stop_flush_s": max(p["stop_flush_s"] for p in producers),
+        "latency_p50_ms": latency["p50"] / 1000 if latency["count"] else None,
+        "latency_p99_ms": latency["p99"] / 1000 if latency["count"] else None,
+        "consumer_throughput_tasks_per_s": consumer["throughput_tasks_per_s"],
+        "end_to_end_s": (consumer["last_arrival_at"] or first_start) - first_start,
+    }
+
+
+def run(args):
+    """Run the benchmark and write its results."""
+    broker, host, port, stop_broker = start_broker(args.broker)
+    work_dir = tempfile.mkdtemp(prefix="flowcept_ingestion_bench_")
+    try:
+        settings = build_settings(args, host, port, work_dir)
+        settings_path = os.path.join(work_dir, "settings.yaml")
+        with open(settings_path, "w") as f:
+            yaml.safe_dump(settings, f)
+        # Inherited by the spawned processes, which import flowcept after this is set.
+        os.environ["FLOWCEPT_SETTINGS_PATH"] = settings_path
+        for var in ("FLOWCEPT_SETTINGS_SNAPSHOT", "MQ_TYPE", "MQ_HOST", "MQ_PORT", "KVDB_HOST", "KVDB_PORT"):
+            os.environ.pop(var, None)
+
+        ctx = multiprocessing.get_context("spawn")
+        results, expected_queue, ready = ctx.Queue(), ctx.Queue(), ctx.Event()
+        consumer = ctx.Process(target=run_consumer, args=(args, settings, ready, expected_queue, results))
+        consumer.start()
+        if not ready.wait(60):
+            raise RuntimeError("The consumer did not start.")
+        producers = [ctx.Process(target=run_producer, args=(i, args, results)) for i in range(args.processes)]
+        for p in producers:
+            p.start()
+        producer_results = [results.get() for _ in producers]
+        for p in producers:
+            p.join()
+        expected_queue.put(sum(r["tasks_published"] for r in producer_results))
+        consumer_result = results.get()
+        consumer.join()
+    finally:
+        stop_broker()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    commit, dirty = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "broker": broker,
+            "args": {k: v for k, v in vars(args).items() if k != "func"},
+        },
+        "summary": summarize(sorted(producer_results, key=lambda r: r["index"]), consumer_result),
+        "producers": sorted(producer_results, key=lambda r: r["index"]),
+        "consumer": consumer_result,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for key, value in report["summary"].items():
+        print(f"{key:>34}: {value:.3f}" if isinstance(value, float) else f"{key:>34}: {value}")
+    print(f"Results written to {args.output}")
+
+
+def _format(value):
+    if value is None:
+        return "-"
+    return f"{value:.4g}" if isinstance(value, float) else str(value)
+
+
+def compare(args):
+    """Print the summaries of two result files side by side."""
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    print(f"{'':>34}{str(before['meta']['commit'])[:10]:>14}{str(after['meta']['commit'])[:10]:>14}{'change':>10}")
+    for key, old in before["summary"].items():
+        new = after["summary"].get(key, None)
+        change = f"{(new - old) / old * 100:+.1f}%" if isinstance(old, (int, float)) and new and old else ""
+        print(f"{key:>34}{_format(old):>14}{_format(new):>14}{change:>10}")
+
+
+def main():
+    """Run it."""
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmark.")
+    run_parser.set_defaults(func=run)
+    run_parser.add_argument("--workload", choices=WORKLOADS, default="task")
+    run_parser.add_argument("--processes", type=int, default=2, help="Producer processes.")
+    run_parser.add_argument("--count", type=int, default=10_000, help="Operations per producer.")
+    run_parser.add_argument("--rate", type=float, default=0, help="Operations per second per producer; 0 is max.")
+    run_parser.add_argument("--broker", default=None, help="redis-server, standin, or redis://host:port.")
+    run_parser.add_argument("--mongo-uri", default=None, help="Also store into this MongoDB.")
+    run_parser.add_argument("--telemetry", choices=("off", "minimal", "standard", "full"), default="off")
+    run_parser.add_argument("--self-metrics", action="store_true", help="Also record Flowcept's own metrics.")
+    run_parser.add_argument("--set", action="append", default=[], help="Settings override, e.g., mq.buffer_size=500.")
+    run_parser.add_argument("--timeout", type=float, default=300, help="Max seconds to wait for the consumer.")
+    run_parser.add_argument("--output", default="ingestion_bench_results.json")
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files.")
+    compare_parser.set_defaults(func=compare)
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark the per-iteration overhead and memory of the FlowceptLoop classes.
+
+The instrumentation interceptor's buffer is replaced by a plain list, so no MQ or database
+is needed and only the capture cost is measured. Usage::
+
+    python benchmarks/loop_capture_bench.py --iterations 100000 --repeat 3
+"""
+
+import argparse
+import gc
+import os
+import tracemalloc
+from time import perf_counter
+
+# Nothing is published, but importing the loops builds the interceptor's MQ DAO.
+os.environ.setdefault("MQ_TYPE", "redis")
+
+from flowcept.flowceptor.adapters.instrumentation_interceptor import InstrumentationInterceptor  # noqa: E402
+from flowcept.instrumentation.flowcept_loop import (  # noqa: E402
+    FlowceptColumnarLoop,
+    FlowceptLightweightLoop,
+    FlowceptLoop,
+)
+
+LOOP_CLASSES = {
+    "default": FlowceptLoop,
+    "lightweight": FlowceptLightweightLoop,
+    "columnar": FlowceptColumnarLoop,
+}
+
+
+def run_plain(n):
+    """Run the uninstrumented loop, used as the baseline."""
+    for i in range(n):
+        _ = {"loss": i * 0.5}
+
+
+def run_loop(loop_class, n):
+    """Run an instrumented loop that reports one generated value per iteration."""
+    loop = loop_class(range(n), loop_name="bench", item_name="i")
+    for i in loop:
+        loop.end_iter({"loss": i * 0.5})
+
+
+def measure(func, *args):
+    """Get the wall time of one run and the peak of traced memory allocations of another.
+
+    Timing and memory are measured in separate runs because tracing allocations slows down
+    pure-Python code much more than NumPy code.
+    """
+    gc.collect()
+    t0 = perf_counter()
+    func(*args)
+    elapsed = perf_counter() - t0
+    gc.collect()
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    """Run the benchmark and print one row per loop class."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--classes", nargs="+", default=list(LOOP_CLASSES), choices=list(LOOP_CLASSES))
+    args = parser.parse_args()
+    n = args.iterations
+
+    buffer = []
+    InstrumentationInterceptor.get_instance().set_buffer(buffer)
+
+    baseline = min(measure(run_plain, n)[0] for _ in range(args.repeat))
+    buffer.clear()
+    print(f"iterations={n}; plain loop: {baseline / n * 1e6:.3f} us/iter")
+    print(f"{'class':<12} {'us/iter':>10} {'overhead us/iter':>17} {'peak MB':>9} {'messages':>9}")
+    for name in args.classes:
+        results = []
+        for _ in range(args.repeat):
+            buffer.clear()
+            results.append(measure(run_loop, LOOP_CLASSES[name], n))
+        elapsed = min(r[0] for r in results)
+        peak = max(r[1] for r in results)
+        print(
+            f"{name:<12} {elapsed / n * 1e6:>10.3f} {(elapsed - baseline) / n * 1e6:>17.3f} "
+            f"{peak / 2**20:>9.2f} {len(buffer) // 2:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
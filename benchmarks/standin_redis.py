@@ -0,0 +1,230 @@
+"""In-process stand-in for redis-server, with just what Flowcept uses.
+
+It speaks the Redis protocol (RESP2, or RESP3 after HELLO 3) over TCP, so interceptors and
+consumers in other processes connect to it with the regular redis client. It supports
+pub/sub (PUBLISH, PSUBSCRIBE, SUBSCRIBE), transactions (MULTI, EXEC), strings (GET, SET, DEL,
+KEYS), sets (SADD, SREM, SISMEMBER, SCARD), and the connection handshake. It is meant for
+benchmarks on machines without redis-server; it is slower than the real server, so compare
+its results only with other stand-in runs.
+Usage::
+
+    python benchmarks/standin_redis.py --port 6379
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import threading
+from typing import Dict, List, Set
+
+
+def _bulk(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _array(items: List[bytes], kind: bytes = b"*") -> bytes:
+    return kind + b"%d\r\n" % len(items) + b"".join(items)
+
+
+def _int(value: int) -> bytes:
+    return b":%d\r\n" % value
+
+
+OK = b"+OK\r\n"
+
+
+class StandinRedis:
+    """Redis protocol server running an asyncio loop in a background thread.
+
+    Parameters
+    ----------
+    host : str, optional
+        Defaults to 127.0.0.1.
+    port : int, optional
+        Use 0 (default) to pick a free port, which is then available as ``port``.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self._strings: Dict[bytes, bytes] = {}
+        self._sets: Dict[bytes, Set[bytes]] = {}
+        self._patterns: Dict[bytes, Set[asyncio.StreamWriter]] = {}
+        self._channels: Dict[bytes, Set[asyncio.StreamWriter]] = {}
+        self._push_kinds: Dict[asyncio.StreamWriter, bytes] = {}  # RESP3 clients get pub/sub as push data.
+        self._transactions: Dict[asyncio.StreamWriter, List[List[bytes]]] = {}  # Commands queued after MULTI.
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._loop = asyncio.new_event_loop()
+        self._server = None
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "StandinRedis":
+        """Start serving."""
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def stop(self):
+        """Stop serving and close all connections."""
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    async def _shutdown(self):
+        self._server.close()
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for writer in list(self._writers):
+            writer.transport.abort()  # The handlers see EOF and return.
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._serve, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> List[bytes]:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()  # Inline command, e.g., from telnet.
+        args = []
+        for _ in range(int(line[1:])):
+            size = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(size + 2))[:-2])
+        return args
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writers.add(writer)
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                if args:
+                    writer.write(self._execute(args, writer))
+                if not reader._buffer:
+                    # Pipelined commands are answered together.
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for subscribers in list(self._patterns.values()) + list(self._channels.values()):
+                subscribers.discard(writer)
+            self._push_kinds.pop(writer, None)
+            self._transactions.pop(writer, None)
+            self._writers.discard(writer)
+            writer.close()
+
+    def _push(self, writer, items: List[bytes]) -> bytes:
+        return _array(items, self._push_kinds.get(writer, b"*"))
+
+    def _subscribe(self, kind: bytes, targets: Dict, names: List[bytes], writer) -> bytes:
+        replies = []
+        for name in names:
+            targets.setdefault(name, set()).add(writer)
+            count = sum(writer in subscribers for subscribers in targets.values())
+            replies.append(self._push(writer, [_bulk(kind), _bulk(name), _int(count)]))
+        return b"".join(replies)
+
+    def _publish(self, channel: bytes, message: bytes) -> int:
+        receivers = 0
+        for writer in self._channels.get(channel, ()):
+            writer.write(self._push(writer, [_bulk(b"message"), _bulk(channel), _bulk(message)]))
+            receivers += 1
+        for pattern, writers in self._patterns.items():
+            if fnmatch.fnmatchcase(channel.decode(), pattern.decode()):
+                for writer in writers:
+                    items = [_bulk(b"pmessage"), _bulk(pattern), _bulk(channel), _bulk(message)]
+                    writer.write(self._push(writer, items))
+                    receivers += 1
+        return receivers
+
+    def _execute(self, args: List[bytes], writer) -> bytes:
+        command = args[0].upper()
+        queued = self._transactions.get(writer, None)
+        if command == b"MULTI":
+            self._transactions[writer] = []
+            return OK
+        elif command == b"EXEC":
+            # Commands run one at a time in the event loop, so the transaction is atomic.
+            commands = self._transactions.pop(writer, [])
+            return _array([self._execute(c, writer) for c in commands])
+        elif command == b"DISCARD":
+            self._transactions.pop(writer, None)
+            return OK
+        elif queued is not None:
+            queued.append(args)
+            return b"+QUEUED\r\n"
+        elif command == b"PUBLISH":
+            return _int(self._publish(args[1], args[2]))
+        elif command == b"PSUBSCRIBE":
+            return self._subscribe(b"psubscribe", self._patterns, args[1:], writer)
+        elif command == b"SUBSCRIBE":
+            return self._subscribe(b"subscribe", self._channels, args[1:], writer)
+        elif command == b"GET":
+            return _bulk(self._strings.get(args[1]))
+        elif command == b"SET":
+            self._strings[args[1]] = args[2]
+            return OK
+        elif command == b"DEL":
+            removed = [self._strings.pop(k, None) or self._sets.pop(k, None) for k in args[1:]]
+            return _int(sum(r is not None for r in removed))
+        elif command == b"KEYS":
+            pattern = args[1].decode()
+            keys = [k for k in list(self._strings) + list(self._sets) if fnmatch.fnmatchcase(k.decode(), pattern)]
+            return _array([_bulk(k) for k in keys])
+        elif command == b"SADD":
+            members = self._sets.setdefault(args[1], set())
+            before = len(members)
+            members.update(args[2:])
+            return _int(len(members) - before)
+        elif command == b"SREM":
+            members = self._sets.get(args[1], set())
+            before = len(members)
+            members.difference_update(args[2:])
+            if not members:
+                self._sets.pop(args[1], None)
+            return _int(before - len(members))
+        elif command == b"SISMEMBER":
+            return _int(int(args[2] in self._sets.get(args[1], ())))
+        elif command == b"SCARD":
+            return _int(len(self._sets.get(args[1], ())))
+        elif command == b"PING":
+            return b"+PONG\r\n"
+        elif command == b"HELLO":
+            protocol = int(args[1]) if len(args) > 1 else 2
+            if protocol == 3:
+                self._push_kinds[writer] = b">"
+            fields = [_bulk(b"server"), _bulk(b"redis"), _bulk(b"version"), _bulk(b"7.0.0")]
+            fields += [_bulk(b"proto"), _int(protocol), _bulk(b"mode"), _bulk(b"standalone")]
+            if protocol == 3:
+                return b"%%%d\r\n" % (len(fields) // 2) + b"".join(fields)  # A map.
+            return _array(fields)
+        elif command in {b"CLIENT", b"SELECT", b"AUTH"}:
+            return OK
+        return b"-ERR unknown command '%s'\r\n" % args[0]
+
+
+def main():
+    """Run it."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    server = StandinRedis(args.host, args.port).start()
+    print(f"Serving on {server.host}:{server.port}. Press Ctrl+C to stop.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compare the cost of the psutil and procfs telemetry backends.
+
+Each backend captures the same collectors repeatedly with cost accounting enabled, so the
+cost of each collector is reported separately. The peak of traced memory allocations of
+one capture is reported too. Usage::
+
+    python benchmarks/telemetry_backend_bench.py --captures 1000
+"""
+
+import argparse
+import gc
+import tracemalloc
+from time import perf_counter
+
+from flowcept.flowceptor.telemetry_capture import TelemetryCapture
+
+BACKENDS = ("psutil", "procfs")
+
+
+def build_conf(backend):
+    """Get a telemetry configuration with all the collectors the procfs backend implements."""
+    return {
+        "backend": backend,
+        "cpu": True,
+        "per_cpu": True,
+        "mem": True,
+        "network": True,
+        "process_info": True,
+        "gpu": None,
+        "cost_accounting": {"enabled": True},
+    }
+
+
+def measure(backend, captures):
+    """Get the per-collector costs, the time per capture, and the allocation peak of one capture."""
+    tele_capture = TelemetryCapture(build_conf(backend))
+    tele_capture.capture()  # Warm-up: opens the files and initializes the CPU percentages.
+    gc.collect()
+    t0 = perf_counter()
+    for _ in range(captures):
+        tele_capture.capture()
+    elapsed = perf_counter() - t0
+    tracemalloc.start()
+    tele_capture.capture()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tele_capture.get_collector_costs(), elapsed / captures, peak
+
+
+def main():
+    """Run it."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--captures", type=int, default=1000, help="Captures per backend.")
+    args = parser.parse_args()
+
+    results = {backend: measure(backend, args.captures) for backend in BACKENDS}
+    collectors = list(results[BACKENDS[0]][0])
+    print(f"{'mean ms per call':>20}" + "".join(f"{b:>12}" for b in BACKENDS) + f"{'speedup':>12}")
+    for name in collectors:
+        means = [results[b][0][name]["mean_ms"] for b in BACKENDS]
+        print(f"{name:>20}" + "".join(f"{m:>12.4f}" for m in means) + f"{means[0] / means[1]:>11.1f}x")
+    per_capture = [results[b][1] * 1000 for b in BACKENDS]
+    speedup = per_capture[0] / per_capture[1]
+    print(f"{'whole capture':>20}" + "".join(f"{m:>12.4f}" for m in per_capture) + f"{speedup:>11.1f}x")
+    print(f"{'alloc peak (KiB)':>20}" + "".join(f"{results[b][2] / 1024:>12.1f}" for b in BACKENDS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compare the stored telemetry volume with full per-task telemetry vs delta-encoded series.
+
+The tasks in ``tests/api/sample_data_with_telemetry_and_rai.json`` are replayed: their
+start and end telemetry become the samples of one series per process, in time order, and
+each task only keeps references to its samples. The script reports the size of the task
+documents plus the ``telemetry`` collection documents, in JSON and msgpack, and checks
+that the reconstructed telemetry differences match. Usage::
+
+    python benchmarks/telemetry_storage_bench.py --replicas 100 --block-size 64
+"""
+
+import argparse
+import json
+import pathlib
+from time import perf_counter
+
+import msgpack
+
+from flowcept.commons.query_utils import calculate_telemetry_diff_for_docs
+from flowcept.commons.telemetry_series import TelemetrySeriesEncoder
+
+SAMPLE_DATA = pathlib.Path(__file__).parent.parent / "tests" / "api" / "sample_data_with_telemetry_and_rai.json"
+
+
+def load_docs(replicas):
+    """Load the sample tasks that have telemetry, replicated to get a larger workload."""
+    with open(SAMPLE_DATA) as f:
+        docs = [d for d in json.load(f) if "telemetry_at_start" in d and "telemetry_at_end" in d]
+    return [dict(d, task_id=f"{d['task_id']}_{r}") for r in range(replicas) for d in docs]
+
+
+def encode(docs, block_size):
+    """Turn the tasks' telemetry into per-process series and replace it with references."""
+    samples = {}
+    for i, doc in enumerate(docs):
+        pid = doc["telemetry_at_start"]["process"]["pid"]
+        samples.setdefault(pid, []).append((doc["started_at"], i, "telemetry_at_start"))
+        samples.setdefault(pid, []).append((doc["ended_at"], i, "telemetry_at_end"))
+
+    ref_docs = [dict(d) for d in docs]
+    blocks = []
+    for pid, series in samples.items():
+        series_id = f"series_{pid}"
+        encoder = TelemetrySeriesEncoder(series_id, block_size)
+        for sample_index, (sampled_at, i, field) in enumerate(sorted(series, key=lambda s: s[0])):
+            blocks.extend(encoder.add(sample_index, sampled_at, docs[i][field]))
+            ref_docs[i][field] = {"series_id": series_id, "sample_index": sample_index}
+        blocks.append(encoder.flush())
+    blocks = [b for b in blocks if b is not None]
+    for b in blocks:
+        b.pop("type")
+    return ref_docs, blocks
+
+
+def sizes(docs):
+    """Get the JSON and msgpack sizes, in bytes, of a list of documents."""
+    return sum(len(json.dumps(d)) for d in docs), sum(len(msgpack.dumps(d)) for d in docs)
+
+
+def max_relative_error(expected, actual):
+    """Get the largest relative difference between two telemetry diff trees."""
+    if isinstance(expected, dict):
+        return max((max_relative_error(expected[k], actual[k]) for k in expected), default=0.0)
+    elif isinstance(expected, list):
+        return max((max_relative_error(e, a) for e, a in zip(expected, actual)), default=0.0)
+    elif isinstance(expected, (int, float)):
+        return abs(expected - actual) / max(1.0, abs(expected))
+    return 0.0
+
+
+def main():
+    """Run it."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replicas", type=int, default=100, help="Times the sample tasks are replicated.")
+    parser.add_argument("--block-size", type=int, default=64, help="Samples per telemetry block.")
+    args = parser.parse_args()
+
+    docs = load_docs(args.replicas)
+    ref_docs, blocks = encode(docs, args.block_size)
+
+    before_json, before_msgpack = sizes(docs)
+    after_tasks_json, after_tasks_msgpack = sizes(ref_docs)
+    blocks_json, blocks_msgpack = sizes(blocks)
+    after_json, after_msgpack = after_tasks_json + blocks_json, after_tasks_msgpack + blocks_msgpack
+
+    print(f"{len(docs)} tasks, {len(blocks)} telemetry blocks")
+    print(f"{'':>24}{'json':>14}{'msgpack':>14}")
+    print(f"{'full telemetry':>24}{before_json:>14,}{before_msgpack:>14,}")
+    print(f"{'refs + delta blocks':>24}{after_json:>14,}{after_msgpack:>14,}")
+    print(f"{'  of which blocks':>24}{blocks_json:>14,}{blocks_msgpack:>14,}")
+    print(f"{'ratio':>24}{before_json / after_json:>13.2f}x{before_msgpack / after_msgpack:>13.2f}x")
+
+    # NumPy is imported lazily by the first reconstruction; time that once, apart from the reconstruction.
+    t0 = perf_counter()
+    import numpy  # noqa: F401
+
+    numpy_import_ms = (perf_counter() - t0) * 1000
+
+    t0 = perf_counter()
+    expected = calculate_telemetry_diff_for_docs(docs)
+    t1 = perf_counter()
+    actual = calculate_telemetry_diff_for_docs(ref_docs, blocks)
+    t2 = perf_counter()
+    error = max(max_relative_error(e["telemetry_diff"], a["telemetry_diff"]) for e, a in zip(expected, actual))
+    print(f"diffs from full telemetry: {(t1 - t0) * 1000:.1f} ms; from delta blocks: {(t2 - t1) * 1000:.1f} ms")
+    print(f"one-time numpy import on the query side: {numpy_import_ms:.1f} ms")
+    print(f"max relative error of the reconstructed diffs: {error:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compare the cost of inspecting large tensors with and without fused statistics.
+
+The baseline is the former inspection, which computed only the density with
+``torch.nonzero``; the separate-reductions variant computes the same statistics as the fused
+one with one reduction and one host read per statistic. Usage::
+
+    python benchmarks/tensor_stats_bench.py --numel 16000000 --density 0.5 --repeat 20
+"""
+
+import argparse
+from time import perf_counter
+
+import torch
+
+from flowcept.instrumentation.tensor_stats import tensor_stats_vector
+
+
+def nonzero_density(tensor):
+    """Get the density the way the former inspection did."""
+    return torch.nonzero(tensor).size(0) / tensor.numel()
+
+
+def separate_stats(tensor):
+    """Get the statistics with one reduction and one host read each."""
+    x = tensor.reshape(-1)
+    return [
+        torch.nonzero(x).size(0) / x.numel(),
+        x.min().item(),
+        x.max().item(),
+        x.mean().item(),
+        x.norm().item(),
+        torch.isnan(x).sum().item(),
+        torch.isinf(x).sum().item(),
+    ]
+
+
+def fused_stats(tensor):
+    """Get the statistics with the fused reductions and a single host read."""
+    return tensor_stats_vector(tensor).tolist()
+
+
+VARIANTS = {"nonzero_density": nonzero_density, "separate_stats": separate_stats, "fused_stats": fused_stats}
+
+
+def main():
+    """Run it."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--numel", type=int, default=16_000_000, help="Elements of the tensor.")
+    parser.add_argument("--density", type=float, default=0.5, help="Fraction of nonzero elements.")
+    parser.add_argument("--dtype", default="float32")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    tensor = torch.randn(args.numel, dtype=getattr(torch, args.dtype))
+    tensor[torch.rand(args.numel) >= args.density] = 0
+    print(f"{'variant':>18}{'ms per inspection':>20}{'speedup':>10}")
+    baseline = None
+    for name, inspect in VARIANTS.items():
+        inspect(tensor)  # Warm-up.
+        t0 = perf_counter()
+        for _ in range(args.repeat):
+            inspect(tensor)
+        elapsed = (perf_counter() - t0) / args.repeat * 1000
+        baseline = baseline or elapsed
+        print(f"{name:>18}{elapsed:>20.3f}{baseline / elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
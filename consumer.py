@@ -1,9 +1,19 @@
 import mochi.mofka.client as mofka
 from mochi.mofka.client import ThreadPool, AdaptiveBatchSize
+import argparse
 import json
 import os
 import time
-import csv
+
+from flowcept.commons.self_metrics import METRICS, MetricsExporter
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--producers", type=int, default=int(os.getenv("FLOWCEPT_PRODUCERS", "1")),
+                    help="Number of producers; the consumer stops after one stop message from each.")
+parser.add_argument("--metrics-file", default="consumer_metrics.jsonl",
+                    help="JSON lines file where the pull time histograms are exported.")
+args = parser.parse_args()
+
 print("about to start", flush=True)
 driver = mofka.MofkaDriver("mofka.json")
 batch_size = AdaptiveBatchSize
@@ -16,27 +26,23 @@ consumer = topic.consumer(name=consumer_name,
                             thread_pool=thread_pool,
                             batch_size=batch_size)
 
-pulls = []
 events = []
 count = 0
+pull_time = METRICS.histogram("consumer_pull_time")
+exporter = MetricsExporter(METRICS, interval=0, file_path=args.metrics_file)
 
-
-# Get the list of files in the current directory
-csv_files = [file for file in os.listdir() if file.endswith('.csv')]
-threshold = len(csv_files)
+# Each producer sends one stop message when it stops.
+threshold = args.producers
 print("about to start with breakpoint ",threshold, flush=True)
 while True:
-    data = []
-    metadata = []
-    t1 = time.time()
+    t1 = time.perf_counter()
     f = consumer.pull()
     event = f.wait()
-    t2 = time.time()
+    pull_time.record(time.perf_counter() - t1)
     e = json.loads(event.metadata)
 
 
     events.append(e)
-    pulls.append(t2 - t1)
     # print("h: ", e.keys(),flush=True)
     
     # break
@@ -46,15 +52,7 @@ while True:
         count += 1
         with open("data.json", 'w') as f:
             json.dump(events, f, indent=4)
-        with open("pulls.csv", "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(pulls)
+        exporter.export()  # The pull times since the previous stop message.
         
     if count == threshold:
         break
-
-
-    
-
-    
-    
\ No newline at end of file
@@ -305,7 +305,8 @@ def run_asserts_and_exports(campaign_id, model_search_wf_id, n_configs):
                         n_tasks_expected += 1
                         assert parent_forward["workflow_id"] == parent_module_wf_id
                         assert parent_forward["status"] == Status.FINISHED.value
-                        assert parent_module_wf["custom_metadata"]["model_profile"]
+                        profile_hash = parent_module_wf["custom_metadata"]["model_profile"]["profile_hash"]
+                        assert Flowcept.db.get_model_profile(profile_hash)
                         assert parent_forward[
                                    "parent_task_id"] == batch_iteration["task_id"]
 
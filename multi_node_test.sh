@@ -86,4 +86,5 @@ python3 examples/llm_complex/llm_main_example.py --dask-map-gpus true --schedule
 echo "Client closed"
 
 echo "launching consumer"
-python3 consumer.py
\ No newline at end of file
+# One stop message from each dask worker and from the client.
+python3 consumer.py --producers $((total + 1))
\ No newline at end of file
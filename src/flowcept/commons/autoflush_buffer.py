@@ -1,7 +1,10 @@
 """Autoflush module."""
 
-from typing import Callable
-from threading import Thread, Event
+import os
+from collections import deque
+from typing import Callable, Dict, List
+from threading import Thread, Event, Lock, current_thread, local
+from weakref import WeakSet
 
 
 class AutoflushBuffer:
@@ -82,3 +85,178 @@ class AutoflushBuffer:
         self._flush_thread.join()
         self._timer_thread.join()
         self._do_flush()
+
+
+class _ThreadBuffer:
+    """Local buffer of one producer thread."""
+
+    __slots__ = ("thread", "items", "appended", "dropped")
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.items = deque()
+        self.appended = 0
+        self.dropped = 0
+
+
+class ThreadLocalAutoflushBuffer:
+    """Autoflush buffer with one local buffer per producer thread.
+
+    Producer threads only touch their own deque, so they never contend with each other
+    nor with the flusher. A single background thread drains all local buffers in batches
+    and hands each batch to ``flush_function``. After ``os.fork``, the child starts with
+    empty buffers and its own flusher thread, so it never republishes the parent's messages.
+
+    Parameters
+    ----------
+    max_size : int
+        A flush is triggered as soon as one thread buffers this many messages.
+    flush_interval : float
+        Seconds between time-based flushes.
+    flush_function : Callable
+        Function receiving each batch (a list of messages).
+    max_backlog : int, optional
+        Maximum number of messages buffered per thread. Messages appended beyond it are
+        dropped and counted. Use 0 (default) for unbounded buffers.
+    """
+
+    _instances = WeakSet()
+
+    def __init__(
+        self,
+        max_size,
+        flush_interval,
+        flush_function: Callable,
+        flush_function_args=[],
+        flush_function_kwargs={},
+        max_backlog=0,
+    ):
+        self._max_size = max_size
+        self._flush_interval = flush_interval
+        self._max_backlog = max_backlog
+        self._flush_function = flush_function
+        self._flush_function_args = flush_function_args
+        self._flush_function_kwargs = flush_function_kwargs
+        self._init_state()
+        ThreadLocalAutoflushBuffer._instances.add(self)
+
+    def _init_state(self):
+        self._local = local()
+        self._registry: List[_ThreadBuffer] = []
+        self._registry_lock = Lock()
+        self._retired_appended = 0
+        self._retired_dropped = 0
+        self._flush_event = Event()
+        self._stop_event = Event()
+        self._flush_thread = Thread(target=self._flush_loop, daemon=True)
+        self._flush_thread.start()
+
+    def _reinit_after_fork(self):
+        # Only the forking thread survives in the child, and the parent still owns (and
+        # will publish) everything that was buffered before the fork.
+        if not self._stop_event.is_set():
+            self._init_state()
+
+    def _get_thread_buffer(self) -> _ThreadBuffer:
+        try:
+            return self._local.buffer
+        except AttributeError:
+            thread_buffer = _ThreadBuffer(current_thread())
+            with self._registry_lock:
+                self._registry.append(thread_buffer)
+            self._local.buffer = thread_buffer
+            return thread_buffer
+
+    def append(self, item):
+        """Append it."""
+        thread_buffer = self._get_thread_buffer()
+        if self._max_backlog and len(thread_buffer.items) >= self._max_backlog:
+            thread_buffer.dropped += 1
+            return
+        thread_buffer.items.append(item)
+        thread_buffer.appended += 1
+        if len(thread_buffer.items) >= self._max_size:
+            self._flush_event.set()
+
+    def extend(self, items):
+        """Extend it."""
+        thread_buffer = self._get_thread_buffer()
+        items = list(items)
+        if self._max_backlog:
+            room = max(0, self._max_backlog - len(thread_buffer.items))
+            thread_buffer.dropped += max(0, len(items) - room)
+            items = items[:room]
+        thread_buffer.items.extend(items)
+        thread_buffer.appended += len(items)
+        if len(thread_buffer.items) >= self._max_size:
+            self._flush_event.set()
+
+    def _drain(self):
+        with self._registry_lock:
+            thread_buffers = list(self._registry)
+        batch = []
+        for thread_buffer in thread_buffers:
+            items = thread_buffer.items
+            # popleft is thread-safe against the producer's appends; we only take what
+            # was there when we looked, so a busy producer can't starve the others.
+            for _ in range(len(items)):
+                batch.append(items.popleft())
+            if not thread_buffer.thread.is_alive() and not items:
+                with self._registry_lock:
+                    self._registry.remove(thread_buffer)
+                    self._retired_appended += thread_buffer.appended
+                    self._retired_dropped += thread_buffer.dropped
+        if batch:
+            self._flush_function(
+                batch,
+                *self._flush_function_args,
+                **self._flush_function_kwargs,
+            )
+
+    def _flush_loop(self):
+        while not self._stop_event.is_set():
+            self._flush_event.wait(self._flush_interval)
+            self._flush_event.clear()
+            self._drain()
+
+    def stats(self) -> Dict:
+        """Get the per-thread appended, dropped, and backlog counters.
+
+        Returns
+        -------
+        dict
+            ``{"threads": [{"thread_name", "thread_id", "appended", "dropped", "backlog"}],
+            "retired_appended": int, "retired_dropped": int}``, where the retired counters
+            sum up threads that ended and whose buffers were fully drained.
+        """
+        with self._registry_lock:
+            return {
+                "threads": [
+                    {
+                        "thread_name": b.thread.name,
+                        "thread_id": b.thread.ident,
+                        "appended": b.appended,
+                        "dropped": b.dropped,
+                        "backlog": len(b.items),
+                    }
+                    for b in self._registry
+                ],
+                "retired_appended": self._retired_appended,
+                "retired_dropped": self._retired_dropped,
+            }
+
+    def stop(self):
+        """Stop it."""
+        self._stop_event.set()
+        self._flush_event.set()
+        self._flush_thread.join()
+        self._drain()
+
+
+def _reinit_thread_local_buffers_after_fork():
+    for buffer in list(ThreadLocalAutoflushBuffer._instances):
+        buffer._reinit_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_thread_local_buffers_after_fork)
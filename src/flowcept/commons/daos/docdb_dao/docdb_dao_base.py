@@ -4,14 +4,14 @@ This module provides an abstract base class `DocumentDBDAO` for document-based d
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict
-
-import pandas as pd
-
+from typing import TYPE_CHECKING, List, Dict
 
 from flowcept.commons.flowcept_dataclasses.workflow_object import WorkflowObject
 from flowcept.configs import MONGO_ENABLED, LMDB_ENABLED
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 class DocumentDBDAO(ABC):
     """Abstract class for document database operations.
@@ -22,6 +22,16 @@ class DocumentDBDAO(ABC):
 
     _instance: "DocumentDBDAO" = None
 
+    # Collections besides tasks, workflows, and objects, mapped to their key field.
+    AUXILIARY_COLLECTIONS = {
+        "telemetry": "block_id",
+        "machines": "machine_id",
+        "processes": "process_key",
+        "metrics": "metrics_id",
+        "model_profiles": "profile_hash",
+        "checkpoints": "checkpoint_id",
+    }
+
     @staticmethod
     def get_instance(*args, **kwargs) -> "DocumentDBDAO":
         """Build a `DocumentDBDAO` instance for querying.
@@ -111,6 +121,24 @@ class DocumentDBDAO(ABC):
         """
         raise NotImplementedError
 
+    @abstractmethod
+    def upsert_docs(self, collection: str, docs: List[Dict]):
+        """Insert or replace documents of an auxiliary collection, by their key field.
+
+        Parameters
+        ----------
+        collection : str
+            One of the `AUXILIARY_COLLECTIONS`.
+        docs : List[Dict]
+            Documents to insert or replace.
+
+        Raises
+        ------
+        NotImplementedError
+            This method must be implemented by subclasses.
+        """
+        raise NotImplementedError
+
     @abstractmethod
     def insert_one_task(self, task_dict: Dict):
         """Insert a single task document.
@@ -128,7 +156,7 @@ class DocumentDBDAO(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def to_df(self, collection, filter=None) -> pd.DataFrame:
+    def to_df(self, collection, filter=None) -> "pd.DataFrame":
         """Convert a collection to a pandas DataFrame.
 
         Parameters
@@ -390,3 +418,45 @@ class DocumentDBDAO(ABC):
             This method must be implemented by subclasses.
         """
         raise NotImplementedError
+
+    @abstractmethod
+    def put_chunks(self, chunks: Dict[str, bytes]) -> int:
+        """Store content-addressed chunks, skipping those already stored.
+
+        Parameters
+        ----------
+        chunks : dict
+            Chunk data (bytes or any buffer) by chunk id, i.e., by the hash of the data.
+
+        Returns
+        -------
+        int
+            The number of chunks that were not stored yet.
+
+        Raises
+        ------
+        NotImplementedError
+            This method must be implemented by subclasses.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_chunks(self, chunk_ids: List[str]) -> Dict[str, bytes]:
+        """Get content-addressed chunks.
+
+        Parameters
+        ----------
+        chunk_ids : list of str
+            The ids of the chunks.
+
+        Returns
+        -------
+        dict
+            Chunk data by chunk id, for the chunks that were found.
+
+        Raises
+        ------
+        NotImplementedError
+            This method must be implemented by subclasses.
+        """
+        raise NotImplementedError
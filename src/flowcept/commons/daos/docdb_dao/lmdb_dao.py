@@ -3,26 +3,42 @@
 This module provides the `LMDBDAO` class for interacting with an LMDB-backed database.
 """
 
-from time import time
-from typing import List, Dict
+import pickle
+import struct
+from time import time, perf_counter
+from typing import TYPE_CHECKING, Iterator, List, Dict
+from uuid import uuid4
 
 import lmdb
 import json
-import pandas as pd
 
 from flowcept import WorkflowObject
 from flowcept.commons.daos.docdb_dao.docdb_dao_base import DocumentDBDAO
 from flowcept.commons.flowcept_logger import FlowceptLogger
-from flowcept.configs import PERF_LOG, LMDB_SETTINGS
+from flowcept.commons.self_metrics import METRICS
+from flowcept.configs import PERF_LOG, LMDB_SETTINGS, SELF_METRICS_ENABLED
 from flowcept.flowceptor.consumers.consumer_utils import curate_dict_task_messages
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 class LMDBDAO(DocumentDBDAO):
     """DocumentDBDAO implementation for interacting with LMDB.
 
     Provides methods for storing and retrieving task and workflow data.
+
+    Objects are stored in the ``objects`` sub-database, keyed by object id, as a record with a
+    4-byte header with the size of the JSON metadata, the metadata, and, for small objects, the
+    object's data inline. Larger objects are split into ``object_chunk_size`` chunks in the
+    ``object_chunks`` sub-database, keyed by the object's file id and the chunk index, and their
+    metadata has the ``file_id``. Sorted-duplicate sub-databases index object ids by workflow id
+    and by task id.
     """
 
+    _OBJECT_HEADER = struct.Struct(">I")
+    _CHUNK_INDEX = struct.Struct(">Q")
+
     def __init__(self):
         # TODO: if we are inheriting from DocumentDBDAO, shouldn't we call super() here?
         self._initialized = True
@@ -32,9 +48,19 @@ class LMDBDAO(DocumentDBDAO):
     def _open(self):
         """Open LMDB environment and databases."""
         _path = LMDB_SETTINGS.get("path", "flowcept_lmdb")
-        self._env = lmdb.open(_path, map_size=10**12, max_dbs=2)
+        self._env = lmdb.open(_path, map_size=10**12, max_dbs=7 + len(DocumentDBDAO.AUXILIARY_COLLECTIONS))
         self._tasks_db = self._env.open_db(b"tasks")
         self._workflows_db = self._env.open_db(b"workflows")
+        self._chunks_db = self._env.open_db(b"chunks")
+        self._objects_db = self._env.open_db(b"objects")
+        self._object_chunks_db = self._env.open_db(b"object_chunks")
+        self._object_indexes = {
+            "workflow_id": self._env.open_db(b"objects_by_workflow_id", dupsort=True),
+            "task_id": self._env.open_db(b"objects_by_task_id", dupsort=True),
+        }
+        self._object_inline_max_bytes = LMDB_SETTINGS.get("object_inline_max_bytes", 64 << 10)
+        self._object_chunk_size = LMDB_SETTINGS.get("object_chunk_size", 1 << 20)
+        self._aux_dbs = {name: self._env.open_db(name.encode()) for name in DocumentDBDAO.AUXILIARY_COLLECTIONS}
         self._is_closed = False
 
     def insert_and_update_many_tasks(self, docs: List[Dict], indexing_key=None):
@@ -56,7 +82,10 @@ class LMDBDAO(DocumentDBDAO):
             t0 = 0
             if PERF_LOG:
                 t0 = time()
+            t_curate = perf_counter() if SELF_METRICS_ENABLED else 0
             indexed_buffer = curate_dict_task_messages(docs, indexing_key, t0, convert_times=False)
+            if SELF_METRICS_ENABLED:
+                METRICS.histogram("docdb_curate_time").record(perf_counter() - t_curate)
             with self._env.begin(write=True, db=self._tasks_db) as txn:
                 for key, value in indexed_buffer.items():
                     k, v = key.encode(), json.dumps(value).encode()
@@ -66,6 +95,31 @@ class LMDBDAO(DocumentDBDAO):
             self.logger.exception(e)
             return False
 
+    def upsert_docs(self, collection: str, docs: List[Dict]):
+        """Insert or replace documents of an auxiliary collection.
+
+        Parameters
+        ----------
+        collection : str
+            One of the `AUXILIARY_COLLECTIONS`.
+        docs : list of dict
+            Documents to insert or replace, keyed by the collection's key field.
+
+        Returns
+        -------
+        bool
+            True if the operation succeeds, False otherwise.
+        """
+        try:
+            key_field = DocumentDBDAO.AUXILIARY_COLLECTIONS[collection]
+            with self._env.begin(write=True, db=self._aux_dbs[collection]) as txn:
+                for doc in docs:
+                    txn.put(str(doc[key_field]).encode(), json.dumps(doc).encode())
+            return True
+        except Exception as e:
+            self.logger.exception(e)
+            return False
+
     def insert_one_task(self, task_dict):
         """Insert a single task document.
 
@@ -137,7 +191,7 @@ class LMDBDAO(DocumentDBDAO):
                 return False
         return True
 
-    def to_df(self, collection="tasks", filter=None) -> pd.DataFrame:
+    def to_df(self, collection="tasks", filter=None) -> "pd.DataFrame":
         """Fetch data from LMDB and return a DataFrame with optional MongoDB-style filtering.
 
         Args:
@@ -149,6 +203,8 @@ class LMDBDAO(DocumentDBDAO):
         -------
          pd.DataFrame: A DataFrame containing the filtered data.
         """
+        import pandas as pd
+
         docs = self.query(collection, filter)
         return pd.DataFrame(docs)
 
@@ -179,7 +235,7 @@ class LMDBDAO(DocumentDBDAO):
         remove_json_unserializables : bool, optional
             Remove JSON-unserializable fields.
         collection : str, optional
-            Name of the collection ('tasks' or 'workflows'). Default is 'tasks'.
+            Name of the collection ('tasks', 'workflows', or an auxiliary collection). Default is 'tasks'.
 
         Returns
         -------
@@ -193,8 +249,12 @@ class LMDBDAO(DocumentDBDAO):
             _db = self._tasks_db
         elif collection == "workflows":
             _db = self._workflows_db
+        elif collection == "objects":
+            return self.object_query(filter)
+        elif collection in self._aux_dbs:
+            _db = self._aux_dbs[collection]
         else:
-            msg = "Only tasks and workflows "
+            msg = f"Only tasks, workflows, objects, and {', '.join(self._aux_dbs)} "
             raise Exception(msg + "collections are currently available for this.")
 
         try:
@@ -300,9 +360,62 @@ class LMDBDAO(DocumentDBDAO):
             self._env.close()
             self._is_closed = True
 
-    def object_query(self, filter):
-        """Query objects collection."""
-        raise NotImplementedError
+    def object_query(self, filter) -> List[Dict]:
+        """Query the objects collection.
+
+        Filters on ``object_id``, ``workflow_id``, or ``task_id`` are answered from the indexes;
+        other filters scan the objects.
+
+        Parameters
+        ----------
+        filter : dict
+            Filter criteria on the object metadata.
+
+        Returns
+        -------
+        list of dict
+            The metadata of the matching objects. Objects stored inline also have their
+            ``data``; the data of the others is read with `get_file_data` from their ``file_id``.
+        """
+        if self._is_closed:
+            self._open()
+        filter = filter or {}
+        try:
+            docs = []
+            with self._env.begin() as txn:
+                for record in self._object_records(txn, filter):
+                    doc = self._decode_object_record(record)
+                    if LMDBDAO._match_filter(doc, filter):
+                        docs.append(doc)
+            return docs
+        except Exception as e:
+            self.logger.exception(e)
+            return None
+
+    def _object_records(self, txn, filter) -> Iterator[bytes]:
+        if isinstance(filter.get("object_id"), str):
+            record = txn.get(filter["object_id"].encode(), db=self._objects_db)
+            if record is not None:
+                yield record
+            return
+        for field, index_db in self._object_indexes.items():
+            if isinstance(filter.get(field), str):
+                cursor = txn.cursor(db=index_db)
+                if cursor.set_key(filter[field].encode()):
+                    for object_id in cursor.iternext_dup():
+                        yield txn.get(object_id, db=self._objects_db)
+                return
+        for _, record in txn.cursor(db=self._objects_db):
+            yield record
+
+    @staticmethod
+    def _decode_object_record(record) -> Dict:
+        (metadata_size,) = LMDBDAO._OBJECT_HEADER.unpack_from(record)
+        data_offset = LMDBDAO._OBJECT_HEADER.size + metadata_size
+        doc = json.loads(bytes(record[LMDBDAO._OBJECT_HEADER.size : data_offset]))
+        if "file_id" not in doc:
+            doc["data"] = bytes(record[data_offset:])
+        return doc
 
     def get_tasks_recursive(self, workflow_id, max_depth=999, mapping=None):
         """Get_tasks_recursive in LMDB."""
@@ -327,9 +440,135 @@ class LMDBDAO(DocumentDBDAO):
         save_data_in_collection,
         pickle_,
     ):
-        """Save object."""
-        raise NotImplementedError
+        """Save an object, replacing the object with the same id, if any.
+
+        Objects up to ``object_inline_max_bytes`` (in the LMDB settings), or any object when
+        `save_data_in_collection` is set, are stored inline with their metadata; larger ones are
+        stored in chunks.
+
+        Returns
+        -------
+        str
+            The object id.
+        """
+        if object_id is None:
+            object_id = str(uuid4())
+        doc = {"object_id": object_id}
+        blob = object
+        if pickle_:
+            blob = pickle.dumps(object)
+            doc["pickle"] = True
+        blob = memoryview(blob).cast("B")
+        doc["data_size"] = len(blob)
+        inline = save_data_in_collection or len(blob) <= self._object_inline_max_bytes
+        if not inline:
+            doc["file_id"] = uuid4().hex
+            doc["chunk_size"] = self._object_chunk_size
+        if task_id is not None:
+            doc["task_id"] = task_id
+        if workflow_id is not None:
+            doc["workflow_id"] = workflow_id
+        if type is not None:
+            doc["type"] = type
+        if custom_metadata is not None:
+            doc["custom_metadata"] = custom_metadata
+
+        metadata = json.dumps(doc).encode()
+        record = LMDBDAO._OBJECT_HEADER.pack(len(metadata)) + metadata
+        if inline:
+            record += blob
+        key = object_id.encode()
+        with self._env.begin(write=True) as txn:
+            previous = txn.get(key, db=self._objects_db)
+            if previous is not None:
+                self._delete_object(txn, key, self._decode_object_record(previous))
+            txn.put(key, record, db=self._objects_db)
+            for field, index_db in self._object_indexes.items():
+                if field in doc:
+                    txn.put(str(doc[field]).encode(), key, db=index_db)
+            if not inline:
+                file_key = doc["file_id"].encode()
+                for i, offset in enumerate(range(0, len(blob), self._object_chunk_size)):
+                    chunk_key = file_key + LMDBDAO._CHUNK_INDEX.pack(i)
+                    txn.put(chunk_key, blob[offset : offset + self._object_chunk_size], db=self._object_chunks_db)
+        return object_id
+
+    def _delete_object(self, txn, key: bytes, doc: Dict):
+        for field, index_db in self._object_indexes.items():
+            if field in doc:
+                txn.delete(str(doc[field]).encode(), key, db=index_db)
+        if "file_id" in doc:
+            cursor = txn.cursor(db=self._object_chunks_db)
+            file_key = doc["file_id"].encode()
+            if cursor.set_range(file_key):
+                while cursor.key().startswith(file_key) and cursor.delete():
+                    pass
+        txn.delete(key, db=self._objects_db)
+
+    def iter_file_chunks(self, file_id) -> Iterator[memoryview]:
+        """Iterate over the chunks of an object's data without copying them.
+
+        The chunks are memoryviews of LMDB's memory map and are valid only until the next
+        iteration; copy them to keep them.
+
+        Parameters
+        ----------
+        file_id : str
+            The ``file_id`` of an object stored in chunks.
+
+        Yields
+        ------
+        memoryview
+            The chunks, in order.
+        """
+        file_key = file_id.encode()
+        with self._env.begin(db=self._object_chunks_db, buffers=True) as txn:
+            cursor = txn.cursor()
+            if not cursor.set_range(file_key):
+                return
+            for key, chunk in cursor:
+                if key[: len(file_key)] != file_key:
+                    return
+                yield chunk
 
     def get_file_data(self, file_id):
-        """Get file data."""
-        raise NotImplementedError
+        """Get the data of an object stored in chunks.
+
+        The chunks are copied from LMDB's memory map directly into the result.
+
+        Parameters
+        ----------
+        file_id : str
+            The ``file_id`` of the object.
+
+        Returns
+        -------
+        bytearray
+            The data, or None if there is no such file.
+        """
+        data = None
+        for chunk in self.iter_file_chunks(file_id):
+            if data is None:
+                data = bytearray()
+            data += chunk
+        if data is None:
+            self.logger.error(f"File with ID {file_id} not found.")
+        return data
+
+    def put_chunks(self, chunks: Dict[str, bytes]) -> int:
+        """Store content-addressed chunks, skipping those already stored."""
+        n_new = 0
+        with self._env.begin(write=True, db=self._chunks_db) as txn:
+            for chunk_id, data in chunks.items():
+                n_new += txn.put(chunk_id.encode(), data, overwrite=False)
+        return n_new
+
+    def get_chunks(self, chunk_ids: List[str]) -> Dict[str, bytes]:
+        """Get content-addressed chunks."""
+        chunks = {}
+        with self._env.begin(db=self._chunks_db) as txn:
+            for chunk_id in chunk_ids:
+                data = txn.get(chunk_id.encode())
+                if data is not None:
+                    chunks[chunk_id] = data
+        return chunks
@@ -1,7 +1,7 @@
 """Document DB interaction module."""
 
 import os
-from typing import List, Dict, Tuple, Any
+from typing import TYPE_CHECKING, List, Dict, Tuple, Any
 import io
 import json
 from uuid import uuid4
@@ -9,13 +9,9 @@ from uuid import uuid4
 import pickle
 import zipfile
 
-import pandas as pd
-import pyarrow.parquet as pq
-import pyarrow as pa
-
 from bson import ObjectId
 from bson.json_util import dumps
-from pymongo import MongoClient, UpdateOne
+from pymongo import MongoClient, ReplaceOne, UpdateOne
 
 from flowcept.commons.daos.docdb_dao.docdb_dao_base import DocumentDBDAO
 from flowcept.commons.flowcept_dataclasses.workflow_object import (
@@ -25,11 +21,15 @@ from flowcept.commons.flowcept_logger import FlowceptLogger
 from flowcept.commons.flowcept_dataclasses.task_object import TaskObject
 from flowcept.commons.utils import perf_log, get_utc_now_str
 from flowcept.commons.vocabulary import Status
-from flowcept.configs import PERF_LOG, MONGO_CREATE_INDEX
+from flowcept.commons.self_metrics import METRICS
+from flowcept.configs import PERF_LOG, MONGO_CREATE_INDEX, SELF_METRICS_ENABLED
 from flowcept.flowceptor.consumers.consumer_utils import (
     curate_dict_task_messages,
 )
-from time import time
+from time import time, perf_counter
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class MongoDBDAO(DocumentDBDAO):
@@ -69,6 +69,8 @@ class MongoDBDAO(DocumentDBDAO):
         self._tasks_collection = self._db["tasks"]
         self._wfs_collection = self._db["workflows"]
         self._obj_collection = self._db["objects"]
+        self._aux_collections = {name: self._db[name] for name in DocumentDBDAO.AUXILIARY_COLLECTIONS}
+        self._chunks_collection = self._db["chunks"]
 
         if create_indices:
             self._create_indices()
@@ -107,6 +109,18 @@ class MongoDBDAO(DocumentDBDAO):
         if "campaign_id" not in existing_indices:
             self._obj_collection.create_index("campaign_id")
 
+        # Creating auxiliary collection indices:
+        for name, key_field in DocumentDBDAO.AUXILIARY_COLLECTIONS.items():
+            existing_indices = [list(x["key"].keys())[0] for x in self._aux_collections[name].list_indexes()]
+            if key_field not in existing_indices:
+                self._aux_collections[name].create_index(key_field, unique=True)
+        existing_indices = [list(x["key"].keys())[0] for x in self._aux_collections["telemetry"].list_indexes()]
+        if "series_id" not in existing_indices:
+            self._aux_collections["telemetry"].create_index("series_id")
+        existing_indices = [list(x["key"].keys())[0] for x in self._chunks_collection.list_indexes()]
+        if "chunk_id" not in existing_indices:
+            self._chunks_collection.create_index("chunk_id", unique=True)
+
     def _pipeline(
         self,
         filter: Dict = None,
@@ -217,6 +231,32 @@ class MongoDBDAO(DocumentDBDAO):
             self.logger.exception(e)
             return None
 
+    def upsert_docs(self, collection: str, docs: List[Dict]) -> bool:
+        """
+        Insert or replace documents of an auxiliary collection.
+
+        Parameters
+        ----------
+        collection : str
+            One of the `AUXILIARY_COLLECTIONS`.
+        docs : List[Dict]
+            Documents to insert or replace, keyed by the collection's key field.
+
+        Returns
+        -------
+        bool
+            True if the operation succeeds, False otherwise.
+        """
+        try:
+            key_field = DocumentDBDAO.AUXILIARY_COLLECTIONS[collection]
+            requests = [ReplaceOne({key_field: doc[key_field]}, doc, upsert=True) for doc in docs]
+            if requests:
+                self._aux_collections[collection].bulk_write(requests)
+            return True
+        except Exception as e:
+            self.logger.exception(e)
+            return False
+
     def insert_and_update_many_tasks(self, doc_list: List[Dict], indexing_key=None) -> bool:
         """
         Insert and update multiple task documents in the tasks collection.
@@ -249,7 +289,10 @@ class MongoDBDAO(DocumentDBDAO):
             t0 = 0
             if PERF_LOG:
                 t0 = time()
+            t_curate = perf_counter() if SELF_METRICS_ENABLED else 0
             indexed_buffer = curate_dict_task_messages(doc_list, indexing_key, t0)
+            if SELF_METRICS_ENABLED:
+                METRICS.histogram("docdb_curate_time").record(perf_counter() - t_curate)
             t1 = perf_log("doc_curate_dict_task_messages", t0)
             if len(indexed_buffer) == 0:
                 return False
@@ -478,7 +521,7 @@ class MongoDBDAO(DocumentDBDAO):
             self.logger.exception(e)
             return False
 
-    def to_df(self, collection="tasks", filter=None) -> pd.DataFrame:
+    def to_df(self, collection="tasks", filter=None) -> "pd.DataFrame":
         """
         Convert the contents of a MongoDB collection to a pandas DataFrame.
 
@@ -508,6 +551,8 @@ class MongoDBDAO(DocumentDBDAO):
             raise Exception(msg + "collections are currently available for this.")
         try:
             cursor = _collection.find(filter=filter)
+            import pandas as pd
+
             return pd.DataFrame(cursor)
         except Exception as e:
             self.logger.exception(e)
@@ -639,6 +684,27 @@ class MongoDBDAO(DocumentDBDAO):
             self.logger.exception(f"An error occurred: {e}")
             return None
 
+    def put_chunks(self, chunks: Dict[str, bytes]) -> int:
+        """Store content-addressed chunks, skipping those already stored."""
+        if not chunks:
+            return 0
+        stored = self._chunks_collection.find({"chunk_id": {"$in": list(chunks)}}, {"chunk_id": 1, "_id": 0})
+        stored = {doc["chunk_id"] for doc in stored}
+        # Upserts that do not overwrite, in case another process stores the same chunk meanwhile.
+        requests = [
+            UpdateOne({"chunk_id": chunk_id}, {"$setOnInsert": {"data": bytes(data)}}, upsert=True)
+            for chunk_id, data in chunks.items()
+            if chunk_id not in stored
+        ]
+        if requests:
+            self._chunks_collection.bulk_write(requests, ordered=False)
+        return len(requests)
+
+    def get_chunks(self, chunk_ids: List[str]) -> Dict[str, bytes]:
+        """Get content-addressed chunks."""
+        docs = self._chunks_collection.find({"chunk_id": {"$in": list(chunk_ids)}}, {"_id": 0})
+        return {doc["chunk_id"]: doc["data"] for doc in docs}
+
     def query(
         self,
         filter=None,
@@ -691,8 +757,17 @@ class MongoDBDAO(DocumentDBDAO):
             return self.workflow_query(filter, projection, limit, sort, remove_json_unserializables)
         elif collection == "objects":
             return self.object_query(filter)
+        elif collection in self._aux_collections:
+            try:
+                return list(self._aux_collections[collection].find(filter, {"_id": 0}, limit=limit or 0))
+            except Exception as e:
+                self.logger.exception(e)
+                return None
         else:
-            raise Exception(f"You used type={collection}, but MongoDB only stores tasks, workflows, and objects")
+            raise Exception(
+                f"You used type={collection}, but MongoDB only stores tasks, workflows, objects, and "
+                f"{', '.join(self._aux_collections)}"
+            )
 
     def task_query(
         self,
@@ -877,6 +952,8 @@ class MongoDBDAO(DocumentDBDAO):
         if not tables:
             return []
 
+        import pyarrow as pa
+
         # Reference schema: take from the first table
         reference_schema = tables[0].schema
 
@@ -913,6 +990,10 @@ class MongoDBDAO(DocumentDBDAO):
     def dump_tasks_to_file_recursive(self, workflow_id, output_file="tasks.parquet", max_depth=999, mapping=None):
         """Dump_tasks_to_file_recursive in MongoDB."""
         try:
+            import pandas as pd
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
             tasks = self.get_tasks_recursive(workflow_id, max_depth=max_depth, mapping=mapping)
             chunk_size = 100_000
             dict_fields = TaskObject.get_dict_field_names()
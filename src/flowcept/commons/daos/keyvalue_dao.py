@@ -1,7 +1,5 @@
 """Key value module."""
 
-from redis import Redis, ConnectionPool
-
 from flowcept.commons.flowcept_logger import FlowceptLogger
 from flowcept.configs import (
     KVDB_HOST,
@@ -27,6 +25,8 @@ class KeyValueDAO:
     @staticmethod
     def build_redis_conn_pool():
         """Utility function to build Redis connection."""
+        from redis import Redis, ConnectionPool
+
         pool = ConnectionPool(
             host=KVDB_HOST,
             port=KVDB_PORT,
@@ -45,6 +45,8 @@ class KeyValueDAO:
             self._initialized = True
             self.logger = FlowceptLogger()
             if KVDB_URI is not None:
+                from redis import Redis
+
                 # If a URI is provided, use it for connection
                 self.redis_conn = Redis.from_url(KVDB_URI)
             else:
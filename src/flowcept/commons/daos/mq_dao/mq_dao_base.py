@@ -1,24 +1,29 @@
 """MQ base module."""
 
 from abc import ABC, abstractmethod
+from time import perf_counter
 from typing import Union, List, Callable
 
 import msgpack
 
 import flowcept.commons
-from flowcept.commons.autoflush_buffer import AutoflushBuffer
+from flowcept.commons.autoflush_buffer import AutoflushBuffer, ThreadLocalAutoflushBuffer
 
 from flowcept.commons.daos.keyvalue_dao import KeyValueDAO
 
 from flowcept.commons.utils import chunked
 from flowcept.commons.flowcept_logger import FlowceptLogger
+from flowcept.commons.self_metrics import METRICS
 from flowcept.configs import (
     MQ_CHANNEL,
     JSON_SERIALIZER,
     MQ_BUFFER_SIZE,
     MQ_INSERTION_BUFFER_TIME,
+    MQ_PER_THREAD_BUFFERS,
+    MQ_MAX_THREAD_BACKLOG,
     MQ_CHUNK_SIZE,
     MQ_TYPE,
+    SELF_METRICS_ENABLED,
 )
 
 from flowcept.commons.utils import GenericJSONEncoder
@@ -68,15 +73,45 @@ class MQDao(ABC):
         self._adapter_settings = adapter_settings
         self._keyvalue_dao = KeyValueDAO()
         self._time_based_flushing_started = False
-        self.buffer: Union[AutoflushBuffer, List] = None
+        self.buffer: Union[AutoflushBuffer, ThreadLocalAutoflushBuffer, List] = None
+        self._publish_callbacks: List[Callable[[List], None]] = []
 
     @abstractmethod
     def _bulk_publish(self, buffer, channel=MQ_CHANNEL, serializer=msgpack.dumps):
         raise NotImplementedError()
 
+    def _serialize_buffer(self, buffer, serializer=msgpack.dumps) -> List[bytes]:
+        """Serialize the messages of a buffer, skipping (and logging) those that fail."""
+        t0 = perf_counter() if SELF_METRICS_ENABLED else 0
+        payloads = []
+        for message in buffer:
+            try:
+                payloads.append(serializer(message))
+            except Exception as e:
+                self.logger.exception(e)
+                self.logger.error("Some messages couldn't be flushed! Check the messages' contents!")
+                self.logger.error(f"Message that caused error: {message}")
+                if SELF_METRICS_ENABLED:
+                    METRICS.counter("mq_serialization_errors").inc()
+        if SELF_METRICS_ENABLED:
+            METRICS.histogram("mq_serialization_time").record(perf_counter() - t0)
+        return payloads
+
+    def add_publish_callback(self, callback: Callable[[List], None]):
+        """Call `callback` with each buffer about to be published, in the flushing thread."""
+        self._publish_callbacks.append(callback)
+
     def bulk_publish(self, buffer):
         """Publish it."""
+        for callback in self._publish_callbacks:
+            try:
+                callback(buffer)
+            except Exception as e:
+                self.logger.exception(e)
         # self.logger.info(f"Going to flush {len(buffer)} to MQ...")
+        if SELF_METRICS_ENABLED:
+            METRICS.gauge("mq_buffer_depth").set(len(buffer))
+            METRICS.counter("mq_messages_published").inc(len(buffer))
         if MQ_CHUNK_SIZE > 1:
             for chunk in chunked(buffer, MQ_CHUNK_SIZE):
                 self._bulk_publish(chunk)
@@ -132,11 +167,19 @@ class MQDao(ABC):
         if flowcept.configs.DB_FLUSH_MODE == "online":
             # msg = "Starting MQ time-based flushing! bundle: "
             # self.logger.debug(msg+f"{exec_bundle_id}; interceptor id: {interceptor_instance_id}")
-            self.buffer = AutoflushBuffer(
-                max_size=MQ_BUFFER_SIZE,
-                flush_interval=MQ_INSERTION_BUFFER_TIME,
-                flush_function=self.bulk_publish,
-            )
+            if MQ_PER_THREAD_BUFFERS:
+                self.buffer = ThreadLocalAutoflushBuffer(
+                    max_size=MQ_BUFFER_SIZE,
+                    flush_interval=MQ_INSERTION_BUFFER_TIME,
+                    flush_function=self.bulk_publish,
+                    max_backlog=MQ_MAX_THREAD_BACKLOG,
+                )
+            else:
+                self.buffer = AutoflushBuffer(
+                    max_size=MQ_BUFFER_SIZE,
+                    flush_interval=MQ_INSERTION_BUFFER_TIME,
+                    flush_function=self.bulk_publish,
+                )
             self.register_time_based_thread_init(interceptor_instance_id, exec_bundle_id)
             self._time_based_flushing_started = True
         else:
@@ -147,6 +190,11 @@ class MQDao(ABC):
             if self._time_based_flushing_started:
                 self.buffer.stop()
                 self._time_based_flushing_started = False
+                if isinstance(self.buffer, ThreadLocalAutoflushBuffer):
+                    stats = self.buffer.stats()
+                    dropped = stats["retired_dropped"] + sum(t["dropped"] for t in stats["threads"])
+                    if dropped:
+                        self.logger.warning(f"MQ per-thread buffers dropped {dropped} messages: {stats}")
             else:
                 self.logger.error("MQ time-based flushing is not started")
         else:
@@ -3,19 +3,20 @@
 from typing import Callable
 
 import msgpack
-import csv
-from time import time
+from time import time, perf_counter
 
 from confluent_kafka import Producer, Consumer, KafkaError
 from confluent_kafka.admin import AdminClient
 
 from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
+from flowcept.commons.self_metrics import METRICS
 from flowcept.commons.utils import perf_log
 from flowcept.configs import (
     MQ_CHANNEL,
     PERF_LOG,
     MQ_HOST,
     MQ_PORT,
+    SELF_METRICS_ENABLED,
 )
 
 
@@ -30,7 +31,6 @@ class MQDaoKafka(MQDao):
         }
         self._producer = Producer(self._kafka_conf)
         self._consumer = None
-        self.flush_events = []
 
     def subscribe(self):
         """Subscribe to the interception channel."""
@@ -68,32 +68,28 @@ class MQDaoKafka(MQDao):
 
     def send_message(self, message: dict, channel=MQ_CHANNEL, serializer=msgpack.dumps):
         """Send the message."""
+        t0 = perf_counter() if SELF_METRICS_ENABLED else 0
         self._producer.produce(channel, key=channel, value=serializer(message))
-        t1 = time()
         self._producer.flush()
-        t2 = time()
-        self.flush_events.append(["single",t1,t2,t2 - t1, len(str(message).encode())])
+        if SELF_METRICS_ENABLED:
+            METRICS.histogram("mq_send_message_rtt").record(perf_counter() - t0)
 
     def _bulk_publish(self, buffer, channel=MQ_CHANNEL, serializer=msgpack.dumps):
-        total = 0
-        for message in buffer:
+        self.logger.debug(f"Going to send Messages:\n\t[BEGIN_MSG]{buffer}\n[END_MSG]\t")
+        for payload in self._serialize_buffer(buffer, serializer):
             try:
-                self.logger.debug(f"Going to send Message:\n\t[BEGIN_MSG]{message}\n[END_MSG]\t")
-                self._producer.produce(channel, key=channel, value=serializer(message))
-                total += len(str(message).encode())
+                self._producer.produce(channel, key=channel, value=payload)
             except Exception as e:
                 self.logger.exception(e)
-                self.logger.error("Some messages couldn't be flushed! Check the messages' contents!")
-                self.logger.error(f"Message that caused error: {message}")
+                self.logger.error("Some messages couldn't be flushed!")
         t0 = 0
         if PERF_LOG:
             t0 = time()
         try:
-            t1 = time()
+            t1 = perf_counter() if SELF_METRICS_ENABLED else 0
             self._producer.flush()
-            t2 = time()
-            self.flush_events.append(["bulk", t1,t2,t2 - t1,total])
-
+            if SELF_METRICS_ENABLED:
+                METRICS.histogram("mq_publish_rtt").record(perf_counter() - t1)
             self.logger.info(f"Flushed {len(buffer)} msgs to MQ!")
         except Exception as e:
             self.logger.exception(e)
@@ -109,20 +105,10 @@ class MQDaoKafka(MQDao):
         except Exception as e:
             self.logger.exception(e)
             return False
-    
-    def stop(self,interceptor_instance_id: str, bundle_exec_id: int = None):
-        t1 = time()
-        super().stop(interceptor_instance_id, bundle_exec_id)
-        t2 = time()
-        self.flush_events.append(["final", t1, t2, t2 - t1,'n/a'])
 
-        
-        with open(f"kafka_{interceptor_instance_id}_flush_events.csv", "w", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow(["type", "start","end","duration","size"])
-            writer.writerows(self.flush_events)
-        
+    def stop(self, interceptor_instance_id: str, bundle_exec_id: int = None):
+        """Stop it."""
+        super().stop(interceptor_instance_id, bundle_exec_id)
         # lets consumer know when to stop
-        
         self._producer.produce(MQ_CHANNEL, key=MQ_CHANNEL, value=msgpack.dumps({"message":"stop-now"}))  # using metadata to send data
         self._producer.flush()
@@ -2,16 +2,16 @@ import uuid
 from typing import Callable
 
 import msgpack
-from time import time
+from time import time, perf_counter
 import json
-import csv
 
 import mochi.mofka.client as mofka
 from mochi.mofka.client import ThreadPool, AdaptiveBatchSize
 
 from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
+from flowcept.commons.self_metrics import METRICS
 from flowcept.commons.utils import perf_log
-from flowcept.configs import PERF_LOG, MQ_SETTINGS, MQ_CHANNEL
+from flowcept.configs import PERF_LOG, MQ_SETTINGS, MQ_CHANNEL, SELF_METRICS_ENABLED
 
 
 class MQDaoMofka(MQDao):
@@ -23,7 +23,6 @@ class MQDaoMofka(MQDao):
     def __init__(self, adapter_settings=None, with_producer=True):
         super().__init__(adapter_settings=adapter_settings)
         self.producer = None
-        self.flush_events = []
         if with_producer:
             print("Starting producer")
             self.producer = MQDaoMofka._topic.producer(
@@ -57,24 +56,21 @@ class MQDaoMofka(MQDao):
 
     def send_message(self, message: dict, channel=MQ_CHANNEL, serializer=msgpack.dumps):
         """Send a single message to Mofka."""
-
+        t0 = perf_counter() if SELF_METRICS_ENABLED else 0
         self.producer.push(metadata=message)  # using metadata to send data
-        t1 = time()
         self.producer.flush()
-        t2 = time()
-        self.flush_events.append(["single",t1,t2,t2 - t1, len(str(message).encode())])
-        
-    
+        if SELF_METRICS_ENABLED:
+            METRICS.histogram("mq_send_message_rtt").record(perf_counter() - t0)
 
     def _bulk_publish(self, buffer, channel=MQ_CHANNEL, serializer=msgpack.dumps):
-        total = 0
         try:
             self.logger.debug(f"Going to send Message:\n\t[BEGIN_MSG]{buffer}\n[END_MSG]\t")
-           
+            # Mofka serializes the metadata itself, so pushing is the serialization time here.
+            t1 = perf_counter() if SELF_METRICS_ENABLED else 0
             for m in buffer:
                 self.producer.push(m)
-                total += len(str(m).encode())
-
+            if SELF_METRICS_ENABLED:
+                METRICS.histogram("mq_serialization_time").record(perf_counter() - t1)
         except Exception as e:
             self.logger.exception(e)
             self.logger.error("Some messages couldn't be flushed! Check the messages' contents!")
@@ -83,11 +79,10 @@ class MQDaoMofka(MQDao):
         if PERF_LOG:
             t0 = time()
         try:
-            t1 = time()
+            t1 = perf_counter() if SELF_METRICS_ENABLED else 0
             self.producer.flush()
-            t2 = time()
-            self.flush_events.append(["bulk", t1,t2,t2 - t1,total])
-
+            if SELF_METRICS_ENABLED:
+                METRICS.histogram("mq_publish_rtt").record(perf_counter() - t1)
             self.logger.info(f"Flushed {len(buffer)} msgs to MQ!")
         except Exception as e:
             self.logger.exception(e)
@@ -97,18 +92,9 @@ class MQDaoMofka(MQDao):
         """Test Mofka Liveness."""
         return True
 
-    def stop(self,interceptor_instance_id: str, bundle_exec_id: int = None):
-        t1 = time()
+    def stop(self, interceptor_instance_id: str, bundle_exec_id: int = None):
+        """Stop it."""
         super().stop(interceptor_instance_id, bundle_exec_id)
-        t2 = time()
-        self.flush_events.append(["final", t1, t2, t2 - t1,'n/a'])
-
-        
-        with open(f"mofka_{interceptor_instance_id}_flush_events.csv", "w", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow(["type", "start","end","duration","size"])
-            writer.writerows(self.flush_events)
-        
         # lets consumer know when to stop
         self.producer.push(metadata={"message":"stop-now"})  # using metadata to send data
         self.producer.flush()
@@ -4,14 +4,15 @@ from typing import Callable
 import redis
 
 import msgpack
-import csv
-from time import time, sleep
+from time import time, sleep, perf_counter
 
 from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
+from flowcept.commons.self_metrics import METRICS
 from flowcept.commons.utils import perf_log
 from flowcept.configs import (
     MQ_CHANNEL,
     PERF_LOG,
+    SELF_METRICS_ENABLED,
 )
 
 
@@ -24,8 +25,6 @@ class MQDaoRedis(MQDao):
         super().__init__(adapter_settings)
         self._producer = self._keyvalue_dao.redis_conn  # if MQ is redis, we use the same KV for the MQ
         self._consumer = None
-        self.flush_events = []
-        
 
     def subscribe(self):
         """
@@ -63,30 +62,23 @@ class MQDaoRedis(MQDao):
 
     def send_message(self, message: dict, channel=MQ_CHANNEL, serializer=msgpack.dumps):
         """Send the message."""
-        t1 = time()
+        t0 = perf_counter() if SELF_METRICS_ENABLED else 0
         self._producer.publish(channel, serializer(message))
-        t2 = time()
-        self.flush_events.append(["single",t1,t2,t2 - t1, len(str(message).encode())])
+        if SELF_METRICS_ENABLED:
+            METRICS.histogram("mq_send_message_rtt").record(perf_counter() - t0)
 
     def _bulk_publish(self, buffer, channel=MQ_CHANNEL, serializer=msgpack.dumps):
-        total = 0
         pipe = self._producer.pipeline()
-        for message in buffer:
-            try:
-                total += len(str(message).encode())
-                pipe.publish(MQ_CHANNEL, serializer(message))
-            except Exception as e:
-                self.logger.exception(e)
-                self.logger.error("Some messages couldn't be flushed! Check the messages' contents!")
-                self.logger.error(f"Message that caused error: {message}")
+        for payload in self._serialize_buffer(buffer, serializer):
+            pipe.publish(MQ_CHANNEL, payload)
         t0 = 0
         if PERF_LOG:
             t0 = time()
         try:
-            t1 = time()
+            t1 = perf_counter() if SELF_METRICS_ENABLED else 0
             pipe.execute()
-            t2 = time()
-            self.flush_events.append(["bulk", t1,t2,t2 - t1,total])
+            if SELF_METRICS_ENABLED:
+                METRICS.histogram("mq_publish_rtt").record(perf_counter() - t1)
             self.logger.debug(f"Flushed {len(buffer)} msgs to MQ!")
         except Exception as e:
             self.logger.exception(e)
@@ -101,17 +93,8 @@ class MQDaoRedis(MQDao):
             self.logger.exception(e)
             return False
 
-    def stop(self,interceptor_instance_id: str, bundle_exec_id: int = None):
-        t1 = time()
+    def stop(self, interceptor_instance_id: str, bundle_exec_id: int = None):
+        """Stop it."""
         super().stop(interceptor_instance_id, bundle_exec_id)
-        t2 = time()
-        self.flush_events.append(["final", t1, t2, t2 - t1,'n/a'])
-
-        
-        with open(f"redis_{interceptor_instance_id}_redis_flush_events.csv", "w", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow(["type", "start","end","duration","size"])
-            writer.writerows(self.flush_events)
-        
         # lets consumer know when to stop
         self._producer.publish(MQ_CHANNEL, msgpack.dumps({"message":"stop-now"}))
@@ -7,7 +7,7 @@ import flowcept
 from flowcept.commons.flowcept_dataclasses.telemetry import Telemetry
 from flowcept.commons.vocabulary import Status
 from flowcept.configs import (
-    HOSTNAME,
+    get_hostname,
     PRIVATE_IP,
     PUBLIC_IP,
     LOGIN_NAME,
@@ -58,7 +58,6 @@ class TaskObject:
         "login_name": LOGIN_NAME,
         "public_ip": PUBLIC_IP,
         "private_ip": PRIVATE_IP,
-        "hostname": HOSTNAME,
     }
 
     @staticmethod
@@ -115,8 +114,8 @@ class TaskObject:
         if self.private_ip is None and PRIVATE_IP is not None:
             self.private_ip = PRIVATE_IP
 
-        if self.hostname is None and HOSTNAME is not None:
-            self.hostname = HOSTNAME
+        if self.hostname is None:
+            self.hostname = get_hostname()
 
     def to_dict(self):
         """Convert to dictionary."""
@@ -144,6 +143,8 @@ class TaskObject:
         for key, fallback_value in TaskObject._DEFAULT_ENRICH_VALUES.items():
             if (key not in task_dict or task_dict[key] is None) and fallback_value is not None:
                 task_dict[key] = fallback_value
+        if task_dict.get("hostname", None) is None:
+            task_dict["hostname"] = get_hostname()
 
     # @staticmethod
     # def deserialize(serialized_data) -> 'TaskObject':
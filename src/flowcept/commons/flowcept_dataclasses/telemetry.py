@@ -105,3 +105,27 @@ class Telemetry:
             ret["gpu"] = self.gpu
 
         return ret
+
+
+class TelemetrySnapshotRef:
+    """Reference to a snapshot taken by a telemetry sampler.
+
+    It is what ``TelemetryCapture.capture`` returns in the by-reference sampling mode. Each
+    referenced snapshot is published once, as a ``telemetry_snapshot`` message, and the
+    consumer replaces the references in the tasks with the snapshot values.
+    """
+
+    __slots__ = ("series_id", "sample_index")
+
+    def __init__(self, series_id: str, sample_index: int):
+        self.series_id = series_id
+        self.sample_index = sample_index
+
+    def to_dict(self):
+        """Convert to dictionary."""
+        return {"series_id": self.series_id, "sample_index": self.sample_index}
+
+    @staticmethod
+    def is_ref(value) -> bool:
+        """Check whether a task's telemetry field holds a snapshot reference."""
+        return isinstance(value, dict) and len(value) == 2 and "series_id" in value and "sample_index" in value
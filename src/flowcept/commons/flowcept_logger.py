@@ -7,13 +7,21 @@ from flowcept.configs import (
     LOG_FILE_PATH,
     LOG_STREAM_LEVEL,
     LOG_FILE_LEVEL,
-    HOSTNAME,
+    get_hostname,
 )
 
-_fmt = f"[%(name)s][%(levelname)s][{HOSTNAME}][pid=%(process)d]"
+_fmt = "[%(name)s][%(levelname)s][%(hostname)s][pid=%(process)d]"
 _BASE_FORMAT = _fmt + "[thread=%(thread)d][function=%(funcName)s][%(message)s]"
 
 
+class _HostnameFilter(logging.Filter):
+    """Add the hostname to the records, resolving it only when a record is actually emitted."""
+
+    def filter(self, record):
+        record.hostname = get_hostname()
+        return True
+
+
 class FlowceptLogger(object):
     """Logger class."""
 
@@ -34,6 +42,7 @@ class FlowceptLogger(object):
             stream_handler.setLevel(stream_level)
             stream_format = logging.Formatter(_BASE_FORMAT)
             stream_handler.setFormatter(stream_format)
+            stream_handler.addFilter(_HostnameFilter())
             logger.addHandler(stream_handler)
 
         if file_level <= logging.CRITICAL:
@@ -41,6 +50,7 @@ class FlowceptLogger(object):
             file_handler.setLevel(file_level)
             file_format = logging.Formatter(f"[%(asctime)s]{_BASE_FORMAT}")
             file_handler.setFormatter(file_format)
+            file_handler.addFilter(_HostnameFilter())
             logger.addHandler(file_handler)
 
         logger.debug(f"{PROJECT_NAME}'s base log is set up!")
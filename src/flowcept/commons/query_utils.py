@@ -2,10 +2,10 @@
 
 import numbers
 from datetime import timedelta
-from typing import List, Dict
-
-import pandas as pd
+from typing import Iterable, Iterator, List, Dict
 
+from flowcept.commons.flowcept_dataclasses.telemetry import TelemetrySnapshotRef
+from flowcept.commons.telemetry_series import telemetry_diffs
 from flowcept.commons.vocabulary import Status
 
 
@@ -28,6 +28,8 @@ def get_doc_status(row):
 def to_datetime(logger, df, column_name, _shift_hours=0):
     """Convert to datetime."""
     if column_name in df.columns:
+        import pandas as pd
+
         try:
             df[column_name] = pd.to_datetime(df[column_name], unit="s") + timedelta(hours=_shift_hours)
         except Exception as _e:
@@ -54,9 +56,58 @@ def _calc_telemetry_diff_for_row(start, end):
         raise Exception("This is unexpected", start, end, type(start), type(end))
 
 
-def calculate_telemetry_diff_for_docs(docs: List[Dict]):
-    """Calculate telemetry difference."""
+ITERATION_BLOCK = "iteration_block"
+
+
+def iter_expanded_tasks(docs: Iterable[Dict]) -> Iterator[Dict]:
+    """
+    Iterate over task docs, expanding stored ``task_block`` docs into their iteration tasks.
+
+    Blocks are stored as single docs (``subtype="iteration_block"``) when
+    ``db_buffer.expand_task_blocks`` is disabled. Each block is expanded only when the
+    iteration reaches it, so a query over many blocks does not materialize all their tasks.
+
+    Parameters
+    ----------
+    docs : iterable of dict
+        Task docs, as returned by a task query.
+
+    Yields
+    ------
+    dict
+        The docs that are not blocks, as they are, and the iteration tasks of the blocks, with
+        the same task ids as if the blocks had been expanded when stored.
+    """
+    from flowcept.flowceptor.consumers.consumer_utils import expand_task_block
+
+    for doc in docs:
+        if doc.get("subtype") == ITERATION_BLOCK and "columns" in doc:
+            block = {k: v for k, v in doc.items() if k != "_id"}
+            yield from expand_task_block(block)
+        else:
+            yield doc
+
+
+def get_telemetry_series_ids(docs: List[Dict]) -> List[str]:
+    """Get the telemetry series referenced by delta-encoded task docs."""
+    series_ids = set()
+    for doc in docs:
+        for field in ("telemetry_at_start", "telemetry_at_end"):
+            ref = doc.get(field)
+            if TelemetrySnapshotRef.is_ref(ref):
+                series_ids.add(ref["series_id"])
+    return sorted(series_ids)
+
+
+def calculate_telemetry_diff_for_docs(docs: List[Dict], telemetry_blocks: List[Dict] = None):
+    """Calculate telemetry difference.
+
+    Docs whose telemetry fields are ``TelemetrySnapshotRef`` references get their
+    differences reconstructed, in a vectorized way, from `telemetry_blocks` (the
+    ``telemetry`` collection documents of their series).
+    """
     new_docs = []
+    ref_docs = []
     for doc in docs:
         new_doc = doc.copy()
         telemetry_start = new_doc.get("telemetry_at_start")
@@ -64,10 +115,23 @@ def calculate_telemetry_diff_for_docs(docs: List[Dict]):
         if telemetry_start is None or telemetry_end is None:
             new_docs.append(new_doc)
             continue
+        if TelemetrySnapshotRef.is_ref(telemetry_start) or TelemetrySnapshotRef.is_ref(telemetry_end):
+            ref_docs.append(new_doc)
+            new_docs.append(new_doc)
+            continue
         new_telemetry = dict()
         for key in telemetry_start:
             new_telemetry[key] = _calc_telemetry_diff_for_row(telemetry_start[key], telemetry_end[key])
         new_doc["telemetry_diff"] = new_telemetry
         new_docs.append(new_doc)
 
+    if ref_docs and telemetry_blocks:
+        diffs = telemetry_diffs(
+            [doc["telemetry_at_start"] for doc in ref_docs],
+            [doc["telemetry_at_end"] for doc in ref_docs],
+            telemetry_blocks,
+        )
+        for doc, diff in zip(ref_docs, diffs):
+            if diff is not None:
+                doc["telemetry_diff"] = diff
     return new_docs
@@ -0,0 +1,311 @@
+"""Self-instrumentation module.
+
+Flowcept records its own overhead (e.g., enqueue latency, serialization time, publish round
+trips, consumer lag, and database write time) into a process-wide ``MetricsRegistry`` of
+counters, gauges, and histograms. While at least one publisher is registered, a
+``MetricsExporter`` thread periodically exports the registry as a ``flowcept_metrics``
+message, which is stored in the ``metrics`` collection, and optionally appends it to a local
+JSON lines file. Recording is guarded by ``SELF_METRICS_ENABLED`` at the call sites, so it
+costs nothing when disabled.
+"""
+
+import json
+import os
+from threading import Event, Lock, Thread
+from time import time
+from typing import Callable, Dict, List
+from uuid import uuid4
+
+from flowcept.commons.flowcept_logger import FlowceptLogger
+from flowcept.configs import (
+    SELF_METRICS_FILE_PATH,
+    SELF_METRICS_INTERVAL,
+    get_hostname,
+)
+
+
+class Counter:
+    """Monotonic counter."""
+
+    __slots__ = ("name", "_value", "_lock")
+
+    def __init__(self, name: str):
+        self.name = name
+        self._value = 0
+        self._lock = Lock()
+
+    def inc(self, n: int = 1):
+        """Increment it."""
+        with self._lock:
+            self._value += n
+
+    @property
+    def value(self) -> int:
+        """Get the current value."""
+        return self._value
+
+
+class Gauge:
+    """Last observed value of something, e.g., a buffer depth."""
+
+    __slots__ = ("name", "value")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.value = None
+
+    def set(self, value: float):
+        """Set it."""
+        self.value = value
+
+
+class Histogram:
+    """HDR histogram of non-negative integer values.
+
+    Values are counted in log-linear buckets: each power of two is split into
+    ``2 ** sub_bucket_bits / 2`` linear sub-buckets, so the relative error of any reported
+    value is below ``2 / 2 ** sub_bucket_bits`` regardless of its magnitude. Buckets are
+    kept sparse, so the histogram only costs memory for the ranges actually observed.
+    Durations are recorded in microseconds.
+
+    Parameters
+    ----------
+    name : str
+        The metric name.
+    sub_bucket_bits : int, optional
+        Defaults to 8, i.e., two significant decimal digits.
+    """
+
+    PERCENTILES = {"p50": 50, "p90": 90, "p99": 99, "p999": 99.9}
+
+    def __init__(self, name: str, sub_bucket_bits: int = 8):
+        self.name = name
+        self._sub_bucket_bits = sub_bucket_bits
+        self._sub_bucket_mask = (1 << sub_bucket_bits) - 1
+        self._lock = Lock()
+        self._reset()
+
+    def _reset(self):
+        self._counts: Dict[int, int] = {}
+        self._count = 0
+        self._sum = 0
+        self._min = None
+        self._max = None
+
+    def record_value(self, value: int):
+        """Record an integer value."""
+        value = max(0, int(value))
+        bucket = max(0, (value | self._sub_bucket_mask).bit_length() - self._sub_bucket_bits)
+        key = (bucket << self._sub_bucket_bits) | (value >> bucket)
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+            self._count += 1
+            self._sum += value
+            if self._min is None or value < self._min:
+                self._min = value
+            if self._max is None or value > self._max:
+                self._max = value
+
+    def record(self, seconds: float):
+        """Record a duration given in seconds."""
+        self.record_value(seconds * 1_000_000)
+
+    def _value_of(self, key: int) -> int:
+        # The middle of the range of values counted under this key.
+        bucket = key >> self._sub_bucket_bits
+        return ((key & self._sub_bucket_mask) << bucket) + ((1 << bucket) >> 1)
+
+    def snapshot(self, reset: bool = False) -> Dict:
+        """
+        Get the count, sum, min, max, mean, and percentiles of the recorded values.
+
+        Parameters
+        ----------
+        reset : bool, optional
+            Whether to clear the histogram afterwards, so that the next snapshot only
+            covers the values recorded after this one.
+
+        Returns
+        -------
+        dict
+            ``{"count", "sum", "min", "max", "mean", "p50", "p90", "p99", "p999"}``.
+        """
+        with self._lock:
+            counts, count, total, _min, _max = self._counts, self._count, self._sum, self._min, self._max
+            if reset:
+                self._reset()
+        summary = {"count": count, "sum": total, "min": _min, "max": _max, "mean": total / count if count else None}
+        keys = sorted(counts)
+        seen, i = 0, 0
+        for field, p in Histogram.PERCENTILES.items():
+            if not count:
+                summary[field] = None
+                continue
+            target = max(1, round(count * p / 100))
+            while seen + counts[keys[i]] < target:
+                seen += counts[keys[i]]
+                i += 1
+            summary[field] = min(max(self._value_of(keys[i]), _min), _max)
+        return summary
+
+
+class MetricsRegistry:
+    """Named counters, gauges, and histograms of one process."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._counters: Dict[str, Counter] = {}
+        self._gauges: Dict[str, Gauge] = {}
+        self._histograms: Dict[str, Histogram] = {}
+
+    def _get(self, metrics: Dict, name: str, cls):
+        metric = metrics.get(name, None)
+        if metric is None:
+            with self._lock:
+                metric = metrics.setdefault(name, cls(name))
+        return metric
+
+    def counter(self, name: str) -> Counter:
+        """Get or create a counter."""
+        return self._get(self._counters, name, Counter)
+
+    def gauge(self, name: str) -> Gauge:
+        """Get or create a gauge."""
+        return self._get(self._gauges, name, Gauge)
+
+    def histogram(self, name: str) -> Histogram:
+        """Get or create a histogram."""
+        return self._get(self._histograms, name, Histogram)
+
+    def snapshot(self, reset_histograms: bool = True) -> Dict:
+        """
+        Get the current value of all metrics.
+
+        Parameters
+        ----------
+        reset_histograms : bool, optional
+            Whether to clear the histograms, so that each snapshot covers the interval since
+            the previous one. Counters are always cumulative. Defaults to True.
+
+        Returns
+        -------
+        dict
+            ``{"counters": {name: int}, "gauges": {name: value}, "histograms": {name: dict}}``,
+            with only the metrics that were updated at least once.
+        """
+        with self._lock:
+            counters = list(self._counters.values())
+            gauges = list(self._gauges.values())
+            histograms = list(self._histograms.values())
+        summaries = {h.name: h.snapshot(reset=reset_histograms) for h in histograms}
+        return {
+            "counters": {c.name: c.value for c in counters if c.value},
+            "gauges": {g.name: g.value for g in gauges if g.value is not None},
+            "histograms": {name: summary for name, summary in summaries.items() if summary["count"]},
+        }
+
+
+METRICS = MetricsRegistry()
+
+
+class MetricsExporter:
+    """Thread that periodically exports the registry as ``flowcept_metrics`` messages.
+
+    Several components of a process (e.g., interceptors and a document inserter) may
+    register a publisher, but each export goes to the first one only, so it is stored once.
+    The thread runs while at least one publisher is registered, and the last publisher to
+    leave receives a final export.
+
+    Parameters
+    ----------
+    registry : MetricsRegistry
+        The registry to export.
+    interval : float
+        Seconds between exports.
+    file_path : str, optional
+        If set, each export is also appended to this JSON lines file. ``{pid}`` is replaced
+        by the process id.
+    """
+
+    def __init__(self, registry: MetricsRegistry, interval: float, file_path: str = None):
+        self._registry = registry
+        self._interval = interval
+        self._file_path = file_path.format(pid=os.getpid()) if file_path else None
+        self._publishers: List[Callable[[Dict], None]] = []
+        self._lock = Lock()
+        self._stop_event = Event()
+        self._thread: Thread = None
+        self._last_export = time()
+        self.logger = FlowceptLogger()
+
+    def build_message(self) -> Dict:
+        """Build a ``flowcept_metrics`` message with the metrics since the last export."""
+        now = time()
+        msg = {
+            "type": "flowcept_metrics",
+            "metrics_id": str(uuid4()),
+            "hostname": get_hostname(),
+            "pid": os.getpid(),
+            "started_at": self._last_export,
+            "ended_at": now,
+        }
+        self._last_export = now
+        msg.update(self._registry.snapshot())
+        return msg
+
+    def export(self, publisher: Callable[[Dict], None] = None):
+        """Export the registry now, to `publisher` or else to the first registered publisher."""
+        msg = self.build_message()
+        if self._file_path:
+            try:
+                with open(self._file_path, "a") as f:
+                    f.write(json.dumps(msg) + "\n")
+            except Exception as e:
+                self.logger.exception(e)
+        with self._lock:
+            publisher = publisher or (self._publishers[0] if self._publishers else None)
+        if publisher is not None:
+            try:
+                publisher(msg)
+            except Exception as e:
+                self.logger.exception(e)
+
+    def _export_loop(self):
+        while not self._stop_event.wait(self._interval):
+            self.export()
+
+    def add_publisher(self, publisher: Callable[[Dict], None]):
+        """Register a publisher, starting the export thread if it is the first one."""
+        with self._lock:
+            self._publishers.append(publisher)
+            if self._thread is None:
+                self._stop_event.clear()
+                self._thread = Thread(target=self._export_loop, daemon=True)
+                self._thread.start()
+
+    def remove_publisher(self, publisher: Callable[[Dict], None]):
+        """Unregister a publisher. The last one gets a final export and stops the thread."""
+        with self._lock:
+            if publisher not in self._publishers:
+                return
+            self._publishers.remove(publisher)
+            thread = None
+            if not self._publishers:
+                thread, self._thread = self._thread, None
+                self._stop_event.set()
+        if thread is not None:
+            thread.join()
+            self.export(publisher)
+
+
+_exporter: MetricsExporter = None
+_exporter_lock = Lock()
+
+
+def get_metrics_exporter() -> MetricsExporter:
+    """Get the exporter of this process' registry."""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = MetricsExporter(METRICS, SELF_METRICS_INTERVAL, SELF_METRICS_FILE_PATH)
+        return _exporter
@@ -0,0 +1,163 @@
+"""Frozen settings snapshot module.
+
+A launcher process freezes its parsed settings once, and the processes it starts (Dask
+workers, MPI ranks, multiprocessing children) load the snapshot with a single read instead
+of looking up and parsing the settings file, which is costly when thousands of processes
+start at once on a parallel filesystem. The snapshot reference is passed through the
+``FLOWCEPT_SETTINGS_SNAPSHOT`` environment variable, which ``flowcept.configs`` checks
+before anything else. A reference is one of:
+
+- ``b64:<payload>``: the snapshot itself, inline in the environment variable;
+- ``file:<path>``: a snapshot file, preferably on a node-local filesystem;
+- ``shm:<name>``: a shared memory block created by the launcher.
+"""
+
+import base64
+import os
+import struct
+import sys
+from typing import Dict, Tuple
+
+import msgpack
+
+SNAPSHOT_ENV_VAR = "FLOWCEPT_SETTINGS_SNAPSHOT"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_TARGETS = ("env", "file", "shm")
+
+_LENGTH = struct.Struct("<I")
+_shm_blocks = []  # Blocks created by this process, kept mapped until released.
+
+
+def encode_snapshot(settings: Dict, settings_path: str = None) -> bytes:
+    """Encode parsed settings, and the path they were read from, into a snapshot."""
+    return msgpack.dumps({"version": SNAPSHOT_VERSION, "settings_path": settings_path, "settings": settings})
+
+
+def decode_snapshot(payload: bytes) -> Tuple[Dict, str]:
+    """
+    Decode a snapshot.
+
+    Parameters
+    ----------
+    payload : bytes
+        A snapshot made by ``encode_snapshot``.
+
+    Returns
+    -------
+    tuple
+        The parsed settings and the path they were read from.
+
+    Raises
+    ------
+    ValueError
+        If the snapshot was made by an incompatible Flowcept version.
+    """
+    snapshot = msgpack.loads(payload, strict_map_key=False)
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported settings snapshot version: {snapshot.get('version')}.")
+    return snapshot["settings"], snapshot["settings_path"]
+
+
+def _read_shm(name: str) -> bytes:
+    shm_file = os.path.join("/dev/shm", name.lstrip("/"))
+    if os.path.exists(shm_file):
+        # On Linux, the block is a file in /dev/shm. Reading it directly does not register
+        # the block with this process' resource tracker, which would unlink it at exit.
+        with open(shm_file, "rb") as f:
+            data = f.read()
+    else:
+        from multiprocessing.shared_memory import SharedMemory
+
+        kwargs = {"track": False} if sys.version_info >= (3, 13) else {}
+        shm = SharedMemory(name=name, **kwargs)
+        data = bytes(shm.buf)
+        shm.close()
+    (size,) = _LENGTH.unpack_from(data, 0)
+    return data[_LENGTH.size : _LENGTH.size + size]
+
+
+def load_settings_snapshot(ref: str) -> Tuple[Dict, str]:
+    """
+    Load a settings snapshot from its reference.
+
+    Parameters
+    ----------
+    ref : str
+        A reference returned by ``freeze_settings``.
+
+    Returns
+    -------
+    tuple
+        The parsed settings and the path they were read from.
+    """
+    kind, _, location = ref.partition(":")
+    if kind == "b64":
+        payload = base64.b64decode(location)
+    elif kind == "file":
+        with open(location, "rb") as f:
+            payload = f.read()
+    elif kind == "shm":
+        payload = _read_shm(location)
+    else:
+        raise ValueError(f"Invalid settings snapshot reference: {ref[:32]}")
+    return decode_snapshot(payload)
+
+
+def freeze_settings(target: str = "env", path: str = None, export: bool = True) -> str:
+    """
+    Freeze the settings of this process so that the processes it starts load them from a snapshot.
+
+    Parameters
+    ----------
+    target : str, optional
+        Where to store the snapshot: ``env`` (default) inlines it in the reference, ``file``
+        writes it to `path`, and ``shm`` copies it into a shared memory block, which lives
+        until ``release_settings_snapshots`` is called or this process exits.
+    path : str, optional
+        The snapshot file path. Required if `target` is ``file``.
+    export : bool, optional
+        Whether to set the ``FLOWCEPT_SETTINGS_SNAPSHOT`` environment variable of this
+        process, so that it is inherited by its children. Defaults to True.
+
+    Returns
+    -------
+    str
+        The snapshot reference, to be set as ``FLOWCEPT_SETTINGS_SNAPSHOT`` in the
+        environment of processes not started by this one (e.g., through ``mpirun -x``).
+    """
+    from flowcept import configs
+
+    payload = encode_snapshot(configs.settings, getattr(configs, "SETTINGS_PATH", None))
+    if target == "env":
+        ref = "b64:" + base64.b64encode(payload).decode()
+    elif target == "file":
+        if path is None:
+            raise ValueError("A path is required to freeze the settings into a file.")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        ref = "file:" + os.path.abspath(path)
+    elif target == "shm":
+        from multiprocessing.shared_memory import SharedMemory
+
+        shm = SharedMemory(create=True, size=_LENGTH.size + len(payload))
+        _LENGTH.pack_into(shm.buf, 0, len(payload))
+        shm.buf[_LENGTH.size : _LENGTH.size + len(payload)] = payload
+        _shm_blocks.append(shm)
+        ref = "shm:" + shm.name
+    else:
+        raise ValueError(f"Invalid settings snapshot target: {target}. Use one of {SNAPSHOT_TARGETS}.")
+    if export:
+        os.environ[SNAPSHOT_ENV_VAR] = ref
+    return ref
+
+
+def release_settings_snapshots():
+    """Destroy the shared memory snapshots created by this process and stop exporting them."""
+    if os.environ.get(SNAPSHOT_ENV_VAR, "").startswith("shm:"):
+        del os.environ[SNAPSHOT_ENV_VAR]
+    while _shm_blocks:
+        shm = _shm_blocks.pop()
+        shm.close()
+        shm.unlink()
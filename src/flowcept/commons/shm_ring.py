@@ -0,0 +1,148 @@
+"""Shared memory ring module."""
+
+import struct
+from multiprocessing import Lock
+from multiprocessing.shared_memory import SharedMemory
+from typing import List
+
+_HEADER = struct.Struct("<QQQ")  # head, tail, dropped; all are byte offsets/counters
+_DATA_OFFSET = 64
+_LENGTH = struct.Struct("<I")
+
+
+class SharedMemoryRing:
+    """Multi-producer, single-consumer byte ring in shared memory.
+
+    The ring is created in the parent process and inherited by forked children, which
+    write length-prefixed records into it. A single reader, in the parent, drains all
+    pending records at once. Writers never block on the reader: when the ring is full,
+    ``write`` returns False and the caller decides whether to retry or drop.
+
+    Parameters
+    ----------
+    capacity : int
+        Size in bytes of the data area.
+    """
+
+    def __init__(self, capacity: int):
+        self._capacity = capacity
+        self._shm = SharedMemory(create=True, size=_DATA_OFFSET + capacity)
+        self._buf = self._shm.buf
+        _HEADER.pack_into(self._buf, 0, 0, 0, 0)
+        self._lock = Lock()
+
+    @property
+    def name(self) -> str:
+        """Get the shared memory block name."""
+        return self._shm.name
+
+    @property
+    def capacity(self) -> int:
+        """Get the data area size in bytes."""
+        return self._capacity
+
+    @property
+    def dropped(self) -> int:
+        """Get the number of records dropped by writers."""
+        return _HEADER.unpack_from(self._buf, 0)[2]
+
+    def _copy_in(self, pos: int, data: bytes):
+        first = min(len(data), self._capacity - pos)
+        start = _DATA_OFFSET + pos
+        self._buf[start : start + first] = data[:first]
+        if first < len(data):
+            self._buf[_DATA_OFFSET : _DATA_OFFSET + len(data) - first] = data[first:]
+
+    def _copy_out(self, pos: int, size: int) -> bytes:
+        first = min(size, self._capacity - pos)
+        start = _DATA_OFFSET + pos
+        data = bytes(self._buf[start : start + first])
+        if first < size:
+            data += bytes(self._buf[_DATA_OFFSET : _DATA_OFFSET + size - first])
+        return data
+
+    def write(self, payload: bytes, timeout: float = -1) -> bool:
+        """
+        Write one record.
+
+        Parameters
+        ----------
+        payload : bytes
+            The record.
+        timeout : float, optional
+            Max seconds to wait for the ring lock. Negative (default) waits forever.
+
+        Returns
+        -------
+        bool
+            False if the record does not fit in the free space (or the lock could not be
+            acquired in time), True otherwise.
+        """
+        record = _LENGTH.pack(len(payload)) + payload
+        if len(record) > self._capacity or not self._lock.acquire(timeout=timeout):
+            return False
+        try:
+            head, tail, dropped = _HEADER.unpack_from(self._buf, 0)
+            if self._capacity - (head - tail) < len(record):
+                return False
+            self._copy_in(head % self._capacity, record)
+            _HEADER.pack_into(self._buf, 0, head + len(record), tail, dropped)
+            return True
+        finally:
+            self._lock.release()
+
+    def record_drop(self, n: int = 1, timeout: float = -1) -> bool:
+        """Count records that writers gave up on. Returns False if the lock could not be acquired in time."""
+        if not self._lock.acquire(timeout=timeout):
+            return False
+        try:
+            head, tail, dropped = _HEADER.unpack_from(self._buf, 0)
+            _HEADER.pack_into(self._buf, 0, head, tail, dropped + n)
+            return True
+        finally:
+            self._lock.release()
+
+    def read_all(self, timeout: float = -1) -> List[bytes]:
+        """
+        Drain all pending records, in write order.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Max seconds to wait for the ring lock. Negative (default) waits forever.
+
+        Raises
+        ------
+        TimeoutError
+            If the lock could not be acquired in time, e.g., because a writer was killed
+            while holding it.
+        """
+        if not self._lock.acquire(timeout=timeout):
+            raise TimeoutError("Could not acquire the shared memory ring lock.")
+        try:
+            head, tail, dropped = _HEADER.unpack_from(self._buf, 0)
+            if head == tail:
+                return []
+            data = self._copy_out(tail % self._capacity, head - tail)
+            _HEADER.pack_into(self._buf, 0, head, head, dropped)
+        finally:
+            self._lock.release()
+        records = []
+        view = memoryview(data)
+        offset = 0
+        while offset < len(data):
+            (size,) = _LENGTH.unpack_from(view, offset)
+            offset += _LENGTH.size
+            records.append(bytes(view[offset : offset + size]))
+            offset += size
+        return records
+
+    def close(self):
+        """Close this process' mapping of the ring."""
+        self._buf = None
+        self._shm.close()
+
+    def unlink(self):
+        """Close and destroy the ring. Only the creator should call it."""
+        self.close()
+        self._shm.unlink()
@@ -0,0 +1,153 @@
+"""Task id generator module.
+
+Instrumented tasks need ids that are unique across threads and processes, cheap to
+generate on the hot path, and time-sortable, so inserts into the unique ``task_id``
+index stay local. The generator is chosen with ``project.task_id_generator`` in the
+settings file:
+
+- ``uuid7`` (default): UUIDv7-like ids. 48 bits of unix milliseconds, followed by a
+  per-process monotonic counter and a per-process random node id.
+- ``counter``: ``<process_prefix>-<counter>`` ids. Cheapest option. The prefix is the unix time
+  in milliseconds at which the process started generating ids, followed by 64 random bits, and
+  the counter is fixed-width hex, so ids sort by process start time and, within a process, in
+  generation order.
+- ``timestamp``: legacy ``str(time())`` ids. Not collision-free; kept for compatibility.
+"""
+
+import itertools
+import os
+from time import time, time_ns
+
+from flowcept.configs import TASK_ID_GENERATOR
+
+_COUNTER_BITS = 42
+_COUNTER_MASK = (1 << _COUNTER_BITS) - 1
+_NODE_BITS = 32
+_UUID7_VERSION = 0x7
+_UUID_VARIANT = 0b10
+
+_PREFIX_HEX_LEN = 28  # 48-bit start time in milliseconds + 64 random bits
+_COUNTER_HEX_LEN = 12
+
+
+def _new_prefix() -> str:
+    return f"{time_ns() // 1_000_000:012x}{int.from_bytes(os.urandom(8), 'big'):016x}"
+
+
+_counter = itertools.count()
+_node_id = int.from_bytes(os.urandom(4), "big")
+_prefix = _new_prefix()
+
+
+def _reset_after_fork():
+    """Draw a new node id and prefix in forked children, so they never reuse the parent's ids."""
+    global _counter, _node_id, _prefix
+    _counter = itertools.count()
+    _node_id = int.from_bytes(os.urandom(4), "big")
+    _prefix = _new_prefix()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def new_uuid7_task_id() -> str:
+    """Get a new time-ordered, UUIDv7-formatted task id.
+
+    The 74 random bits of a UUIDv7 are filled with a 42-bit per-process counter
+    followed by the 32-bit node id. Ids generated by the same process are strictly
+    increasing (as long as the wall clock does not go backwards), and ids from different
+    processes are ordered by millisecond.
+    """
+    # next() on itertools.count is atomic under the GIL, so no lock is needed.
+    seq = next(_counter) & _COUNTER_MASK
+    rand = (seq << _NODE_BITS) | _node_id
+    value = (
+        ((time_ns() // 1_000_000) << 80)
+        | (_UUID7_VERSION << 76)
+        | ((rand >> 62) << 64)
+        | (_UUID_VARIANT << 62)
+        | (rand & ((1 << 62) - 1))
+    )
+    h = f"{value:032x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def new_counter_task_id() -> str:
+    """Get a new ``<process_prefix>-<counter>`` task id."""
+    return f"{_prefix}-{next(_counter):012x}"
+
+
+def new_timestamp_task_id() -> str:
+    """Get a legacy timestamp-based task id. Ids may collide under high call rates."""
+    return str(time())
+
+
+_GENERATORS = {
+    "uuid7": new_uuid7_task_id,
+    "counter": new_counter_task_id,
+    "timestamp": new_timestamp_task_id,
+}
+
+if TASK_ID_GENERATOR not in _GENERATORS:
+    raise NotImplementedError(f"There is no task id generator {TASK_ID_GENERATOR}. Use one of {list(_GENERATORS)}.")
+
+new_task_id = _GENERATORS[TASK_ID_GENERATOR]
+
+
+def task_id_to_bytes(task_id: str) -> bytes:
+    """
+    Convert a generated task id into its compact binary form.
+
+    Parameters
+    ----------
+    task_id : str
+        A task id generated by the ``uuid7`` or ``counter`` generators.
+
+    Returns
+    -------
+    bytes
+        16 bytes for ``uuid7`` ids or 20 bytes (14-byte process prefix + 6-byte counter) for
+        ``counter`` ids. Both forms sort in generation order within a process.
+
+    Raises
+    ------
+    ValueError
+        If the task id was not produced by one of these generators.
+    """
+    if len(task_id) == 36 and task_id[14] == "7":
+        return int(task_id.replace("-", ""), 16).to_bytes(16, "big")
+    prefix, sep, seq = task_id.partition("-")
+    if sep and len(prefix) == _PREFIX_HEX_LEN and len(seq) == _COUNTER_HEX_LEN:
+        try:
+            return bytes.fromhex(prefix + seq)
+        except ValueError:
+            pass
+    raise ValueError(f"Task id {task_id} has no compact binary form.")
+
+
+def task_id_from_bytes(data: bytes) -> str:
+    """
+    Convert the compact binary form of a task id back into its string form.
+
+    Parameters
+    ----------
+    data : bytes
+        Bytes produced by `task_id_to_bytes`.
+
+    Returns
+    -------
+    str
+        The task id.
+
+    Raises
+    ------
+    ValueError
+        If the length of `data` matches none of the binary forms.
+    """
+    if len(data) == 16:
+        h = data.hex()
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+    elif len(data) == (_PREFIX_HEX_LEN + _COUNTER_HEX_LEN) // 2:
+        return f"{data[: _PREFIX_HEX_LEN // 2].hex()}-{data[_PREFIX_HEX_LEN // 2 :].hex()}"
+    raise ValueError(f"Unexpected binary task id length: {len(data)}.")
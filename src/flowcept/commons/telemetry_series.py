@@ -0,0 +1,298 @@
+"""Telemetry time series module.
+
+With ``telemetry_capture.sampler.delta_encoding``, each process publishes its telemetry
+as one time series instead of two full telemetry dictionaries per task. Samples are
+grouped into ``telemetry_block`` messages:
+
+- ``schema``: the layout of the telemetry dictionary of the block's samples. Numeric
+  leaves are replaced by their column index; other leaves (e.g., the command line) are
+  kept as they are.
+- ``base``: the numeric values of the first sample.
+- ``deltas``: for each following sample, the columns that changed (``c``) and by how
+  much (``d``). Unchanged columns are not stored.
+
+A new block starts when the layout changes (e.g., a new network interface appears).
+Tasks only keep ``TelemetrySnapshotRef`` references to their start and end samples, and
+`telemetry_diffs` reconstructs their telemetry differences on the query side. NumPy is
+only imported on that side, since encoding runs in the instrumented processes.
+"""
+
+from bisect import bisect_right
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+
+from flowcept.commons.flowcept_dataclasses.telemetry import TelemetrySnapshotRef
+
+
+def _is_number(value) -> bool:
+    return type(value) in (int, float)
+
+
+def flatten_telemetry(telemetry: Dict) -> Tuple[Dict, List, List[int]]:
+    """
+    Split a telemetry dictionary into its layout and its numeric values.
+
+    Parameters
+    ----------
+    telemetry : dict
+        A ``Telemetry.to_dict()`` dictionary.
+
+    Returns
+    -------
+    tuple
+        The schema (see the module docstring), the numeric values in column order, and
+        the indices of the integer columns.
+    """
+    values = []
+    int_columns = []
+
+    def _walk(node):
+        if isinstance(node, dict):
+            return {k: _walk(v) for k, v in node.items()}
+        elif isinstance(node, list):
+            return [_walk(v) for v in node]
+        elif _is_number(node):
+            if type(node) is int:
+                int_columns.append(len(values))
+            values.append(node)
+            return len(values) - 1
+        return node
+
+    return _walk(telemetry), values, int_columns
+
+
+def _schema_source(schema, constants: List) -> str:
+    """Write the expression that fills the schema from ``row``; other leaves go into `constants`."""
+    if isinstance(schema, dict):
+        items = []
+        for key, value in schema.items():
+            if type(key) is not str:
+                constants.append(key)
+                key_source = f"c[{len(constants) - 1}]"
+            else:
+                key_source = repr(key)
+            items.append(f"{key_source}: {_schema_source(value, constants)}")
+        return "{" + ", ".join(items) + "}"
+    elif isinstance(schema, list):
+        return "[" + ", ".join(_schema_source(v, constants) for v in schema) + "]"
+    elif type(schema) is int:
+        return f"row[{schema}]"
+    constants.append(schema)
+    return f"c[{len(constants) - 1}]"
+
+
+def _compile_schema(schema):
+    """
+    Build a function that fills the schema from a row.
+
+    The schema is turned into a single nested dict/list display, e.g.
+    ``lambda row: {"cpu": {"percent_all": row[0]}}``, so rebuilding a telemetry dictionary
+    costs one call instead of one call per node of the schema.
+    """
+    constants = []
+    source = f"lambda row: {_schema_source(schema, constants)}"
+    return eval(source, {"c": constants})
+
+
+def _to_rows(values, int_columns) -> List[List]:
+    """Convert a matrix into rows of Python numbers, with ints in the integer columns."""
+    import numpy as np
+
+    if not len(int_columns):
+        return values.tolist()
+    rows = values.astype(object)
+    int_columns = sorted(int_columns)
+    rows[:, int_columns] = np.rint(values[:, int_columns]).astype(np.int64).astype(object)
+    return rows.tolist()
+
+
+def fill_schema(schema, row: List, int_columns=frozenset()):
+    """Rebuild a telemetry dictionary from a schema and one row of numeric values."""
+    import numpy as np
+
+    return _compile_schema(schema)(_to_rows(np.asarray([row], dtype=np.float64), int_columns)[0])
+
+
+class TelemetrySeriesEncoder:
+    """
+    Delta-encode the telemetry samples of one series into ``telemetry_block`` messages.
+
+    Parameters
+    ----------
+    series_id : str
+        The series the samples belong to.
+    block_size : int
+        Max number of samples per block.
+    """
+
+    def __init__(self, series_id: str, block_size: int = 64):
+        self.series_id = series_id
+        self._block_size = max(1, block_size)
+        self._reset()
+
+    def _reset(self):
+        self._first_index = None
+        self._schema = None
+        self._int_columns = None
+        self._base = None
+        self._prev = None
+        self._sampled_at = []
+        self._deltas = []
+
+    def add(self, sample_index: int, sampled_at: float, telemetry: Dict) -> List[Dict]:
+        """
+        Add the next sample of the series.
+
+        Returns
+        -------
+        list of dict
+            The blocks completed by this sample: none, or one when the block is full or
+            the layout changed (two if both happen at once).
+        """
+        schema, values, int_columns = flatten_telemetry(telemetry)
+        completed = []
+        if self._schema is not None and schema != self._schema:
+            completed.append(self.flush())
+        if self._schema is None:
+            self._first_index = sample_index
+            self._schema = schema
+            self._int_columns = int_columns
+            self._base = values
+        else:
+            changed = [i for i, (v, p) in enumerate(zip(values, self._prev)) if v != p]
+            self._deltas.append({"c": changed, "d": [values[i] - self._prev[i] for i in changed]})
+        self._prev = values
+        self._sampled_at.append(sampled_at)
+        if len(self._sampled_at) >= self._block_size:
+            completed.append(self.flush())
+        return completed
+
+    def flush(self) -> Optional[Dict]:
+        """Close the current block and return it, or None if it is empty."""
+        if self._schema is None:
+            return None
+        block = {
+            "type": "telemetry_block",
+            "block_id": f"{self.series_id}_{self._first_index}",
+            "series_id": self.series_id,
+            "first_index": self._first_index,
+            "sampled_at": self._sampled_at,
+            "schema": self._schema,
+            "int_columns": self._int_columns,
+            "base": self._base,
+            "deltas": self._deltas,
+        }
+        self._reset()
+        return block
+
+
+def decode_block(block: Dict):
+    """
+    Decode the numeric values of a block.
+
+    Returns
+    -------
+    np.ndarray
+        A (samples x columns) float64 matrix. Row ``i`` holds the values of sample
+        ``block["first_index"] + i``.
+    """
+    import numpy as np
+
+    n = len(block["sampled_at"])
+    dense = np.zeros((n, len(block["base"])), dtype=np.float64)
+    dense[0] = block["base"]
+    deltas = block["deltas"]
+    if deltas:
+        rows = np.repeat(np.arange(1, n), [len(d["c"]) for d in deltas])
+        cols = np.fromiter(chain.from_iterable(d["c"] for d in deltas), dtype=np.int64, count=len(rows))
+        dense[rows, cols] = np.fromiter(chain.from_iterable(d["d"] for d in deltas), dtype=np.float64, count=len(rows))
+    return np.cumsum(dense, axis=0)
+
+
+class _DecodedSeries:
+    def __init__(self, blocks: List[Dict]):
+        self.blocks = sorted(blocks, key=lambda b: b["first_index"])
+        self.first_indices = [b["first_index"] for b in self.blocks]
+        self._values = {}
+
+    def locate(self, sample_index: int) -> Optional[Tuple[int, int]]:
+        """Get the (block position, row) of a sample, or None if it is not stored."""
+        pos = bisect_right(self.first_indices, sample_index) - 1
+        if pos < 0:
+            return None
+        row = sample_index - self.first_indices[pos]
+        if row >= len(self.blocks[pos]["sampled_at"]):
+            return None
+        return pos, row
+
+    def values(self, pos: int):
+        if pos not in self._values:
+            self._values[pos] = decode_block(self.blocks[pos])
+        return self._values[pos]
+
+
+def _cached_filler(fillers: List[Tuple[Dict, object]], schema):
+    """Get the compiled filler of a schema, compiling it once per distinct layout (usually one per series)."""
+    for cached_schema, fill in fillers:
+        if cached_schema is schema or cached_schema == schema:
+            return fill
+    fill = _compile_schema(schema)
+    fillers.append((schema, fill))
+    return fill
+
+
+def telemetry_diffs(start_refs: List[Dict], end_refs: List[Dict], blocks: List[Dict]) -> List[Optional[Dict]]:
+    """
+    Reconstruct the telemetry differences (end minus start) of many tasks.
+
+    Tasks are grouped by the blocks holding their start and end samples, and each group
+    is computed with a single vectorized subtraction.
+
+    Parameters
+    ----------
+    start_refs, end_refs : list of dict
+        ``TelemetrySnapshotRef`` dictionaries of each task.
+    blocks : list of dict
+        The ``telemetry_block`` documents of the referenced series.
+
+    Returns
+    -------
+    list
+        One telemetry difference dictionary per task, in the same layout as
+        ``calculate_telemetry_diff_for_docs`` produces, or None when a referenced sample
+        is not available or the start and end samples have different layouts.
+    """
+    by_series = {}
+    for block in blocks:
+        by_series.setdefault(block["series_id"], []).append(block)
+    series = {series_id: _DecodedSeries(series_blocks) for series_id, series_blocks in by_series.items()}
+
+    groups = {}
+    for i, (start, end) in enumerate(zip(start_refs, end_refs)):
+        if not (TelemetrySnapshotRef.is_ref(start) and TelemetrySnapshotRef.is_ref(end)):
+            continue
+        if start["series_id"] != end["series_id"] or start["series_id"] not in series:
+            continue
+        decoded = series[start["series_id"]]
+        start_loc = decoded.locate(start["sample_index"])
+        end_loc = decoded.locate(end["sample_index"])
+        if start_loc is None or end_loc is None:
+            continue
+        group = groups.setdefault((start["series_id"], start_loc[0], end_loc[0]), ([], [], []))
+        group[0].append(i)
+        group[1].append(start_loc[1])
+        group[2].append(end_loc[1])
+
+    results = [None] * len(start_refs)
+    fillers = []
+    for (series_id, start_pos, end_pos), (task_positions, start_rows, end_rows) in groups.items():
+        decoded = series[series_id]
+        start_block, end_block = decoded.blocks[start_pos], decoded.blocks[end_pos]
+        if start_block["schema"] != end_block["schema"]:
+            continue
+        diffs = decoded.values(end_pos)[end_rows] - decoded.values(start_pos)[start_rows]
+        int_columns = set(start_block["int_columns"]).intersection(end_block["int_columns"])
+        fill = _cached_filler(fillers, start_block["schema"])
+        for task_position, row in zip(task_positions, _to_rows(diffs, int_columns)):
+            results[task_position] = fill(row)
+    return results
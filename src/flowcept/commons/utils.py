@@ -7,8 +7,8 @@ from typing import Callable
 import os
 import platform
 import subprocess
+import sys
 import types
-import numpy as np
 import pytz
 
 from flowcept import configs
@@ -149,13 +149,19 @@ class GenericJSONEncoder(json.JSONEncoder):
                 return str(obj)
             except Exception:
                 return None
-        elif isinstance(obj, np.int) or isinstance(obj, np.int32) or isinstance(obj, np.int64):
+        elif _is_numpy_instance(obj, "integer"):
             return int(obj)
-        elif isinstance(obj, np.float) or isinstance(obj, np.float32) or isinstance(obj, np.float64):
+        elif _is_numpy_instance(obj, "floating"):
             return float(obj)
         return super().default(obj)
 
 
+def _is_numpy_instance(obj, type_name: str) -> bool:
+    """Check for a numpy type without importing numpy: numpy objects only exist if it was imported."""
+    np = sys.modules.get("numpy", None)
+    return np is not None and isinstance(obj, getattr(np, type_name))
+
+
 def replace_non_serializable_times(obj, tz=pytz.utc):
     """Replace non-serializable times in an object."""
     for time_field in TaskObject.get_time_field_names():
@@ -1,13 +1,73 @@
 """Configuration module."""
 
 import os
-import socket
 import getpass
-import random
+import zlib
 
 
 PROJECT_NAME = "flowcept"
 USE_DEFAULT = os.getenv("FLOWCEPT_USE_DEFAULT", "False").lower() == "true"
+
+
+def _parse_settings_file(path: str) -> dict:
+    """Parse a settings YAML file into plain dicts and lists."""
+    with open(path) as f:
+        text = f.read()
+    if "${" in text:
+        # Only OmegaConf resolves interpolations, but it is much slower to import.
+        from omegaconf import OmegaConf
+
+        return OmegaConf.to_container(OmegaConf.create(text), resolve=True)
+    import yaml
+
+    return yaml.load(text, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+def _load_settings(path: str) -> dict:
+    """Load a settings YAML file, optionally through a cache of its parsed content.
+
+    Set ``FLOWCEPT_SETTINGS_CACHE=true`` to enable the cache. Its entries are keyed by the
+    file's path, size, and modification time, live in ``~/.flowcept/cache``, and are encoded
+    like the settings snapshots (msgpack), so non-string keys survive the round trip.
+    Processes started by a launcher should rather use a settings snapshot (see
+    ``flowcept.commons.settings_snapshot``), which needs no file in the home directory.
+    """
+    if os.getenv("FLOWCEPT_SETTINGS_CACHE", "false").lower() != "true":
+        return _parse_settings_file(path)
+    import msgpack
+
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+    cache_dir = os.path.expanduser(f"~/.{PROJECT_NAME}/cache")
+    cache_path = os.path.join(cache_dir, f"settings_{zlib.crc32(path.encode()):08x}.msgpack")
+    try:
+        with open(cache_path, "rb") as f:
+            cached = msgpack.loads(f.read(), strict_map_key=False)
+        if cached["key"] == key:
+            return cached["settings"]
+    except Exception:
+        pass
+
+    parsed = _parse_settings_file(path)
+    try:
+        payload = msgpack.dumps({"key": key, "settings": parsed})  # Fails, e.g., on YAML dates: no caching then.
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        pass  # E.g., a read-only home directory: the cache is only an optimization.
+    return parsed
+
+
+def _jitter(value: int) -> int:
+    """Get a random integer between 90% and 140% of `value`, without importing `random`."""
+    low, high = int(value * 0.9), int(value * 1.4)
+    return low + int.from_bytes(os.urandom(4), "little") % (high - low + 1)
+
+
 ########################
 #   Project Settings   #
 ########################
@@ -29,21 +89,23 @@ if USE_DEFAULT:
         "databases": {},
         "adapters": {},
     }
-else:
-    from omegaconf import OmegaConf
+elif os.getenv("FLOWCEPT_SETTINGS_SNAPSHOT"):
+    # Settings frozen by a launcher process; see flowcept.commons.settings_snapshot.
+    from flowcept.commons.settings_snapshot import load_settings_snapshot
 
+    settings, SETTINGS_PATH = load_settings_snapshot(os.environ["FLOWCEPT_SETTINGS_SNAPSHOT"])
+else:
     _SETTINGS_DIR = os.path.expanduser(f"~/.{PROJECT_NAME}")
     SETTINGS_PATH = os.getenv("FLOWCEPT_SETTINGS_PATH", f"{_SETTINGS_DIR}/settings.yaml")
 
     if not os.path.exists(SETTINGS_PATH):
-        from importlib import resources
+        # Same lookup as importlib.resources.files("resources"), which is slow to import.
+        from importlib.util import find_spec
 
-        SETTINGS_PATH = str(resources.files("resources").joinpath("sample_settings.yaml"))
+        _resources_dir = list(find_spec("resources").submodule_search_locations)[0]
+        SETTINGS_PATH = os.path.join(_resources_dir, "sample_settings.yaml")
 
-        with open(SETTINGS_PATH) as f:
-            settings = OmegaConf.load(f)
-    else:
-        settings = OmegaConf.load(SETTINGS_PATH)
+    settings = _load_settings(SETTINGS_PATH)
 # print(SETTINGS_PATH)
 ########################
 #   Log Settings       #
@@ -78,12 +140,17 @@ MQ_PORT = int(os.getenv("MQ_PORT", settings["mq"].get("port", "6379")))
 
 MQ_BUFFER_SIZE = int(settings["mq"].get("buffer_size", 50))
 MQ_INSERTION_BUFFER_TIME = int(settings["mq"].get("insertion_buffer_time_secs", 5))
-MQ_INSERTION_BUFFER_TIME = random.randint(
-    int(MQ_INSERTION_BUFFER_TIME * 0.9),
-    int(MQ_INSERTION_BUFFER_TIME * 1.4),
-)
+MQ_PER_THREAD_BUFFERS = settings["mq"].get("per_thread_buffers", False)
+MQ_MAX_THREAD_BACKLOG = int(settings["mq"].get("max_thread_backlog", 0))
+MQ_INSERTION_BUFFER_TIME = _jitter(MQ_INSERTION_BUFFER_TIME)
 MQ_CHUNK_SIZE = int(settings["mq"].get("chunk_size", -1))
 
+_mq_shm_sidecar_settings = settings["mq"].get("shm_sidecar", {})
+MQ_SHM_SIDECAR_ENABLED = _mq_shm_sidecar_settings.get("enabled", False)
+MQ_SHM_RING_SIZE_MB = float(_mq_shm_sidecar_settings.get("ring_size_mb", 64))
+MQ_SHM_DRAIN_INTERVAL = float(_mq_shm_sidecar_settings.get("drain_interval_secs", 0.05))
+MQ_SHM_WRITE_TIMEOUT = float(_mq_shm_sidecar_settings.get("write_timeout_secs", 1))
+
 #####################
 # KV SETTINGS       #
 #####################
@@ -134,10 +201,7 @@ if not LMDB_ENABLED and not MONGO_ENABLED:
 db_buffer_settings = settings["db_buffer"]
 # In seconds:
 INSERTION_BUFFER_TIME = int(db_buffer_settings.get("insertion_buffer_time_secs", 5))
-INSERTION_BUFFER_TIME = random.randint(
-    int(INSERTION_BUFFER_TIME * 0.9),
-    int(INSERTION_BUFFER_TIME * 1.4),
-)
+INSERTION_BUFFER_TIME = _jitter(INSERTION_BUFFER_TIME)
 
 ADAPTIVE_DB_BUFFER_SIZE = db_buffer_settings.get("adaptive_buffer_size", True)
 DB_MAX_BUFFER_SIZE = int(db_buffer_settings.get("max_buffer_size", 50))
@@ -145,6 +209,7 @@ DB_MIN_BUFFER_SIZE = max(1, int(db_buffer_settings.get("min_buffer_size", 10)))
 REMOVE_EMPTY_FIELDS = db_buffer_settings.get("remove_empty_fields", False)
 DB_INSERTER_MAX_TRIALS_STOP = db_buffer_settings.get("stop_max_trials", 240)
 DB_INSERTER_SLEEP_TRIALS_STOP = db_buffer_settings.get("stop_trials_sleep", 0.01)
+EXPAND_TASK_BLOCKS = db_buffer_settings.get("expand_task_blocks", True)
 
 
 ######################
@@ -158,6 +223,13 @@ JSON_SERIALIZER = settings["project"].get("json_serializer", "default")
 REPLACE_NON_JSON_SERIALIZABLE = settings["project"].get("replace_non_json_serializable", True)
 ENRICH_MESSAGES = settings["project"].get("enrich_messages", True)
 REGISTER_WORKFLOW = settings["project"].get("register_workflow", True)
+TASK_ID_GENERATOR = settings["project"].get("task_id_generator", "uuid7")
+
+_self_metrics_settings = settings["project"].get("self_metrics", None) or {}
+SELF_METRICS_ENABLED = _self_metrics_settings.get("enabled", False)
+SELF_METRICS_INTERVAL = float(_self_metrics_settings.get("export_interval_secs", 10))
+SELF_METRICS_TO_MQ = _self_metrics_settings.get("to_mq", True)
+SELF_METRICS_FILE_PATH = _self_metrics_settings.get("file_path", None)
 
 TELEMETRY_CAPTURE = settings.get("telemetry_capture", None)
 
@@ -194,17 +266,34 @@ if LOGIN_NAME is None:
 SYS_NAME = SYS_NAME if SYS_NAME is not None else os.uname()[0]
 NODE_NAME = NODE_NAME if NODE_NAME is not None else os.uname()[1]
 
-try:
-    HOSTNAME = socket.getfqdn()
-except Exception:
-    try:
-        HOSTNAME = socket.gethostname()
-    except Exception:
+_HOSTNAME = None
+
+
+def get_hostname() -> str:
+    """Get the fully qualified hostname, resolved on first use since it can block on DNS."""
+    global _HOSTNAME
+    if _HOSTNAME is None:
+        import socket
+
         try:
-            with open("/etc/hostname", "r") as f:
-                HOSTNAME = f.read().strip()
+            _HOSTNAME = socket.getfqdn()
         except Exception:
-            HOSTNAME = "unknown_hostname"
+            try:
+                _HOSTNAME = socket.gethostname()
+            except Exception:
+                try:
+                    with open("/etc/hostname", "r") as f:
+                        _HOSTNAME = f.read().strip()
+                except Exception:
+                    _HOSTNAME = "unknown_hostname"
+    return _HOSTNAME
+
+
+def __getattr__(name):
+    # HOSTNAME is kept as a module attribute, resolved when first accessed.
+    if name == "HOSTNAME":
+        return get_hostname()
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
 
 
 EXTRA_METADATA = settings.get("extra_metadata", {})
@@ -231,6 +320,7 @@ ANALYTICS = settings.get("analytics", None)
 
 INSTRUMENTATION = settings.get("instrumentation", {})
 INSTRUMENTATION_ENABLED = INSTRUMENTATION.get("enabled", False)
+LOOP_BLOCK_SIZE = int(INSTRUMENTATION.get("loop_block_size", 1000))
 
 ####################
 # Enabled ADAPTERS #
@@ -0,0 +1,278 @@
+"""Chunked, deduplicated storage of PyTorch checkpoints.
+
+A checkpoint is a manifest in the ``checkpoints`` collection listing, for each tensor of a
+state dict, its dtype, shape, and the ids of its chunks. Chunks are fixed-size pieces of the
+tensor bytes, identified by their hash and stored once in the DAO's chunk store, so the
+layers that did not change between checkpoints (e.g., frozen layers, or the same
+pretrained weights in many runs) take no extra space. Saving only snapshots the tensors on
+the caller's thread; hashing and uploading run in a background thread, with a bound on the
+bytes of snapshots waiting to be uploaded. Loading can be partial or lazy, fetching only the
+chunks of the selected tensors.
+"""
+
+import hashlib
+from collections.abc import Mapping
+from queue import Queue
+from threading import Condition, Thread
+from time import time
+from typing import Dict, Iterable, List
+from uuid import uuid4
+
+from flowcept.commons.daos.docdb_dao.docdb_dao_base import DocumentDBDAO
+from flowcept.commons.flowcept_logger import FlowceptLogger
+
+CHECKPOINT_FORMAT_VERSION = 1
+
+
+def _chunk_id(data) -> str:
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def _tensor_bytes(tensor):
+    """Get the bytes of a contiguous CPU tensor as a numpy uint8 array, without copying them."""
+    import torch
+
+    return tensor.reshape(-1).view(torch.uint8).numpy()
+
+
+class LazyCheckpoint(Mapping):
+    """Read-only state dict of a stored checkpoint, fetching each tensor when accessed.
+
+    Parameters
+    ----------
+    dao : DocumentDBDAO
+        Where the checkpoint is stored.
+    manifest : dict
+        The checkpoint document.
+    """
+
+    def __init__(self, dao: DocumentDBDAO, manifest: Dict):
+        self._dao = dao
+        self.manifest = manifest
+        self._entries = {entry["name"]: entry for entry in manifest["tensors"]}
+
+    def __getitem__(self, name: str):
+        """Fetch one tensor."""
+        return self.load([name])[name]
+
+    def __iter__(self):
+        """Iterate over the tensor names."""
+        return iter(self._entries)
+
+    def __len__(self):
+        """Get the number of tensors."""
+        return len(self._entries)
+
+    def load(self, names: Iterable[str] = None) -> Dict:
+        """
+        Fetch several tensors at once.
+
+        Parameters
+        ----------
+        names : iterable of str, optional
+            The tensors to fetch. Defaults to all of them.
+
+        Returns
+        -------
+        dict
+            The tensors by name, on CPU.
+        """
+        import numpy as np
+        import torch
+
+        entries = [self._entries[name] for name in (self._entries if names is None else names)]
+        chunks = self._dao.get_chunks(list({chunk_id for entry in entries for chunk_id in entry["chunks"]}))
+        tensors = {}
+        for entry in entries:
+            dtype = getattr(torch, entry["dtype"].split(".")[-1])
+            flat = torch.empty(entry["nbytes"], dtype=torch.uint8)
+            flat_array, offset = flat.numpy(), 0
+            for chunk_id in entry["chunks"]:
+                if chunk_id not in chunks:
+                    raise KeyError(f"Chunk {chunk_id} of tensor {entry['name']} is missing.")
+                chunk = np.frombuffer(chunks[chunk_id], dtype=np.uint8)
+                flat_array[offset : offset + len(chunk)] = chunk
+                offset += len(chunk)
+            tensors[entry["name"]] = flat.view(dtype).reshape(entry["shape"])
+        return tensors
+
+
+class CheckpointStore:
+    """Saves checkpoints in the background and loads them, whole, partially, or lazily.
+
+    Parameters
+    ----------
+    dao : DocumentDBDAO
+        Where checkpoints are stored; MongoDB and LMDB are supported.
+    chunk_size : int, optional
+        Bytes per chunk. Defaults to 4 MiB, which keeps chunks below MongoDB's document size
+        limit.
+    max_pending_bytes : int, optional
+        Bound on the bytes of snapshots waiting to be uploaded. Saving blocks while it is
+        exceeded, although a single checkpoint larger than the bound is accepted when nothing
+        else is pending. Defaults to 512 MiB.
+    """
+
+    def __init__(self, dao: DocumentDBDAO, chunk_size: int = 4 << 20, max_pending_bytes: int = 512 << 20):
+        self._dao = dao
+        self._chunk_size = chunk_size
+        self._max_pending_bytes = max_pending_bytes
+        self._pending_bytes = 0
+        self._pending_ids = set()
+        self._condition = Condition()
+        self._queue: Queue = Queue()
+        self._thread: Thread = None
+        self._known_chunk_ids = set()  # Chunks this store already stored.
+        self.logger = FlowceptLogger()
+
+    def save(
+        self,
+        state_dict: Dict,
+        checkpoint_id: str = None,
+        task_id: str = None,
+        workflow_id: str = None,
+        custom_metadata: Dict = None,
+        wait: bool = False,
+    ) -> str:
+        """
+        Snapshot a state dict and store it in the background.
+
+        Parameters
+        ----------
+        state_dict : dict
+            Tensors by name, e.g., ``model.state_dict()``. Entries that are not tensors must be
+            JSON serializable; they are stored in the manifest.
+        checkpoint_id : str, optional
+            Defaults to a new UUID.
+        task_id : str, optional
+            The task that produced the checkpoint.
+        workflow_id : str, optional
+            The workflow of the checkpoint.
+        custom_metadata : dict, optional
+            Stored in the manifest.
+        wait : bool, optional
+            Whether to return only after the checkpoint is stored.
+
+        Returns
+        -------
+        str
+            The checkpoint id.
+        """
+        import torch
+
+        checkpoint_id = checkpoint_id or str(uuid4())
+        nbytes = sum(v.numel() * v.element_size() for v in state_dict.values() if isinstance(v, torch.Tensor))
+        with self._condition:
+            while self._pending_bytes and self._pending_bytes + nbytes > self._max_pending_bytes:
+                self._condition.wait()
+            self._pending_bytes += nbytes
+            self._pending_ids.add(checkpoint_id)
+            if self._thread is None:
+                self._thread = Thread(target=self._upload_loop, daemon=True)
+                self._thread.start()
+        try:
+            # The snapshot is taken now, since training goes on changing the tensors.
+            snapshot = {
+                k: v.detach().to("cpu", copy=True).contiguous() if isinstance(v, torch.Tensor) else v
+                for k, v in state_dict.items()
+            }
+        except BaseException:
+            # E.g., out of host memory: nothing will be uploaded, so nothing is pending.
+            with self._condition:
+                self._pending_bytes -= nbytes
+                self._pending_ids.discard(checkpoint_id)
+                self._condition.notify_all()
+            raise
+        manifest = {
+            "checkpoint_id": checkpoint_id,
+            "format": CHECKPOINT_FORMAT_VERSION,
+            "created_at": time(),
+            "chunk_size": self._chunk_size,
+            "nbytes": nbytes,
+        }
+        if task_id is not None:
+            manifest["task_id"] = task_id
+        if workflow_id is not None:
+            manifest["workflow_id"] = workflow_id
+        if custom_metadata is not None:
+            manifest["custom_metadata"] = custom_metadata
+        self._queue.put((manifest, snapshot))
+        if wait:
+            self.wait(checkpoint_id)
+        return checkpoint_id
+
+    def wait(self, checkpoint_id: str = None):
+        """Wait until a checkpoint, or all the pending ones, are stored."""
+        with self._condition:
+            while (checkpoint_id in self._pending_ids) if checkpoint_id else self._pending_ids:
+                self._condition.wait()
+
+    def _upload_loop(self):
+        while True:
+            manifest, snapshot = self._queue.get()
+            try:
+                self._upload(manifest, snapshot)
+            except Exception as e:
+                self.logger.error(f"Could not store the checkpoint {manifest['checkpoint_id']}.")
+                self.logger.exception(e)
+            finally:
+                with self._condition:
+                    self._pending_bytes -= manifest["nbytes"]
+                    self._pending_ids.discard(manifest["checkpoint_id"])
+                    self._condition.notify_all()
+
+    def _upload(self, manifest: Dict, snapshot: Dict):
+        import torch
+
+        tensors, extras = [], {}
+        batch, batch_bytes = {}, 0
+        for name, value in snapshot.items():
+            if not isinstance(value, torch.Tensor):
+                extras[name] = value
+                continue
+            data = _tensor_bytes(value)
+            chunk_ids = []
+            for offset in range(0, len(data), self._chunk_size):
+                chunk = memoryview(data[offset : offset + self._chunk_size])
+                chunk_id = _chunk_id(chunk)
+                chunk_ids.append(chunk_id)
+                if chunk_id not in self._known_chunk_ids and chunk_id not in batch:
+                    batch[chunk_id] = chunk
+                    batch_bytes += len(chunk)
+                    if batch_bytes >= 8 * self._chunk_size:
+                        self._put_chunks(batch)
+                        batch, batch_bytes = {}, 0
+            tensors.append(
+                {
+                    "name": name,
+                    "dtype": str(value.dtype),
+                    "shape": list(value.shape),
+                    "nbytes": len(data),
+                    "chunks": chunk_ids,
+                }
+            )
+        self._put_chunks(batch)
+        manifest["tensors"] = tensors
+        manifest["extras"] = extras
+        if not self._dao.upsert_docs("checkpoints", [manifest]):
+            raise Exception("Could not store the checkpoint manifest.")
+
+    def _put_chunks(self, batch: Dict):
+        if batch:
+            self._dao.put_chunks(batch)
+            self._known_chunk_ids.update(batch)
+
+    def get(self, checkpoint_id: str) -> LazyCheckpoint:
+        """Get a stored checkpoint, whose tensors are fetched when accessed."""
+        docs = self._dao.query(collection="checkpoints", filter={"checkpoint_id": checkpoint_id})
+        if not docs:
+            raise KeyError(f"Checkpoint {checkpoint_id} not found.")
+        return LazyCheckpoint(self._dao, docs[0])
+
+    def load(self, checkpoint_id: str, names: List[str] = None) -> Dict:
+        """Get the state dict of a stored checkpoint, or only the tensors in `names`."""
+        checkpoint = self.get(checkpoint_id)
+        state_dict = checkpoint.load(names)
+        if names is None:
+            state_dict.update(checkpoint.manifest.get("extras", {}))
+        return state_dict
@@ -1,7 +1,7 @@
 """DB API module."""
 
 import uuid
-from typing import List, Dict
+from typing import Iterator, List, Dict
 
 from flowcept.commons.daos.docdb_dao.docdb_dao_base import DocumentDBDAO
 from flowcept.commons.flowcept_dataclasses.workflow_object import (
@@ -17,6 +17,8 @@ class DBAPI(object):
     ASCENDING = 1
     DESCENDING = -1
 
+    _checkpoint_store = None
+
     # TODO: consider making all methods static
     def __init__(self):
         self.logger = FlowceptLogger()
@@ -25,6 +27,14 @@ class DBAPI(object):
     def _dao(cls) -> DocumentDBDAO:
         return DocumentDBDAO.get_instance(create_indices=False)
 
+    @classmethod
+    def _checkpoints(cls):
+        if cls._checkpoint_store is None:
+            from flowcept.flowcept_api.checkpoint_store import CheckpointStore
+
+            cls._checkpoint_store = CheckpointStore(DBAPI._dao())
+        return cls._checkpoint_store
+
     def close(self):
         """Close DB resources."""
         DBAPI._dao().close()
@@ -61,6 +71,26 @@ class DBAPI(object):
             return None
         return results
 
+    def get_machine_info(self, machine_id) -> Dict:
+        """Get the machine info of a machine id, as referenced in the workflows' machine_info."""
+        results = self.query(collection="machines", filter={"machine_id": machine_id})
+        if results is None or len(results) == 0:
+            self.logger.error(f"Could not retrieve machine info with id {machine_id}.")
+            return None
+        return results[0]
+
+    def get_processes_info(self, machine_id) -> List[Dict]:
+        """Get the info, e.g., the environment, of the processes that ran on a machine id."""
+        return self.query(collection="processes", filter={"machine_id": machine_id})
+
+    def get_model_profile(self, profile_hash) -> Dict:
+        """Get a model profile, as referenced in the workflows' custom_metadata.model_profile.profile_hash."""
+        results = self.query(collection="model_profiles", filter={"profile_hash": profile_hash})
+        if results is None or len(results) == 0:
+            self.logger.error(f"Could not retrieve the model profile with hash {profile_hash}.")
+            return None
+        return results[0]
+
     def get_tasks_from_current_workflow(self):
         """
         Get the tasks of the current workflow in the Flowcept instance.
@@ -93,6 +123,44 @@ class DBAPI(object):
             return None
         return results
 
+    def iterate_tasks(self, filter: Dict, projection=None, limit=0, sort=None) -> Iterator[Dict]:
+        """Query the tasks collection, lazily expanding the stored iteration blocks into iteration tasks.
+
+        See `flowcept.commons.query_utils.iter_expanded_tasks`.
+        """
+        from flowcept.commons.query_utils import iter_expanded_tasks
+
+        return iter_expanded_tasks(self.task_query(filter, projection, limit, sort) or [])
+
+    def get_iteration_task(self, group_id: str, i: int) -> Dict:
+        """Get a loop iteration task by its loop's group id and its index, whether or not it is stored in a block.
+
+        The ``parent_iteration`` field of forward tasks, for instance, references their batch this way.
+        """
+        from flowcept.commons.query_utils import ITERATION_BLOCK
+        from flowcept.flowceptor.consumers.consumer_utils import expand_task_block
+
+        results = self.task_query(filter={"task_id": group_id + str(i)})
+        if results:
+            return results[0]
+        for block in self.task_query(filter={"group_id": group_id, "subtype": ITERATION_BLOCK}) or []:
+            columns = block["columns"]
+            if i not in columns["i"]:
+                continue
+            # Only the row of the iteration is expanded.
+            row = columns["i"].index(i)
+            row_block = {k: v for k, v in block.items() if k not in {"_id", "telemetry_at_start", "telemetry_at_end"}}
+            row_block["columns"] = {key: columns[key][row : row + 1] for key in ("i", "started_at", "ended_at")}
+            for key in ("used", "generated", "fields"):
+                row_block["columns"][key] = {k: v[row : row + 1] for k, v in columns.get(key, {}).items()}
+            if row == 0 and "telemetry_at_start" in block:
+                row_block["telemetry_at_start"] = block["telemetry_at_start"]
+            if row == len(columns["i"]) - 1 and "telemetry_at_end" in block:
+                row_block["telemetry_at_end"] = block["telemetry_at_end"]
+            return expand_task_block(row_block)[0]
+        self.logger.error(f"Could not retrieve iteration {i} of the loop {group_id}.")
+        return None
+
     def get_tasks_recursive(self, workflow_id, max_depth=999, mapping=None):
         """
         Retrieve all tasks recursively for a given workflow ID.
@@ -290,7 +358,7 @@ class DBAPI(object):
         if "data" in doc:
             binary_data = doc["data"]
         else:
-            file_id = doc["grid_fs_file_id"]
+            file_id = doc["grid_fs_file_id"] if "grid_fs_file_id" in doc else doc["file_id"]
             binary_data = DBAPI._dao().get_file_data(file_id)
 
         buffer = io.BytesIO(binary_data)
@@ -298,3 +366,72 @@ class DBAPI(object):
         model.load_state_dict(state_dict)
 
         return doc
+
+    def save_torch_checkpoint(
+        self,
+        model,
+        checkpoint_id=None,
+        task_id=None,
+        workflow_id=None,
+        custom_metadata: dict = None,
+        wait=False,
+    ) -> str:
+        """Save a checkpoint of a model in the background.
+
+        The tensors are stored in content-addressed chunks, so the tensors that did not change
+        since a previous checkpoint take no extra space. The call returns once the tensors are
+        copied; use `wait` or `wait_for_torch_checkpoints` to know when they are stored.
+
+        Args:
+            model (torch.nn.Module or dict): The model, or a state dict.
+            checkpoint_id (str): Defaults to a new UUID.
+            task_id (str): The task that produced the checkpoint.
+            workflow_id (str): The workflow of the checkpoint.
+            custom_metadata (Dict): Custom metadata to be stored with the checkpoint.
+            wait (bool): Whether to return only after the checkpoint is stored.
+
+        Returns
+        -------
+            str: The checkpoint id.
+        """
+        state_dict = model if isinstance(model, dict) else model.state_dict()
+        cm = dict(custom_metadata or {})
+        if not isinstance(model, dict):
+            cm["class"] = model.__class__.__name__
+        return DBAPI._checkpoints().save(state_dict, checkpoint_id, task_id, workflow_id, cm, wait=wait)
+
+    def wait_for_torch_checkpoints(self, checkpoint_id=None):
+        """Wait until a checkpoint, or all checkpoints being saved, are stored."""
+        DBAPI._checkpoints().wait(checkpoint_id)
+
+    def get_torch_checkpoint(self, checkpoint_id):
+        """Get a stored checkpoint as a read-only state dict whose tensors are fetched when accessed.
+
+        Args:
+            checkpoint_id (str): The checkpoint id.
+
+        Returns
+        -------
+            LazyCheckpoint: A mapping of tensor names to tensors, with the checkpoint document
+            in its `manifest` attribute.
+        """
+        return DBAPI._checkpoints().get(checkpoint_id)
+
+    def load_torch_checkpoint(self, model, checkpoint_id, names=None):
+        """Load a stored checkpoint into a model.
+
+        Args:
+            model (torch.nn.Module): A model with the same architecture as the checkpointed one.
+            checkpoint_id (str): The checkpoint id.
+            names (List[str]): If set, only these tensors are fetched and loaded.
+
+        Returns
+        -------
+            dict: The checkpoint document.
+        """
+        checkpoint = DBAPI._checkpoints().get(checkpoint_id)
+        state_dict = checkpoint.load(names)
+        if names is None:
+            state_dict.update(checkpoint.manifest.get("extras", {}))
+        model.load_state_dict(state_dict, strict=names is None)
+        return checkpoint.manifest
@@ -20,9 +20,12 @@ from flowcept.analytics.analytics_utils import (
 )
 from flowcept.commons.flowcept_logger import FlowceptLogger
 from flowcept.commons.query_utils import (
+    ITERATION_BLOCK,
+    iter_expanded_tasks,
     get_doc_status,
     to_datetime,
     calculate_telemetry_diff_for_docs,
+    get_telemetry_series_ids,
 )
 from flowcept.configs import WEBSERVER_HOST, WEBSERVER_PORT, ANALYTICS
 from flowcept.flowcept_webserver.app import BASE_ROUTE
@@ -191,6 +194,9 @@ class TaskQueryAPI(object):
         )
         if len(docs) == 0:
             return pd.DataFrame()
+        if any(doc.get("subtype") == ITERATION_BLOCK for doc in docs):
+            # One row per iteration, also for the loops stored in blocks.
+            docs = list(iter_expanded_tasks(docs))
 
         df = self._get_dataframe_from_task_docs(docs, calculate_telemetry_diff, shift_hours)
         # Clean the telemetry DataFrame if specified
@@ -206,6 +212,18 @@ class TaskQueryAPI(object):
             )
         return df
 
+    def _get_telemetry_blocks(self, docs: List[Dict]) -> List[Dict]:
+        """Get the telemetry blocks of the series referenced by delta-encoded task docs."""
+        series_ids = get_telemetry_series_ids(docs)
+        if not series_ids or self._with_webserver:
+            return None
+        blocks = []
+        for series_id in series_ids:
+            series_blocks = Flowcept.db.query(filter={"series_id": series_id}, collection="telemetry")
+            if series_blocks:
+                blocks.extend(series_blocks)
+        return blocks
+
     def _get_dataframe_from_task_docs(
         self,
         docs: [List[Dict]],
@@ -217,7 +235,7 @@ class TaskQueryAPI(object):
 
         if calculate_telemetry_diff:
             try:
-                docs = calculate_telemetry_diff_for_docs(docs)
+                docs = calculate_telemetry_diff_for_docs(docs, self._get_telemetry_blocks(docs))
             except Exception as e:
                 self.logger.exception(e)
 
@@ -1,7 +1,9 @@
 """Base Interceptor module."""
 
+import os
 from abc import abstractmethod
-from typing import Dict, List
+from time import perf_counter
+from typing import Callable, Dict, List
 from uuid import uuid4
 
 from flowcept.commons.flowcept_dataclasses.workflow_object import (
@@ -9,13 +11,17 @@ from flowcept.commons.flowcept_dataclasses.workflow_object import (
 )
 from flowcept.configs import (
     ENRICH_MESSAGES,
+    MQ_SHM_SIDECAR_ENABLED,
+    SELF_METRICS_ENABLED,
+    SELF_METRICS_TO_MQ,
 )
 from flowcept.commons.flowcept_logger import FlowceptLogger
 from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
+from flowcept.commons.self_metrics import METRICS, get_metrics_exporter
 from flowcept.commons.flowcept_dataclasses.task_object import TaskObject
 from flowcept.commons.settings_factory import get_settings
 
-from flowcept.flowceptor.telemetry_capture import TelemetryCapture
+from flowcept.flowceptor.telemetry_capture import PROCESS_INFO_FIELDS, RANK_ENV_VARS, TelemetryCapture
 
 
 # TODO :base-interceptor-refactor: :ml-refactor: :code-reorg: :usability:
@@ -30,6 +36,11 @@ class BaseInterceptor(object):
 
     KINDS_TO_NOT_EXPLICITLY_CONTROL = {"dask"}
 
+    # Machine ids whose machine info this process already sent.
+    _sent_machine_ids = set()
+    # Keys (machine id and pid) of the processes whose process info was already sent.
+    _sent_process_keys = set()
+
     def __init__(self, plugin_key=None, kind=None):
         self.logger = FlowceptLogger()
         # self.logger.debug(f"Starting Interceptor{id(self)} at {time()}")
@@ -45,6 +56,9 @@ class BaseInterceptor(object):
         self._saved_workflows = set()
         self._generated_workflow_id = False
         self.kind = kind
+        self._shm_sidecar = None
+        self._is_shm_child = False
+        self._stop_callbacks: List[Callable[[], None]] = []
 
     def prepare_task_msg(self, *args, **kwargs) -> TaskObject:
         """Prepare a task."""
@@ -54,12 +68,43 @@ class BaseInterceptor(object):
         """Start an interceptor."""
         self._bundle_exec_id = bundle_exec_id
         self._mq_dao.init_buffer(self._interceptor_instance_id, bundle_exec_id)
+        self.telemetry_capture.start_sampler(self.intercept)
+        self._is_shm_child = False
+        if MQ_SHM_SIDECAR_ENABLED and self.kind == "instrumentation":
+            from flowcept.flowceptor.adapters.shm_sidecar import ShmSidecarPublisher
+
+            self._shm_sidecar = ShmSidecarPublisher(self).start()
+        if SELF_METRICS_ENABLED:
+            get_metrics_exporter().add_publisher(self._publish_metrics)
         return self
 
     def stop(self) -> bool:
         """Stop an interceptor."""
+        for callback in self._stop_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                self.logger.exception(e)
+        if self._is_shm_child:
+            # The MQ buffer and the stop control messages belong to the parent process.
+            return
+        if self._shm_sidecar is not None:
+            self._shm_sidecar.stop()
+            self._shm_sidecar = None
+        self.telemetry_capture.stop_sampler()
+        self.telemetry_capture.log_collector_costs()
+        if SELF_METRICS_ENABLED:
+            get_metrics_exporter().remove_publisher(self._publish_metrics)
         self._mq_dao.stop(self._interceptor_instance_id, self._bundle_exec_id)
 
+    def add_stop_callback(self, callback: Callable[[], None]):
+        """Call `callback` when this interceptor stops, before its buffer is flushed, e.g., to emit held tasks."""
+        self._stop_callbacks.append(callback)
+
+    def add_publish_callback(self, callback: Callable[[List[Dict]], None]):
+        """Call `callback` with the messages about to be published, in the thread that flushes the buffer."""
+        self._mq_dao.add_publish_callback(callback)
+
     def observe(self, *args, **kwargs):
         """Observe data.
 
@@ -89,21 +134,55 @@ class BaseInterceptor(object):
             # TODO :base-interceptor-refactor: :code-reorg: :usability:
             raise Exception(f"This interceptor {id(self)} has never been started!")
         workflow_obj.interceptor_ids = [self._interceptor_instance_id]
-        machine_info = self.telemetry_capture.capture_machine_info()
-        if machine_info is not None:
+        machine = self.telemetry_capture.get_machine_id_and_info()
+        if machine is not None:
+            machine_id, machine_info = machine
+            if machine_id not in BaseInterceptor._sent_machine_ids:
+                # The machine info goes once to the machines collection; workflows only keep its id.
+                BaseInterceptor._sent_machine_ids.add(machine_id)
+                machine_msg = {k: v for k, v in machine_info.items() if k not in PROCESS_INFO_FIELDS}
+                machine_msg.update({"type": "machine_info", "machine_id": machine_id})
+                self.intercept(machine_msg)
+            process_key = f"{machine_id}_{os.getpid()}"
+            if process_key not in BaseInterceptor._sent_process_keys:
+                # The info of this process, e.g., its environment, goes once to the processes collection.
+                BaseInterceptor._sent_process_keys.add(process_key)
+                process_msg = {k: machine_info[k] for k in PROCESS_INFO_FIELDS if k in machine_info}
+                process_msg.update(
+                    {
+                        "type": "process_info",
+                        "process_key": process_key,
+                        "machine_id": machine_id,
+                        "pid": os.getpid(),
+                    }
+                )
+                self.intercept(process_msg)
             if workflow_obj.machine_info is None:
                 workflow_obj.machine_info = dict()
             # TODO :refactor-base-interceptor: we might want to register
             # machine info even when there's no observer
-            workflow_obj.machine_info[self._interceptor_instance_id] = machine_info
+            workflow_machine_info = {"machine_id": machine_id}
+            rank_env = {k: os.environ[k] for k in RANK_ENV_VARS if k in os.environ}
+            if rank_env:
+                workflow_machine_info["rank_env"] = rank_env
+            workflow_obj.machine_info[self._interceptor_instance_id] = workflow_machine_info
         if ENRICH_MESSAGES:
             workflow_obj.enrich(self.settings.key if self.settings else None)
         self.intercept(workflow_obj.to_dict())
         return wf_id
 
+    def _publish_metrics(self, metrics_msg: Dict):
+        if SELF_METRICS_TO_MQ:
+            self._mq_dao.buffer.append(metrics_msg)
+
     def intercept(self, obj_msg: Dict):
         """Intercept a message."""
-        self._mq_dao.buffer.append(obj_msg)
+        if SELF_METRICS_ENABLED:
+            t0 = perf_counter()
+            self._mq_dao.buffer.append(obj_msg)
+            METRICS.histogram("interceptor_enqueue_latency").record(perf_counter() - t0)
+        else:
+            self._mq_dao.buffer.append(obj_msg)
 
     def intercept_many(self, obj_messages: List[Dict]):
         """Intercept a list of messages."""
@@ -0,0 +1,153 @@
+"""Shared memory sidecar publisher module."""
+
+import os
+from threading import Event, Thread
+from time import sleep, time
+from typing import Dict, List
+
+import msgpack
+
+from flowcept.commons.flowcept_logger import FlowceptLogger
+from flowcept.commons.shm_ring import SharedMemoryRing
+from flowcept.configs import (
+    MQ_SHM_DRAIN_INTERVAL,
+    MQ_SHM_RING_SIZE_MB,
+    MQ_SHM_WRITE_TIMEOUT,
+)
+
+_active_sidecar: "ShmSidecarPublisher" = None
+
+
+class ShmRingWriter:
+    """Interceptor buffer used by forked children: it encodes messages into the ring.
+
+    It has the same ``append``/``extend``/``stop`` interface as the MQ buffers, so the
+    interceptor code path does not change in the children.
+    """
+
+    def __init__(self, ring: SharedMemoryRing, write_timeout: float = MQ_SHM_WRITE_TIMEOUT):
+        self._ring = ring
+        self._write_timeout = write_timeout
+        self.logger = FlowceptLogger()
+
+    def _write(self, messages: List[Dict]):
+        try:
+            payload = msgpack.dumps(messages)
+        except Exception as e:
+            self.logger.exception(e)
+            self.logger.error(f"Could not encode {len(messages)} messages into the shared memory ring.")
+            self._ring.record_drop(len(messages), timeout=self._write_timeout)
+            return
+        deadline = time() + self._write_timeout
+        while not self._ring.write(payload, timeout=self._write_timeout):
+            if time() >= deadline:
+                self._ring.record_drop(len(messages), timeout=self._write_timeout)
+                return
+            sleep(0.001)
+
+    def append(self, item: Dict):
+        """Append it."""
+        self._write([item])
+
+    def extend(self, items: List[Dict]):
+        """Extend it."""
+        items = list(items)
+        if items:
+            self._write(items)
+
+    def stop(self):
+        """Stop it. Writes are synchronous, so there is nothing left to flush."""
+        pass
+
+
+class ShmSidecarPublisher:
+    """Drain messages written by forked children into the parent interceptor's buffer.
+
+    With ``mq.shm_sidecar.enabled``, children forked after the instrumentation
+    interceptor starts (e.g., ``multiprocessing.Pool`` or ``DataLoader`` workers using the
+    fork start method) do not open MQ connections nor start flush threads. Their
+    interceptor buffer is replaced by a ``ShmRingWriter`` and this sidecar thread, in the
+    parent, moves their messages to the parent's MQ buffer in batches. Children started
+    with the spawn start method are not affected and use the regular path.
+    """
+
+    def __init__(
+        self,
+        interceptor,
+        ring_size_mb: float = MQ_SHM_RING_SIZE_MB,
+        drain_interval=MQ_SHM_DRAIN_INTERVAL,
+        lock_timeout: float = 1.0,
+    ):
+        self.logger = FlowceptLogger()
+        self._interceptor = interceptor
+        self._ring = SharedMemoryRing(int(ring_size_mb * 1024 * 1024))
+        self._drain_interval = drain_interval
+        # A child killed while holding the ring lock (e.g., by Pool.terminate()) would otherwise wedge the drain.
+        self._lock_timeout = lock_timeout
+        self._lock_timed_out = False
+        self._owner_pid = os.getpid()
+        self._stop_event = Event()
+        self._thread = Thread(target=self._drain_loop, daemon=True)
+
+    def start(self) -> "ShmSidecarPublisher":
+        """Start draining the ring and redirect future forked children into it."""
+        global _active_sidecar
+        _active_sidecar = self
+        self._thread.start()
+        return self
+
+    def _drain(self):
+        try:
+            records = self._ring.read_all(timeout=self._lock_timeout)
+        except TimeoutError:
+            if not self._lock_timed_out:
+                self._lock_timed_out = True
+                self.logger.warning(
+                    "Could not drain the shared memory ring: its lock is held, maybe by a child that was killed."
+                )
+            return
+        self._lock_timed_out = False
+        messages = []
+        for record in records:
+            messages.extend(msgpack.loads(record, strict_map_key=False))
+        if messages:
+            self._interceptor.intercept_many(messages)
+
+    def _drain_loop(self):
+        while not self._stop_event.wait(self._drain_interval):
+            try:
+                self._drain()
+            except Exception as e:
+                self.logger.exception(e)
+
+    def stop(self):
+        """Drain the ring one last time and destroy it."""
+        global _active_sidecar
+        if _active_sidecar is self:
+            _active_sidecar = None
+        self._stop_event.set()
+        self._thread.join(timeout=self._lock_timeout + self._drain_interval + 5)
+        if self._thread.is_alive():
+            self.logger.warning("The shared memory sidecar thread did not stop; its pending messages are lost.")
+        else:
+            self._drain()
+        if self._ring.dropped:
+            self.logger.warning(
+                f"Forked children dropped {self._ring.dropped} messages (full ring or encoding errors)."
+            )
+        self._ring.unlink()
+
+    def _install_in_child(self):
+        self._interceptor._shm_sidecar = None
+        self._interceptor._is_shm_child = True
+        self._interceptor.set_buffer(ShmRingWriter(self._ring))
+
+
+def _after_fork_in_child():
+    # Grandchildren also write into the ring of the original parent.
+    if _active_sidecar is not None and _active_sidecar._owner_pid != os.getpid():
+        _active_sidecar._install_in_child()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
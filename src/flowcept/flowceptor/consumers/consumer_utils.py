@@ -154,3 +154,68 @@ def curate_dict_task_messages(
 
         indexed_buffer[indexing_key_value].update(**doc)
     return indexed_buffer
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def expand_task_block(block: Dict) -> List[Dict]:
+    """
+    Expand a columnar ``task_block`` message into one task message per row.
+
+    Parameters
+    ----------
+    block : dict
+        A ``task_block`` message, e.g., one emitted by ``FlowceptColumnarLoop``. Its
+        ``columns`` field holds the ``i``, ``started_at``, and ``ended_at`` lists, plus
+        ``used`` and ``generated`` dicts of lists, and, optionally, a ``fields`` dict of lists
+        of other task fields.
+
+    Returns
+    -------
+    list of dict
+        Task messages (``type="task"``, ``subtype="iteration"``) whose task ids are
+        ``group_id + str(i)``, as for the other loop classes. Missing generated values
+        (None or NaN) are left out. Block-level telemetry goes to the first and last tasks.
+    """
+    columns = block["columns"]
+    indices = columns["i"]
+    started_at = columns["started_at"]
+    ended_at = columns["ended_at"]
+    used_columns = columns.get("used", {})
+    generated_columns = columns.get("generated", {})
+    field_columns = columns.get("fields", {})
+    common = {
+        k: v
+        for k, v in block.items()
+        if k not in {"type", "task_id", "columns", "started_at", "ended_at", "telemetry_at_start", "telemetry_at_end"}
+    }
+    common["type"] = "task"
+    common["subtype"] = "iteration"
+    group_id = block["group_id"]
+
+    tasks = []
+    for row, i in enumerate(indices):
+        task = dict(common)
+        task["task_id"] = group_id + str(i)
+        task["started_at"] = started_at[row]
+        task["ended_at"] = ended_at[row]
+        used = {"i": i}
+        for key, column in used_columns.items():
+            used[key] = column[row]
+        task["used"] = used
+        task["generated"] = {
+            key: column[row] for key, column in generated_columns.items() if not _is_missing(column[row])
+        }
+        for key, column in field_columns.items():
+            if column[row] is not None:
+                task[key] = column[row]
+        tasks.append(task)
+
+    if tasks:
+        if "telemetry_at_start" in block:
+            tasks[0]["telemetry_at_start"] = block["telemetry_at_start"]
+        if "telemetry_at_end" in block:
+            tasks[-1]["telemetry_at_end"] = block["telemetry_at_end"]
+    return tasks
@@ -1,17 +1,21 @@
 """Document Inserter module."""
 
+from collections import OrderedDict
 from threading import Thread
-from time import time, sleep
+from time import time, sleep, perf_counter
 from typing import Dict
 from uuid import uuid4
 
 from flowcept.commons.autoflush_buffer import AutoflushBuffer
 from flowcept.commons.daos.mq_dao.mq_dao_base import MQDao
 from flowcept.commons.flowcept_dataclasses.task_object import TaskObject
+from flowcept.commons.flowcept_dataclasses.telemetry import TelemetrySnapshotRef
 from flowcept.commons.flowcept_dataclasses.workflow_object import (
     WorkflowObject,
 )
 from flowcept.commons.flowcept_logger import FlowceptLogger
+from flowcept.commons.query_utils import ITERATION_BLOCK
+from flowcept.commons.self_metrics import METRICS, get_metrics_exporter
 from flowcept.commons.utils import GenericJSONDecoder
 from flowcept.commons.vocabulary import Status
 from flowcept.configs import (
@@ -26,9 +30,12 @@ from flowcept.configs import (
     ENRICH_MESSAGES,
     MONGO_ENABLED,
     LMDB_ENABLED,
+    EXPAND_TASK_BLOCKS,
+    SELF_METRICS_ENABLED,
 )
 from flowcept.flowceptor.consumers.consumer_utils import (
     remove_empty_fields_from_dict,
+    expand_task_block,
 )
 
 
@@ -36,6 +43,7 @@ class DocumentInserter:
     """Document class."""
 
     DECODER = GenericJSONDecoder if JSON_SERIALIZER == "complex" else None
+    TELEMETRY_SNAPSHOT_CACHE_SIZE = 10_000
 
     # TODO: :code-reorg: Should this be in utils?
     @staticmethod
@@ -70,6 +78,10 @@ class DocumentInserter:
         self._curr_max_buffer_size = DB_MAX_BUFFER_SIZE
         self._bundle_exec_id = bundle_exec_id
         self.check_safe_stops = check_safe_stops
+        self._telemetry_snapshots = OrderedDict()
+        self._saved_machine_ids = set()
+        self._saved_process_keys = set()
+        self._saved_profile_hashes = set()
         self.buffer: AutoflushBuffer = AutoflushBuffer(
             max_size=self._curr_max_buffer_size,
             flush_interval=INSERTION_BUFFER_TIME,
@@ -93,8 +105,14 @@ class DocumentInserter:
     def flush_function(buffer, doc_daos, logger):
         """Flush it."""
         logger.info(f"Current Doc buffer size: {len(buffer)}, Gonna flush {len(buffer)} msgs to DocDBs!")
+        if SELF_METRICS_ENABLED:
+            METRICS.gauge("docdb_buffer_depth").set(len(buffer))
         for dao in doc_daos:
+            t0 = perf_counter() if SELF_METRICS_ENABLED else 0
             dao.insert_and_update_many_tasks(buffer, TaskObject.task_id_field())
+            if SELF_METRICS_ENABLED:
+                METRICS.histogram(f"docdb_write_time_{dao.__class__.__name__}").record(perf_counter() - t0)
+                METRICS.counter(f"docdb_docs_written_{dao.__class__.__name__}").inc(len(buffer))
             logger.debug(
                 f"DocDao={id(dao)},DocDaoClass={dao.__class__.__name__};\
                 Flushed {len(buffer)} msgs to this DocDB!"
@@ -123,6 +141,13 @@ class DocumentInserter:
         if "finished" in message and message["finished"]:
             message["status"] = Status.FINISHED.value
 
+        if SELF_METRICS_ENABLED:
+            produced_at = message.get("ended_at", None) or message.get("started_at", None)
+            if isinstance(produced_at, (int, float)):
+                METRICS.histogram("consumer_lag").record(max(0.0, time() - produced_at))
+
+        self._resolve_telemetry_refs(message)
+
         message.pop("type")
 
         if ENRICH_MESSAGES:
@@ -134,6 +159,69 @@ class DocumentInserter:
         self.logger.debug(f"Received following Task msg in DocInserter:\n\t[BEGIN_MSG]{message}\n[END_MSG]\t")
         self.buffer.append(message)
 
+    def _handle_telemetry_snapshot_message(self, message: Dict):
+        key = (message["series_id"], message["sample_index"])
+        self._telemetry_snapshots[key] = message["telemetry"]
+        if len(self._telemetry_snapshots) > DocumentInserter.TELEMETRY_SNAPSHOT_CACHE_SIZE:
+            self._telemetry_snapshots.popitem(last=False)
+
+    def _handle_telemetry_block_message(self, message: Dict):
+        message.pop("type")
+        for dao in self._doc_daos:
+            dao.upsert_docs("telemetry", [message])
+
+    def _handle_metrics_message(self, message: Dict):
+        message.pop("type", None)
+        for dao in self._doc_daos:
+            dao.upsert_docs("metrics", [message])
+
+    def _handle_machine_info_message(self, message: Dict):
+        message.pop("type")
+        if message["machine_id"] in self._saved_machine_ids:
+            return
+        self._saved_machine_ids.add(message["machine_id"])
+        for dao in self._doc_daos:
+            dao.upsert_docs("machines", [message])
+
+    def _handle_process_info_message(self, message: Dict):
+        message.pop("type")
+        if message["process_key"] in self._saved_process_keys:
+            return
+        self._saved_process_keys.add(message["process_key"])
+        for dao in self._doc_daos:
+            dao.upsert_docs("processes", [message])
+
+    def _handle_model_profile_message(self, message: Dict):
+        message.pop("type")
+        if message["profile_hash"] in self._saved_profile_hashes:
+            return
+        self._saved_profile_hashes.add(message["profile_hash"])
+        for dao in self._doc_daos:
+            dao.upsert_docs("model_profiles", [message])
+
+    def _resolve_telemetry_refs(self, message: Dict):
+        for field in ("telemetry_at_start", "telemetry_at_end"):
+            ref = message.get(field, None)
+            if not TelemetrySnapshotRef.is_ref(ref):
+                continue
+            telemetry = self._telemetry_snapshots.get((ref["series_id"], ref["sample_index"]), None)
+            if telemetry is None:
+                # Kept as a reference; it can still be resolved from the series later.
+                self.logger.debug(f"Could not resolve the telemetry snapshot {ref}.")
+            else:
+                # Copied because several tasks may share the same snapshot.
+                message[field] = dict(telemetry)
+
+    def _handle_task_block_message(self, message: Dict):
+        if EXPAND_TASK_BLOCKS:
+            for task_message in expand_task_block(message):
+                self._handle_task_message(task_message)
+        else:
+            # Stored as a single task document, which keeps the columns as they are.
+            message["type"] = "task"
+            message["subtype"] = ITERATION_BLOCK
+            self._handle_task_message(message)
+
     def _handle_workflow_message(self, message: Dict):
         message.pop("type")
         self.logger.debug(f"Received following Workflow msg in DocInserter:\n\t[BEGIN_MSG]{message}\n[END_MSG]\t")
@@ -170,6 +258,9 @@ class DocumentInserter:
     def start(self, threaded=True) -> "DocumentInserter":
         """Start it."""
         self._mq_dao.subscribe()
+        if SELF_METRICS_ENABLED:
+            # The consumer's own metrics go straight to the DBs rather than through the MQ.
+            get_metrics_exporter().add_publisher(self._handle_metrics_message)
         if threaded:
             self._main_thread = Thread(target=self._start)
             self._main_thread.start()
@@ -184,6 +275,8 @@ class DocumentInserter:
 
     def _message_handler(self, msg_obj: dict):
         msg_type = msg_obj.get("type")
+        if SELF_METRICS_ENABLED:
+            METRICS.counter("consumer_messages_received").inc()
         if msg_type == "flowcept_control":
             r = self._handle_control_message(msg_obj)
             if r == "stop":
@@ -192,6 +285,27 @@ class DocumentInserter:
         elif msg_type == "task":
             self._handle_task_message(msg_obj)
             return True
+        elif msg_type == "telemetry_snapshot":
+            self._handle_telemetry_snapshot_message(msg_obj)
+            return True
+        elif msg_type == "telemetry_block":
+            self._handle_telemetry_block_message(msg_obj)
+            return True
+        elif msg_type == "machine_info":
+            self._handle_machine_info_message(msg_obj)
+            return True
+        elif msg_type == "process_info":
+            self._handle_process_info_message(msg_obj)
+            return True
+        elif msg_type == "flowcept_metrics":
+            self._handle_metrics_message(msg_obj)
+            return True
+        elif msg_type == "model_profile":
+            self._handle_model_profile_message(msg_obj)
+            return True
+        elif msg_type == "task_block":
+            self._handle_task_block_message(msg_obj)
+            return True
         elif msg_type == "workflow":
             self._handle_workflow_message(msg_obj)
             return True
@@ -230,6 +344,8 @@ class DocumentInserter:
         self._mq_dao.send_document_inserter_stop()
         self.logger.info(f"Doc Inserter {id(self)} Sent message to stop itself.")
         self._main_thread.join()
+        if SELF_METRICS_ENABLED:
+            get_metrics_exporter().remove_publisher(self._handle_metrics_message)
         for dao in self._doc_daos:
             self.logger.info(f"Closing document_inserter {dao.__class__.__name__} connection.")
             dao.close()
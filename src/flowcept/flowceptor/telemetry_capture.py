@@ -1,45 +1,71 @@
 """Telemetry module."""
 
-from typing import Callable, Set, List
+from hashlib import sha256
+from threading import Event, Lock, Thread
+from time import perf_counter_ns, time
+from typing import Callable, Dict, Set, List, Tuple, Union
+from uuid import uuid4
 
+import json
 import psutil
 import platform
-import cpuinfo
 import os
+import sys
 
 from flowcept.commons.flowcept_logger import FlowceptLogger
 from flowcept.configs import (
     TELEMETRY_CAPTURE,
-    HOSTNAME,
+    get_hostname,
     LOGIN_NAME,
 )
-from flowcept.commons.flowcept_dataclasses.telemetry import Telemetry
+from flowcept.commons.flowcept_dataclasses.telemetry import Telemetry, TelemetrySnapshotRef
+from flowcept.commons.telemetry_series import TelemetrySeriesEncoder
 
 
 class GPUCapture:
-    """GPU Capture class."""
+    """GPU Capture class.
+
+    The vendor library (amdsmi first, then pynvml) is only imported and initialized the
+    first time GPU telemetry is captured, and the device handles and static device info
+    (e.g., names) are kept until `shutdown`.
+    """
 
     VISIBLE_GPUS: List = None
     GPU_VENDOR: str = None
     GPU_HANDLES = None
     capture_func: Callable = None
+    _lib = None
+    _initialized = False
+    _init_lock = Lock()
+    _static_info: Dict = {}
+
+    @staticmethod
+    def initialize():
+        """Initialize the GPU vendor library and device handles, if not done yet."""
+        if GPUCapture._initialized:
+            return
+        with GPUCapture._init_lock:
+            if not GPUCapture._initialized:
+                GPUCapture._init_gpu()
+                GPUCapture._initialized = True
 
     @staticmethod
     def _initialize_nvidia():
         """Initialize NVIDIA GPU."""
         try:
-            from pynvml import nvmlDeviceGetCount, nvmlInit
+            import pynvml
 
+            pynvml.nvmlInit()
             visible_devices_var = os.environ.get("CUDA_VISIBLE_DEVICES")
             if visible_devices_var:
                 visible_devices = [int(i) for i in visible_devices_var.split(",")]
             else:
-                nvmlInit()
-                visible_devices = list(range(nvmlDeviceGetCount()))
+                visible_devices = list(range(pynvml.nvmlDeviceGetCount()))
 
+            GPUCapture._lib = pynvml
             GPUCapture.GPU_VENDOR = "nvidia"
             GPUCapture.VISIBLE_GPUS = visible_devices
-            GPUCapture.GPU_HANDLES = []  # TODO: Handle GPU handles if needed
+            GPUCapture.GPU_HANDLES = {ix: pynvml.nvmlDeviceGetHandleByIndex(ix) for ix in visible_devices}
             GPUCapture.capture_func = GPUCapture.__get_gpu_info_nvidia
         except Exception as e:
             FlowceptLogger().debug(str(e))
@@ -48,20 +74,18 @@ class GPUCapture:
     def _initialize_amd():
         """Initialize AMD GPU."""
         try:
-            from amdsmi import (
-                amdsmi_init,
-                amdsmi_get_processor_handles,
-            )
+            import amdsmi
 
             visible_devices_var = os.environ.get("ROCR_VISIBLE_DEVICES")
-            amdsmi_init()
-            GPUCapture.GPU_HANDLES = amdsmi_get_processor_handles()
+            amdsmi.amdsmi_init()
+            GPUCapture.GPU_HANDLES = amdsmi.amdsmi_get_processor_handles()
 
             if visible_devices_var:
                 visible_devices = [int(i) for i in visible_devices_var.split(",")]
             else:
                 visible_devices = list(range(len(GPUCapture.GPU_HANDLES)))
 
+            GPUCapture._lib = amdsmi
             GPUCapture.VISIBLE_GPUS = visible_devices
             GPUCapture.GPU_VENDOR = "amd"
             GPUCapture.capture_func = GPUCapture.__get_gpu_info_amd
@@ -71,53 +95,66 @@ class GPUCapture:
 
     @staticmethod
     def _init_gpu():
-        if TELEMETRY_CAPTURE is not None and TELEMETRY_CAPTURE.get("gpu", None) is not None:
-            if TELEMETRY_CAPTURE.get("gpu", None) is not None:
-                # First, try AMD:
-                GPUCapture._initialize_amd()
-                # If didn't work, try Nvidia
-                if not GPUCapture.GPU_VENDOR:
-                    GPUCapture._initialize_nvidia()
-
-            if not GPUCapture.VISIBLE_GPUS:
-                FlowceptLogger().error("We couldn't see any GPU, but your settings have GPU telemetry capture.")
-            elif len(GPUCapture.VISIBLE_GPUS):
-                FlowceptLogger().debug(f"Visible GPUs in Flowcept Capture: {GPUCapture.VISIBLE_GPUS}")
+        # First, try AMD:
+        GPUCapture._initialize_amd()
+        # If didn't work, try Nvidia
+        if not GPUCapture.GPU_VENDOR:
+            GPUCapture._initialize_nvidia()
+
+        if not GPUCapture.VISIBLE_GPUS:
+            FlowceptLogger().error("We couldn't see any GPU, but your settings have GPU telemetry capture.")
+        elif len(GPUCapture.VISIBLE_GPUS):
+            FlowceptLogger().debug(f"Visible GPUs in Flowcept Capture: {GPUCapture.VISIBLE_GPUS}")
 
     @staticmethod
     def shutdown():
         """Shutdown GPU Telemetry capture."""
         if GPUCapture.GPU_VENDOR == "nvidia":
             try:
-                nvmlShutdown()
+                GPUCapture._lib.nvmlShutdown()
             except Exception as e:
                 FlowceptLogger().exception(e)
         elif GPUCapture.GPU_VENDOR == "amd":
             try:
-                amdsmi_shut_down()
+                GPUCapture._lib.amdsmi_shut_down()
             except Exception as e:
                 FlowceptLogger().exception(e)
         else:
             FlowceptLogger().error("Could not end any GPU!")
+        GPUCapture.VISIBLE_GPUS = None
+        GPUCapture.GPU_VENDOR = None
+        GPUCapture.GPU_HANDLES = None
+        GPUCapture.capture_func = None
+        GPUCapture._lib = None
+        GPUCapture._static_info = {}
+        GPUCapture._initialized = False
         FlowceptLogger().debug("GPU capture end!")
 
+    @staticmethod
+    def _get_static(gpu_ix: int, key: str, func: Callable):
+        """Get a device property that does not change, querying it only the first time."""
+        static_key = (gpu_ix, key)
+        if static_key not in GPUCapture._static_info:
+            GPUCapture._static_info[static_key] = func()
+        return GPUCapture._static_info[static_key]
+
     @staticmethod
     def __get_gpu_info_nvidia(gpu_conf: Set = None, gpu_ix: int = 0):
-        device = nvmlDeviceGetHandleByIndex(gpu_ix)
-        nvidia_info = nvmlDeviceGetMemoryInfo(device)
+        nvml = GPUCapture._lib
+        device = GPUCapture.GPU_HANDLES[gpu_ix]
         flowcept_gpu_info = {}
 
         if "used" in gpu_conf:
-            flowcept_gpu_info["used"] = nvidia_info.used
+            flowcept_gpu_info["used"] = nvml.nvmlDeviceGetMemoryInfo(device).used
 
         if "temperature" in gpu_conf:
-            flowcept_gpu_info["temperature"] = nvmlDeviceGetTemperature(device, NVML_TEMPERATURE_GPU)
+            flowcept_gpu_info["temperature"] = nvml.nvmlDeviceGetTemperature(device, nvml.NVML_TEMPERATURE_GPU)
 
         if "power" in gpu_conf:
-            flowcept_gpu_info["power"] = nvmlDeviceGetPowerUsage(device)
+            flowcept_gpu_info["power"] = nvml.nvmlDeviceGetPowerUsage(device)
 
         if "name" in gpu_conf:
-            flowcept_gpu_info["name"] = nvmlDeviceGetName(device)
+            flowcept_gpu_info["name"] = GPUCapture._get_static(gpu_ix, "name", lambda: nvml.nvmlDeviceGetName(device))
 
         if "ix" in gpu_conf:
             flowcept_gpu_info["gpu_ix"] = gpu_ix
@@ -127,17 +164,19 @@ class GPUCapture:
     @staticmethod
     def __get_gpu_info_amd(gpu_conf: Set = None, gpu_ix: int = 0):
         # See: https://rocm.docs.amd.com/projects/amdsmi/en/docs-5.7.1/py-interface_readme_link.html#api
+        amdsmi = GPUCapture._lib
         device = GPUCapture.GPU_HANDLES[gpu_ix]
         flowcept_gpu_info = {"gpu_ix": gpu_ix}
 
         if "used" in gpu_conf:
-            flowcept_gpu_info["used"] = amdsmi_get_gpu_memory_usage(device, AmdSmiMemoryType.VRAM)
+            flowcept_gpu_info["used"] = amdsmi.amdsmi_get_gpu_memory_usage(device, amdsmi.AmdSmiMemoryType.VRAM)
 
         if "activity" in gpu_conf:
-            flowcept_gpu_info["activity"] = amdsmi_get_gpu_activity(device)
+            flowcept_gpu_info["activity"] = amdsmi.amdsmi_get_gpu_activity(device)
 
+        # One metrics call serves power, temperature, and clocks.
         if "power" in gpu_conf or "temperature" in gpu_conf or "others" in gpu_conf:
-            all_metrics = amdsmi_get_gpu_metrics_info(device)
+            all_metrics = amdsmi.amdsmi_get_gpu_metrics_info(device)
         else:
             return flowcept_gpu_info
 
@@ -160,7 +199,7 @@ class GPUCapture:
             }
         if "others" in gpu_conf:
             flowcept_gpu_info["others"] = {
-                "uuid": amdsmi_get_gpu_device_uuid(device),
+                "uuid": GPUCapture._get_static(gpu_ix, "uuid", lambda: amdsmi.amdsmi_get_gpu_device_uuid(device)),
                 "current_gfxclk": all_metrics["current_gfxclk"],
                 "current_socclk": all_metrics["current_socclk"],
                 "current_uclk": all_metrics["current_uclk"],
@@ -171,74 +210,424 @@ class GPUCapture:
         return flowcept_gpu_info
 
 
-GPUCapture._init_gpu()
+TELEMETRY_PROFILES = {
+    "minimal": {"cpu": True, "per_cpu": False, "mem": True, "disk": False, "network": False, "process_info": False},
+    "standard": {"cpu": True, "per_cpu": False, "mem": True, "disk": True, "network": True, "process_info": False},
+    "full": {"cpu": True, "per_cpu": True, "mem": True, "disk": True, "network": True, "process_info": True},
+}
+
+
+def resolve_telemetry_profile(conf: Dict) -> Dict:
+    """
+    Expand the ``profile`` of a telemetry capture configuration.
+
+    The profile (``minimal``, ``standard``, or ``full``) sets the ``cpu``, ``per_cpu``,
+    ``mem``, ``disk``, ``network``, and ``process_info`` collectors. Collectors explicitly
+    set in the configuration override the profile. ``gpu`` and ``machine_info`` are not
+    part of the profiles.
+    """
+    if conf is None or conf.get("profile", None) is None:
+        return conf
+    profile = conf["profile"]
+    if profile not in TELEMETRY_PROFILES:
+        raise Exception(f"Unknown telemetry profile {profile}. Use one of {list(TELEMETRY_PROFILES)}.")
+    resolved = dict(TELEMETRY_PROFILES[profile])
+    resolved.update({k: v for k, v in conf.items() if v is not None or k not in resolved})
+    return resolved
+
+
+# Machine info fields that identify a machine: the machine id is a hash of their content.
+MACHINE_ID_FIELDS = ("hostname", "login_name", "platform", "cpu", "network")
+# Machine info fields that differ between processes on the same machine, e.g., between ranks.
+PROCESS_INFO_FIELDS = ("process", "environment")
+# Environment variables that tell the rank of a process, kept in the workflows' machine_info.
+RANK_ENV_VARS = (
+    "RANK",
+    "LOCAL_RANK",
+    "WORLD_SIZE",
+    "LOCAL_WORLD_SIZE",
+    "SLURM_PROCID",
+    "OMPI_COMM_WORLD_RANK",
+    "PMI_RANK",
+    "CUDA_VISIBLE_DEVICES",
+)
+# CPU info fields that change between captures, left out of the machine id.
+_VOLATILE_CPU_FIELDS = ("hz_actual", "hz_actual_friendly")
+
+
+class CollectorCost:
+    """Running cost of one telemetry collector, measured in the cost accounting mode."""
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.disabled = False
+
+    def add(self, elapsed_ns: int):
+        """Account for one call."""
+        self.calls += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+
+    @property
+    def mean_ms(self) -> float:
+        """Average cost per call, in milliseconds."""
+        return self.total_ns / self.calls / 1e6 if self.calls else 0.0
+
+    def to_dict(self):
+        """Convert to dictionary."""
+        return {
+            "calls": self.calls,
+            "mean_ms": self.mean_ms,
+            "max_ms": self.max_ns / 1e6,
+            "total_ms": self.total_ns / 1e6,
+            "disabled": self.disabled,
+        }
+
+
+class TelemetrySampler:
+    """Background thread that samples telemetry into a ring of snapshots.
+
+    Parameters
+    ----------
+    sample_func : Callable
+        Function that takes one snapshot (a full telemetry sweep).
+    interval : float
+        Seconds between samples.
+    ring_size : int
+        Number of most recent snapshots kept.
+    publish_func : Callable, optional
+        If given, the sampler works by reference: `reference` returns a
+        ``TelemetrySnapshotRef`` and the referenced snapshots are published once, with
+        this function, as ``telemetry_snapshot`` messages.
+    delta_block_size : int, optional
+        Only in the by-reference mode. If greater than 0, every sample is published
+        instead, as part of delta-encoded ``telemetry_block`` messages of up to this many
+        samples (see ``flowcept.commons.telemetry_series``).
+    """
+
+    def __init__(
+        self,
+        sample_func: Callable,
+        interval: float,
+        ring_size: int,
+        publish_func: Callable = None,
+        delta_block_size: int = 0,
+    ):
+        self.logger = FlowceptLogger()
+        self.series_id = uuid4().hex
+        self._sample_func = sample_func
+        self._interval = interval
+        self._ring_size = max(2, ring_size)
+        self._ring: List[Telemetry] = [None] * self._ring_size
+        self._sampled_at: List[float] = [0.0] * self._ring_size
+        self._count = 0
+        self._last_published = -1
+        self._publish_func = publish_func
+        self.by_reference = publish_func is not None
+        self._encoder = None
+        if self.by_reference and delta_block_size > 0:
+            self._encoder = TelemetrySeriesEncoder(self.series_id, delta_block_size)
+        self._stop_event = Event()
+        self._thread = Thread(target=self._sample_loop, daemon=True)
+
+    def start(self) -> "TelemetrySampler":
+        """Take the first sample and start sampling in the background."""
+        self._sample()
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        index = self._count
+        tel = self._sample_func()
+        sampled_at = time()
+        self._ring[index % self._ring_size] = tel
+        self._sampled_at[index % self._ring_size] = sampled_at
+        # Readers only look at indices below _count, so the slot is complete when they see it.
+        self._count = index + 1
+        if self._encoder is not None and tel is not None:
+            for block in self._encoder.add(index, sampled_at, tel.to_dict()):
+                self._publish_func(block)
+
+    def _sample_loop(self):
+        while not self._stop_event.wait(self._interval):
+            try:
+                self._sample()
+            except Exception as e:
+                self.logger.exception(e)
 
-if GPUCapture.GPU_VENDOR == "amd":
-    from amdsmi import (
-        amdsmi_get_gpu_memory_usage,
-        amdsmi_shut_down,
-        AmdSmiMemoryType,
-        amdsmi_get_gpu_activity,
-        amdsmi_get_gpu_metrics_info,
-        amdsmi_get_gpu_device_uuid,
-    )
+    def latest(self) -> Telemetry:
+        """Get the most recent snapshot."""
+        return self._ring[(self._count - 1) % self._ring_size]
 
-    FlowceptLogger().debug("Imported AMD modules!")
-elif GPUCapture.GPU_VENDOR == "nvidia":
-    from pynvml import (
-        nvmlDeviceGetHandleByIndex,
-        nvmlDeviceGetMemoryInfo,
-        nvmlDeviceGetName,
-        nvmlShutdown,
-        nvmlDeviceGetTemperature,
-        nvmlDeviceGetPowerUsage,
-        NVML_TEMPERATURE_GPU,
-    )
+    def get(self, sample_index: int) -> Telemetry:
+        """Get a snapshot by index, or None if it is no longer (or not yet) in the ring."""
+        if sample_index < 0 or sample_index >= self._count or sample_index < self._count - self._ring_size:
+            return None
+        return self._ring[sample_index % self._ring_size]
+
+    def reference(self) -> TelemetrySnapshotRef:
+        """Get a reference to the most recent snapshot, publishing the snapshot the first time."""
+        index = self._count - 1
+        if self._encoder is None and index > self._last_published:
+            self._last_published = index
+            tel = self._ring[index % self._ring_size]
+            self._publish_func(
+                {
+                    "type": "telemetry_snapshot",
+                    "series_id": self.series_id,
+                    "sample_index": index,
+                    "sampled_at": self._sampled_at[index % self._ring_size],
+                    "telemetry": tel.to_dict() if tel is not None else None,
+                }
+            )
+        return TelemetrySnapshotRef(self.series_id, index)
 
-    FlowceptLogger().debug("Imported Nvidia modules!")
+    def stop(self):
+        """Stop sampling and publish the pending telemetry block, if any."""
+        self._stop_event.set()
+        self._thread.join()
+        if self._encoder is not None:
+            block = self._encoder.flush()
+            if block is not None:
+                self._publish_func(block)
 
 
 class TelemetryCapture:
-    """Telemetry class."""
+    """Telemetry class.
+
+    By default, `capture` runs a full telemetry sweep each time it is called. If
+    ``telemetry_capture.sampler.enabled`` is set and `start_sampler` was called (the
+    interceptors do it when they start), a background thread samples telemetry every
+    ``interval_secs`` instead, and `capture` returns the latest snapshot in O(1). With
+    ``by_reference``, it returns a ``TelemetrySnapshotRef`` to that snapshot instead, and
+    with ``delta_encoding`` the whole series is published as delta-encoded blocks.
+
+    The collectors can be chosen one by one or with a ``profile`` (see
+    `resolve_telemetry_profile`). With ``cost_accounting.enabled``, each collector is
+    timed (see `get_collector_costs`), and, if ``cost_accounting.budget_ms`` is set,
+    collectors whose average cost per capture exceeds it are disabled after
+    ``warmup_captures`` captures.
+
+    With ``backend: procfs`` (Linux only), the ``cpu``, ``mem``, ``network``, and
+    ``process_info`` collectors read /proc and cgroup v2 files directly (see
+    ``flowcept.flowceptor.telemetry_procfs``) instead of calling psutil.
+
+    GPU telemetry initializes the vendor library on first use. With
+    ``gpu_poller.enabled``, a background thread polls the GPUs every ``interval_secs``
+    and captures return the latest poll, so tasks do not wait on the vendor library.
+    """
+
+    # Machine info captured in this process, by (pid, hostname), with its machine id.
+    _MACHINE_INFO_CACHE: Dict[Tuple[int, str], Tuple[str, Dict]] = {}
 
     def __init__(self, conf=TELEMETRY_CAPTURE):
         self.logger = FlowceptLogger()
-        self.conf = conf
+        self.conf = resolve_telemetry_profile(conf)
         self._gpu_conf = None
+        self._sampler: TelemetrySampler = None
+        self._sampler_pid = None
+        self._costs: Dict[str, CollectorCost] = None
+        self._budget_ns = None
+        self._warmup_captures = 0
+        self._procfs = None
+        self._gpu_poller: TelemetrySampler = None
+        self._gpu_poller_pid = None
         if self.conf is not None:
             self._gpu_conf = self.conf.get("gpu", {})
             if self._gpu_conf is not None:
                 self._gpu_conf = set(self._gpu_conf)
-
-    def capture(self) -> Telemetry:
-        """Capture it."""
+            if self.conf.get("backend", "psutil") == "procfs":
+                if sys.platform.startswith("linux"):
+                    from flowcept.flowceptor.telemetry_procfs import ProcfsReader
+
+                    self._procfs = ProcfsReader()
+                else:
+                    self.logger.warning("The procfs telemetry backend only works on Linux. Using psutil instead.")
+        self._collectors = self._build_collectors()
+
+        cost_conf = self.conf.get("cost_accounting", None) if self.conf is not None else None
+        if cost_conf and cost_conf.get("enabled", False):
+            self._costs = {name: CollectorCost() for name, _, _ in self._collectors}
+            if cost_conf.get("budget_ms", None) is not None:
+                self._budget_ns = float(cost_conf["budget_ms"]) * 1e6
+            self._warmup_captures = max(1, int(cost_conf.get("warmup_captures", 5)))
+
+    def _build_collectors(self):
+        """Get the enabled collectors, as (name, Telemetry attribute, function) tuples."""
         if self.conf is None:
-            return None
-        tel = Telemetry()
+            return []
+        collectors = []
         if self.conf.get("process_info", False):
-            tel.process = self._capture_process_info()
+            collectors.append(("process_info", "process", self._capture_process_info))
 
         capt_cpu = self.conf.get("cpu", False)
         capt_per_cpu = self.conf.get("per_cpu", False)
         if capt_cpu or capt_per_cpu:
-            tel.cpu = self._capture_cpu(capt_cpu, capt_per_cpu)
+            collectors.append(("cpu", "cpu", lambda: self._capture_cpu(capt_cpu, capt_per_cpu)))
 
         if self.conf.get("mem", False):
-            tel.memory = self._capture_memory()
+            collectors.append(("mem", "memory", self._capture_memory))
 
         if self.conf.get("network", False):
-            tel.network = self._capture_network()
+            collectors.append(("network", "network", self._capture_network))
 
         if self.conf.get("disk", False):
-            tel.disk = self._capture_disk()
-
-        if self._gpu_conf is not None:  # TODO we might want to turn all tel types into lists
-            tel.gpu = self._capture_gpu()
-
+            collectors.append(("disk", "disk", self._capture_disk))
+
+        if self._gpu_conf:  # TODO we might want to turn all tel types into lists
+            collectors.append(("gpu", "gpu", self._capture_gpu))
+        return collectors
+
+    def start_sampler(self, publish_func: Callable = None):
+        """
+        Start background telemetry sampling, if enabled in the settings.
+
+        Parameters
+        ----------
+        publish_func : Callable, optional
+            Function used to publish the referenced snapshots in the by-reference mode.
+            Without it, the sampler returns snapshot values even if ``by_reference`` is set.
+        """
+        sampler_conf = self.conf.get("sampler", None) if self.conf is not None else None
+        if not sampler_conf or not sampler_conf.get("enabled", False):
+            return
+        if self._sampler is not None and self._sampler_pid == os.getpid():
+            return
+        if not sampler_conf.get("by_reference", False):
+            publish_func = None
+        self._sampler = TelemetrySampler(
+            sample_func=self._capture_now,
+            interval=float(sampler_conf.get("interval_secs", 0.5)),
+            ring_size=int(sampler_conf.get("ring_size", 64)),
+            publish_func=publish_func,
+            delta_block_size=int(sampler_conf.get("delta_block_size", 64)) if sampler_conf.get("delta_encoding") else 0,
+        ).start()
+        self._sampler_pid = os.getpid()
+
+    def stop_sampler(self):
+        """Stop background telemetry sampling and GPU polling, if they are running."""
+        if self._sampler is not None and self._sampler_pid == os.getpid():
+            self._sampler.stop()
+        self._sampler = None
+        self._sampler_pid = None
+        self._stop_gpu_poller()
+
+    def _stop_gpu_poller(self):
+        if self._gpu_poller is not None and self._gpu_poller_pid == os.getpid():
+            self._gpu_poller.stop()
+        self._gpu_poller = None
+        self._gpu_poller_pid = None
+
+    def capture(self) -> Union[Telemetry, TelemetrySnapshotRef]:
+        """Capture it."""
+        sampler = self._sampler
+        # After a fork, the sampler thread only exists in the parent.
+        if sampler is not None and self._sampler_pid == os.getpid():
+            if sampler.by_reference:
+                return sampler.reference()
+            return sampler.latest()
+        return self._capture_now()
+
+    def _capture_now(self) -> Telemetry:
+        if self.conf is None:
+            return None
+        tel = Telemetry()
+        if self._costs is None:
+            for _, attr, func in self._collectors:
+                setattr(tel, attr, func())
+            return tel
+
+        over_budget = []
+        for name, attr, func in self._collectors:
+            t0 = perf_counter_ns()
+            setattr(tel, attr, func())
+            cost = self._costs[name]
+            cost.add(perf_counter_ns() - t0)
+            if (
+                self._budget_ns is not None
+                and cost.calls >= self._warmup_captures
+                and cost.total_ns / cost.calls > self._budget_ns
+            ):
+                over_budget.append(name)
+        if over_budget:
+            self._disable_collectors(over_budget)
         return tel
 
+    def _disable_collectors(self, names: List[str]):
+        for name in names:
+            cost = self._costs[name]
+            cost.disabled = True
+            self.logger.warning(
+                f"Disabling the {name} telemetry collector: it costs {cost.mean_ms:.3f} ms per capture, "
+                f"over the budget of {self._budget_ns / 1e6} ms."
+            )
+        # Replaced, not mutated, so that concurrent captures keep iterating over the old list.
+        self._collectors = [c for c in self._collectors if c[0] not in names]
+
+    def get_collector_costs(self) -> Dict[str, Dict]:
+        """
+        Get the measured cost of each collector.
+
+        Returns
+        -------
+        dict
+            For each collector: number of calls, mean, max, and total cost in milliseconds,
+            and whether it was disabled for exceeding the budget. None if cost accounting
+            is not enabled.
+        """
+        if self._costs is None:
+            return None
+        return {name: cost.to_dict() for name, cost in self._costs.items()}
+
+    def log_collector_costs(self):
+        """Log the measured cost of each collector, if cost accounting is enabled."""
+        costs = self.get_collector_costs()
+        if not costs:
+            return
+        lines = [
+            f"{name}: {c['calls']} calls, mean {c['mean_ms']:.3f} ms, max {c['max_ms']:.3f} ms"
+            + (" (disabled)" if c["disabled"] else "")
+            for name, c in costs.items()
+        ]
+        self.logger.info("Telemetry collector costs: " + "; ".join(lines))
+
     def capture_machine_info(self):
-        """Capture info."""
+        """Capture info, once per process."""
+        machine = self.get_machine_id_and_info()
+        return machine[1] if machine is not None else None
+
+    def get_machine_id_and_info(self) -> Tuple[str, Dict]:
+        """
+        Get the machine info and its machine id.
+
+        The machine info is captured once per process and host; `cpuinfo` alone can take
+        seconds. The machine id is a content hash of the ``MACHINE_ID_FIELDS``, which only
+        describe the host, so all processes on the same host share it.
+
+        Returns
+        -------
+        tuple
+            The machine id and the machine info, or None if machine info capture is off.
+        """
+        if self.conf is None or self.conf.get("machine_info", None) is None:
+            return None
+        key = (os.getpid(), get_hostname())
+        machine = TelemetryCapture._MACHINE_INFO_CACHE.get(key, None)
+        if machine is None:
+            info = self._capture_machine_info_now()
+            if info is None:
+                return None
+            static_info = {field: info.get(field) for field in MACHINE_ID_FIELDS}
+            if isinstance(static_info["cpu"], dict):
+                static_info["cpu"] = {k: v for k, v in static_info["cpu"].items() if k not in _VOLATILE_CPU_FIELDS}
+            machine_id = sha256(json.dumps(static_info, sort_keys=True, default=str).encode()).hexdigest()
+            machine = TelemetryCapture._MACHINE_INFO_CACHE[key] = (machine_id, info)
+        return machine
+
+    def _capture_machine_info_now(self):
         # TODO: add ifs for each type of telem; improve this method overall
         if self.conf is None or self.conf.get("machine_info", None) is None:
             return None
@@ -253,6 +642,8 @@ class TelemetryCapture:
 
             platform_info = platform.uname()._asdict()
             network_info = psutil.net_if_addrs()
+            import cpuinfo
+
             processor_info = cpuinfo.get_cpu_info()
 
             gpu_info = None
@@ -266,7 +657,7 @@ class TelemetryCapture:
                 "cpu": processor_info,
                 "network": network_info,
                 "environment": dict(os.environ),
-                "hostname": HOSTNAME,
+                "hostname": get_hostname(),
                 "login_name": LOGIN_NAME,
                 "process": self._capture_process_info().__dict__,
             }
@@ -294,6 +685,8 @@ class TelemetryCapture:
 
     def _capture_network(self):
         try:
+            if self._procfs is not None:
+                return self._procfs.network()
             net = Telemetry.Network()
             net.netio_sum = psutil.net_io_counters(pernic=False)._asdict()
             pernic = psutil.net_io_counters(pernic=True)
@@ -307,6 +700,8 @@ class TelemetryCapture:
 
     def _capture_memory(self):
         try:
+            if self._procfs is not None:
+                return self._procfs.memory()
             mem = Telemetry.Memory()
             mem.virtual = psutil.virtual_memory()._asdict()
             mem.swap = psutil.swap_memory()._asdict()
@@ -316,6 +711,8 @@ class TelemetryCapture:
 
     def _capture_process_info(self):
         try:
+            if self._procfs is not None:
+                return self._procfs.process()
             p = Telemetry.Process()
             psutil_p = psutil.Process()
             with psutil_p.oneshot():
@@ -345,6 +742,8 @@ class TelemetryCapture:
 
     def _capture_cpu(self, capt_cpu, capt_per_cpu):
         try:
+            if self._procfs is not None:
+                return self._procfs.cpu(capt_cpu, capt_per_cpu)
             cpu = Telemetry.CPU()
             if capt_cpu:
                 cpu.times_avg = psutil.cpu_times(percpu=False)._asdict()
@@ -360,8 +759,25 @@ class TelemetryCapture:
             return None
 
     def _capture_gpu(self):
+        if self._gpu_conf is None or len(self._gpu_conf) == 0:
+            return
+        gpu_poller_conf = self.conf.get("gpu_poller", None)
+        if not gpu_poller_conf or not gpu_poller_conf.get("enabled", False):
+            return self._poll_gpu()
+        # After a fork, the poller thread only exists in the parent.
+        if self._gpu_poller is None or self._gpu_poller_pid != os.getpid():
+            self._gpu_poller = TelemetrySampler(
+                sample_func=self._poll_gpu,
+                interval=float(gpu_poller_conf.get("interval_secs", 0.5)),
+                ring_size=2,
+            ).start()
+            self._gpu_poller_pid = os.getpid()
+        return self._gpu_poller.latest()
+
+    def _poll_gpu(self):
         try:
-            if GPUCapture.VISIBLE_GPUS is None or self._gpu_conf is None or len(self._gpu_conf) == 0:
+            GPUCapture.initialize()
+            if GPUCapture.VISIBLE_GPUS is None:
                 return
             gpu_telemetry = {}
             for gpu_ix in GPUCapture.VISIBLE_GPUS:
@@ -376,4 +792,5 @@ class TelemetryCapture:
         if GPUCapture.VISIBLE_GPUS is None or self._gpu_conf is None or len(self._gpu_conf) == 0:
             self.logger.debug("GPU capture is off or has never been initialized, so we won't shut down.")
             return None
+        self._stop_gpu_poller()
         GPUCapture.shutdown()
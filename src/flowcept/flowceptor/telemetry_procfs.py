@@ -0,0 +1,435 @@
+"""Direct /proc and cgroup v2 telemetry backend module.
+
+Linux-only alternative to psutil for the ``cpu``, ``mem``, ``network``, and
+``process_info`` telemetry collectors (``telemetry_capture.backend: procfs``). The
+/proc, /sys, and cgroup files are opened once and re-read with ``os.preadv`` into
+preallocated buffers, and the values are parsed into preallocated arrays (the
+`ProcfsReader` record) before being turned into the same ``Telemetry`` objects the psutil
+path produces. The field names and units follow psutil's Linux implementation.
+"""
+
+import glob
+import os
+from array import array
+from threading import Lock
+from time import monotonic
+from typing import Dict, Optional
+
+from flowcept.commons.flowcept_dataclasses.telemetry import Telemetry
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+CPU_TIMES_FIELDS = ("user", "nice", "system", "idle", "iowait", "irq", "softirq", "steal", "guest", "guest_nice")
+MEMINFO_KEYS = (
+    b"MemTotal",
+    b"MemFree",
+    b"MemAvailable",
+    b"Buffers",
+    b"Cached",
+    b"SReclaimable",
+    b"Shmem",
+    b"Active",
+    b"Inactive",
+    b"Slab",
+    b"SwapTotal",
+    b"SwapFree",
+)
+_MEMINFO_INDEX = {key: i for i, key in enumerate(MEMINFO_KEYS)}
+NET_IO_FIELDS = ("bytes_sent", "bytes_recv", "packets_sent", "packets_recv", "errin", "errout", "dropin", "dropout")
+# Columns of /proc/net/dev (receive bytes, packets, errs, drop, ..., transmit bytes, packets,
+# errs, drop, ...) in the NET_IO_FIELDS order.
+_NET_DEV_COLUMNS = (8, 0, 9, 1, 2, 10, 3, 11)
+# Fields of /proc/[pid]/stat, counted after the command name: utime, stime, cutime, cstime,
+# num_threads, processor, and delayacct_blkio_ticks.
+_PROC_STAT_COLUMNS = (11, 12, 13, 14, 17, 36, 39)
+_INET_TABLES = ("tcp", "tcp6", "udp", "udp6")
+
+
+def _usage_percent(used, total) -> float:
+    return round(used / total * 100, 1) if total else 0.0
+
+
+class ProcFile:
+    """
+    A file kept open and re-read from the start into a reusable buffer.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file.
+    size : int, optional
+        Initial buffer size. The buffer doubles whenever the file does not fit.
+    """
+
+    def __init__(self, path: str, size: int = 4096):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        self._buf = bytearray(size)
+
+    def read(self) -> bytes:
+        """Read the whole file."""
+        while True:
+            n = os.preadv(self.fd, [self._buf], 0)
+            if n < len(self._buf):
+                return bytes(memoryview(self._buf)[:n])
+            self._buf = bytearray(2 * len(self._buf))
+
+    def close(self):
+        """Close the file."""
+        os.close(self.fd)
+
+
+class ProcfsReader:
+    """
+    Read telemetry from /proc, /sys, and cgroup v2 files.
+
+    Files are opened on first use and kept open; they are reopened after a fork, since
+    /proc/self resolves to the process that opened it. The latest values are kept in the
+    ``cpu_times``, ``meminfo``, ``swap_io``, ``proc_stat``, and ``net_io`` arrays.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        n_rows = (os.cpu_count() or 1) + 1
+        # Row 0 holds the total of all CPUs, and the following rows each CPU, in seconds.
+        self.cpu_times = array("d", bytes(8 * len(CPU_TIMES_FIELDS) * n_rows))
+        self._prev_cpu_times = array("d", self.cpu_times)
+        self._n_cpu_rows = 0
+        self.meminfo = array("q", bytes(8 * len(MEMINFO_KEYS)))
+        self.swap_io = array("q", [0, 0])
+        self.proc_stat = array("d", bytes(8 * len(_PROC_STAT_COLUMNS)))
+        self._prev_proc_cpu = (0.0, monotonic())
+        self.net_io: Dict[str, array] = {}
+        self._files: Dict[str, Optional[ProcFile]] = {}
+        self._reset()
+
+    def _reset(self):
+        for f in self._files.values():
+            if f is not None:
+                f.close()
+        self._pid = os.getpid()
+        self._files = {}
+        self._exe = None
+        self._cmdline = None
+        self._cgroup_dir = None
+        self._cpufreq_paths = None
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _file(self, path: str, size: int = 4096) -> Optional[ProcFile]:
+        """Get an open file, or None if it cannot be opened."""
+        if path not in self._files:
+            try:
+                self._files[path] = ProcFile(path, size)
+            except OSError:
+                self._files[path] = None
+        return self._files[path]
+
+    def _read_cpu_times(self):
+        self._prev_cpu_times[:] = self.cpu_times
+        width = len(CPU_TIMES_FIELDS)
+        max_rows = len(self.cpu_times) // width
+        row = 0
+        for line in self._file("/proc/stat").read().split(b"\n"):
+            if not line.startswith(b"cpu") or row == max_rows:
+                break
+            base = row * width
+            for i, value in enumerate(line.split()[1 : width + 1]):
+                self.cpu_times[base + i] = int(value) / _CLOCK_TICKS
+            row += 1
+        self._n_cpu_rows = row
+
+    def _cpu_times_dict(self, row: int) -> Dict[str, float]:
+        base = row * len(CPU_TIMES_FIELDS)
+        return dict(zip(CPU_TIMES_FIELDS, self.cpu_times[base : base + len(CPU_TIMES_FIELDS)]))
+
+    def _cpu_percent(self, row: int) -> float:
+        """Get the busy CPU percentage since the previous read, as psutil computes it."""
+        base = row * len(CPU_TIMES_FIELDS)
+        now = self.cpu_times[base : base + len(CPU_TIMES_FIELDS)]
+        prev = self._prev_cpu_times[base : base + len(CPU_TIMES_FIELDS)]
+        # guest and guest_nice are already included in user and nice; idle and iowait are not busy.
+        total = sum(now[:8]) - sum(prev[:8])
+        busy = total - (now[3] - prev[3]) - (now[4] - prev[4])
+        if total <= 0:
+            return 0.0
+        return round(min(max(busy / total * 100, 0.0), 100.0), 1)
+
+    def _cpu_frequency(self) -> float:
+        if self._cpufreq_paths is None:
+            self._cpufreq_paths = sorted(glob.glob("/sys/devices/system/cpu/cpufreq/policy*/scaling_cur_freq"))
+        freqs = []
+        for path in self._cpufreq_paths:
+            f = self._file(path, 64)
+            if f is not None:
+                freqs.append(int(f.read()) / 1000)
+        if not freqs:
+            f = self._file("/proc/cpuinfo", 65536)
+            if f is not None:
+                freqs = [float(line.split(b":")[1]) for line in f.read().split(b"\n") if line.startswith(b"cpu MHz")]
+        return sum(freqs) / len(freqs) if freqs else 0
+
+    def cpu(self, capt_cpu: bool, capt_per_cpu: bool) -> Telemetry.CPU:
+        """Get the CPU telemetry."""
+        with self._lock:
+            self._check_pid()
+            self._read_cpu_times()
+            cpu = Telemetry.CPU()
+            if capt_cpu:
+                cpu.times_avg = self._cpu_times_dict(0)
+                cpu.percent_all = self._cpu_percent(0)
+                cpu.frequency = self._cpu_frequency()
+            if capt_per_cpu:
+                rows = range(1, self._n_cpu_rows)
+                cpu.times_per_cpu = [self._cpu_times_dict(row) for row in rows]
+                cpu.percent_per_cpu = [self._cpu_percent(row) for row in rows]
+            return cpu
+
+    def _read_meminfo(self):
+        for line in self._file("/proc/meminfo").read().split(b"\n"):
+            key, _, rest = line.partition(b":")
+            i = _MEMINFO_INDEX.get(key)
+            if i is not None:
+                self.meminfo[i] = int(rest.split()[0]) * 1024
+
+    def _read_swap_io(self):
+        f = self._file("/proc/vmstat", 16384)
+        if f is None:
+            return
+        for line in f.read().split(b"\n"):
+            if line.startswith(b"pswpin "):
+                self.swap_io[0] = int(line[7:]) * 4 * 1024
+            elif line.startswith(b"pswpout "):
+                self.swap_io[1] = int(line[8:]) * 4 * 1024
+                break
+
+    def memory(self) -> Telemetry.Memory:
+        """Get the virtual memory and swap telemetry."""
+        with self._lock:
+            self._check_pid()
+            self._read_meminfo()
+            self._read_swap_io()
+            total, free, available, buffers, cached, reclaimable, shared, active, inactive, slab = self.meminfo[:10]
+            swap_total, swap_free = self.meminfo[10:]
+            cached += reclaimable
+            used = total - free - cached - buffers
+            if used < 0:
+                used = total - free
+            if not available:
+                available = free + cached + buffers
+            swap_used = swap_total - swap_free
+
+            mem = Telemetry.Memory()
+            mem.virtual = {
+                "total": total,
+                "available": available,
+                "percent": _usage_percent(total - available, total),
+                "used": used,
+                "free": free,
+                "active": active,
+                "inactive": inactive,
+                "buffers": buffers,
+                "cached": cached,
+                "shared": shared,
+                "slab": slab,
+            }
+            mem.swap = {
+                "total": swap_total,
+                "used": swap_used,
+                "free": swap_free,
+                "percent": _usage_percent(swap_used, swap_total),
+                "sin": self.swap_io[0],
+                "sout": self.swap_io[1],
+            }
+            return mem
+
+    def network(self) -> Telemetry.Network:
+        """Get the network I/O telemetry, in total and per active interface."""
+        with self._lock:
+            self._check_pid()
+            seen = set()
+            for line in self._file("/proc/net/dev").read().split(b"\n")[2:]:
+                name, sep, rest = line.partition(b":")
+                if not sep:
+                    continue
+                name = name.strip().decode()
+                seen.add(name)
+                counters = self.net_io.get(name)
+                if counters is None:
+                    counters = self.net_io[name] = array("q", bytes(8 * len(NET_IO_FIELDS)))
+                values = rest.split()
+                for i, column in enumerate(_NET_DEV_COLUMNS):
+                    counters[i] = int(values[column])
+            for name in set(self.net_io) - seen:
+                del self.net_io[name]
+
+            net = Telemetry.Network()
+            totals = [0] * len(NET_IO_FIELDS)
+            net.netio_per_interface = {}
+            for name, counters in self.net_io.items():
+                for i, value in enumerate(counters):
+                    totals[i] += value
+                if counters[0] and counters[1]:
+                    net.netio_per_interface[name] = dict(zip(NET_IO_FIELDS, counters))
+            net.netio_sum = dict(zip(NET_IO_FIELDS, totals))
+            return net
+
+    def _read_proc_stat(self):
+        data = self._file(f"/proc/{self._pid}/stat").read()
+        fields = data[data.rfind(b")") + 2 :].split()
+        for i, column in enumerate(_PROC_STAT_COLUMNS):
+            self.proc_stat[i] = int(fields[column])
+
+    def _read_key_values(self, path: str, keys: Dict[bytes, str]) -> Optional[Dict[str, int]]:
+        """Read the ``key: value`` or ``key value`` lines of a file, keeping only `keys`."""
+        f = self._file(path)
+        if f is None:
+            return None
+        values = {}
+        for line in f.read().split(b"\n"):
+            parts = line.replace(b":", b" ").split()
+            if len(parts) >= 2 and parts[0] in keys:
+                values[keys[parts[0]]] = int(parts[1])
+        return values
+
+    def _count_fds(self):
+        """Count this process' file descriptors, regular files, and inet connections.
+
+        The reader's own persistent file descriptors are not counted.
+        """
+        own_fds = {str(f.fd) for f in self._files.values() if f is not None}
+        num_fds = num_files = 0
+        socket_inodes = set()
+        fd_dir = f"/proc/{self._pid}/fd"
+        for entry in os.scandir(fd_dir):
+            if entry.name in own_fds:
+                continue
+            try:
+                link = os.readlink(f"{fd_dir}/{entry.name}")
+            except OSError:
+                continue  # Closed in the meantime.
+            num_fds += 1
+            if link.startswith("socket:["):
+                socket_inodes.add(link[8:-1].encode())
+            elif link.startswith("/") and os.path.isfile(link):
+                num_files += 1
+
+        num_connections = 0
+        if socket_inodes:
+            for table in _INET_TABLES:
+                f = self._file(f"/proc/{self._pid}/net/{table}", 65536)
+                if f is None:
+                    continue
+                for line in f.read().split(b"\n")[1:]:
+                    fields = line.split()
+                    if len(fields) > 9 and fields[9] in socket_inodes:
+                        num_connections += 1
+        return num_fds, num_files, num_connections
+
+    def _cgroup(self) -> Optional[Dict[str, int]]:
+        """Get the cgroup v2 CPU and memory usage, or None outside a cgroup v2 hierarchy."""
+        if self._cgroup_dir is None:
+            self._cgroup_dir = ""
+            try:
+                with open(f"/proc/{self._pid}/cgroup") as f:
+                    for line in f:
+                        if line.startswith("0::"):
+                            self._cgroup_dir = "/sys/fs/cgroup" + line[3:].strip().rstrip("/")
+            except OSError:
+                pass
+        if not self._cgroup_dir:
+            return None
+        cgroup = self._read_key_values(
+            f"{self._cgroup_dir}/cpu.stat",
+            {
+                b"usage_usec": "cpu_usage_usec",
+                b"user_usec": "cpu_user_usec",
+                b"system_usec": "cpu_system_usec",
+                b"nr_throttled": "nr_throttled",
+                b"throttled_usec": "throttled_usec",
+            },
+        )
+        if cgroup is None:
+            return None
+        f = self._file(f"{self._cgroup_dir}/memory.current", 64)
+        if f is not None:
+            cgroup["memory_current"] = int(f.read())
+        return cgroup
+
+    def process(self) -> Telemetry.Process:
+        """Get the telemetry of the current process.
+
+        When the process runs in a cgroup v2 hierarchy, it also has a ``cgroup`` field with
+        the cgroup CPU and memory usage, which psutil does not provide.
+        """
+        with self._lock:
+            self._check_pid()
+            if self._exe is None:
+                self._exe = os.readlink(f"/proc/{self._pid}/exe")
+                with open(f"/proc/{self._pid}/cmdline", "rb") as f:
+                    self._cmdline = [arg.decode() for arg in f.read().split(b"\0")[:-1]]
+            self._read_proc_stat()
+            self._read_meminfo()
+            utime, stime, cutime, cstime, num_threads, processor, blkio = self.proc_stat
+
+            vms, rss, shared, text, lib, data, dirty = (
+                int(v) * _PAGE_SIZE for v in self._file(f"/proc/{self._pid}/statm", 256).read().split()[:7]
+            )
+            proc_cpu = (utime + stime) / _CLOCK_TICKS
+            now = monotonic()
+            prev_cpu, prev_time = self._prev_proc_cpu
+            self._prev_proc_cpu = (proc_cpu, now)
+            num_fds, num_files, num_connections = self._count_fds()
+
+            p = Telemetry.Process()
+            p.pid = self._pid
+            p.cpu_number = int(processor)
+            p.memory = dict(rss=rss, vms=vms, shared=shared, text=text, lib=lib, data=data, dirty=dirty)
+            p.memory_percent = rss / self.meminfo[0] * 100 if self.meminfo[0] else 0.0
+            p.cpu_times = {
+                "user": utime / _CLOCK_TICKS,
+                "system": stime / _CLOCK_TICKS,
+                "children_user": cutime / _CLOCK_TICKS,
+                "children_system": cstime / _CLOCK_TICKS,
+                "iowait": blkio / _CLOCK_TICKS,
+            }
+            p.cpu_percent = round((proc_cpu - prev_cpu) / (now - prev_time) * 100, 1) if now > prev_time else 0.0
+            p.executable = self._exe
+            p.cmd_line = self._cmdline
+            p.num_open_file_descriptors = num_fds
+            p.num_connections = num_connections
+            io = self._read_key_values(
+                f"/proc/{self._pid}/io",
+                {
+                    b"syscr": "read_count",
+                    b"syscw": "write_count",
+                    b"read_bytes": "read_bytes",
+                    b"write_bytes": "write_bytes",
+                    b"rchar": "read_chars",
+                    b"wchar": "write_chars",
+                },
+            )
+            if io is not None:
+                io_fields = ("read_count", "write_count", "read_bytes", "write_bytes", "read_chars", "write_chars")
+                p.io_counters = {k: io[k] for k in io_fields}
+            p.num_open_files = num_files
+            p.num_threads = int(num_threads)
+            p.num_ctx_switches = self._read_key_values(
+                f"/proc/{self._pid}/status",
+                {b"voluntary_ctxt_switches": "voluntary", b"nonvoluntary_ctxt_switches": "involuntary"},
+            )
+            cgroup = self._cgroup()
+            if cgroup is not None:
+                p.cgroup = cgroup
+            return p
+
+    def close(self):
+        """Close the open files."""
+        with self._lock:
+            for f in self._files.values():
+                if f is not None:
+                    f.close()
+            self._files = {}
@@ -0,0 +1,173 @@
+"""Data loading throughput and stall statistics for loops.
+
+``DataLoaderStats`` wraps the iterator of a loop, e.g., a ``DataLoader``, and splits the time
+of each iteration into the time waiting for the next item (data wait) and the time between
+getting an item and asking for the next one (compute, i.e., the loop body). Each time goes
+into a histogram with power-of-two bins, and the size of each item is estimated from the
+metadata of the tensors or arrays it contains, without reading them. When the iterator is
+exhausted, or when `DataLoaderStats.close` is called because the loop was exited early, the
+summary is handed to a callback, e.g., to be added to the epoch iteration task.
+"""
+
+import math
+from time import perf_counter
+from typing import Callable, Dict, Iterator, Tuple
+
+HISTOGRAM_MIN_SECS = 1e-6
+HISTOGRAM_BINS = 26  # Upper edges from 1 us to about 16 s, plus one bin for longer times.
+
+
+def estimate_nbytes(item, max_depth: int = 3) -> Tuple[int, int]:
+    """
+    Estimate the size of an item from the metadata of the tensors or arrays it contains.
+
+    Parameters
+    ----------
+    item : object
+        A tensor, a NumPy array, or a tuple, list, or dict of them, as DataLoaders yield.
+    max_depth : int, optional
+        How deep to look into nested containers. Defaults to 3.
+
+    Returns
+    -------
+    tuple of int
+        The number of bytes, and the number of samples, i.e., the first dimension of the first
+        tensor or array found, or 0 if there is none.
+    """
+    if hasattr(item, "element_size") and hasattr(item, "numel"):  # torch.Tensor
+        shape = item.shape
+        return item.element_size() * item.numel(), (shape[0] if len(shape) else 1)
+    if hasattr(item, "nbytes") and hasattr(item, "shape"):  # numpy.ndarray
+        shape = item.shape
+        return int(item.nbytes), (shape[0] if len(shape) else 1)
+    if max_depth <= 0:
+        return 0, 0
+    if isinstance(item, dict):
+        item = item.values()
+    elif not isinstance(item, (tuple, list)):
+        return 0, 0
+    nbytes, samples = 0, 0
+    for value in item:
+        value_nbytes, value_samples = estimate_nbytes(value, max_depth - 1)
+        nbytes += value_nbytes
+        samples = samples or value_samples
+    return nbytes, samples
+
+
+def _histogram_bin(seconds: float) -> int:
+    if seconds <= HISTOGRAM_MIN_SECS:
+        return 0
+    return min(math.frexp(seconds / HISTOGRAM_MIN_SECS)[1], HISTOGRAM_BINS - 1)
+
+
+class DataLoaderStats:
+    """Measures the data wait and the compute time of each iteration over an iterator.
+
+    Parameters
+    ----------
+    on_end : callable, optional
+        Called with the `summary` when the iterator is exhausted or on `close`, once per
+        wrapped iterator.
+    """
+
+    def __init__(self, on_end: Callable[[Dict], None] = None):
+        self._on_end = on_end
+        self._iterator: Iterator = None
+        self._last_item_at = None
+        self._ended = False
+        self.reset()
+
+    def reset(self):
+        """Start new statistics."""
+        self._batches = 0
+        self._nbytes = 0
+        self._samples = 0
+        self._wait_secs = 0.0
+        self._compute_secs = 0.0
+        self._max_wait_secs = 0.0
+        self._wait_histogram = [0] * HISTOGRAM_BINS
+        self._compute_histogram = [0] * HISTOGRAM_BINS
+        self._last_item_at = None
+
+    def wrap(self, iterator: Iterator) -> "DataLoaderStats":
+        """Measure the iterations over `iterator`, which must then be done over the returned object."""
+        self._iterator = iterator
+        self._ended = False
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        t0 = perf_counter()
+        if self._last_item_at is not None:
+            compute_secs = t0 - self._last_item_at
+            self._compute_secs += compute_secs
+            self._compute_histogram[_histogram_bin(compute_secs)] += 1
+        try:
+            item = next(self._iterator)
+        except StopIteration:
+            self._last_item_at = None
+            self._end()
+            raise
+        t1 = perf_counter()
+        wait_secs = t1 - t0
+        self._wait_secs += wait_secs
+        self._wait_histogram[_histogram_bin(wait_secs)] += 1
+        if wait_secs > self._max_wait_secs:
+            self._max_wait_secs = wait_secs
+        nbytes, samples = estimate_nbytes(item)
+        self._nbytes += nbytes
+        self._samples += samples
+        self._batches += 1
+        self._last_item_at = t1
+        return item
+
+    def _end(self):
+        if self._ended:
+            return
+        self._ended = True
+        if self._on_end is not None:
+            self._on_end(self.summary())
+
+    def close(self):
+        """End the measurements of a loop exited early, e.g., with ``break``, counting the last item's compute time."""
+        if self._last_item_at is not None:
+            compute_secs = perf_counter() - self._last_item_at
+            self._compute_secs += compute_secs
+            self._compute_histogram[_histogram_bin(compute_secs)] += 1
+            self._last_item_at = None
+        self._end()
+
+    def summary(self) -> Dict:
+        """
+        Summarize the iterations measured so far.
+
+        Returns
+        -------
+        dict
+            The numbers of ``batches``, ``samples``, and ``bytes``; the total ``data_wait_secs``
+            and ``compute_secs``; the ``stall_fraction``, i.e., the fraction of the time spent
+            waiting for data; the ``max_data_wait_secs``; the throughput in ``batches_per_sec``,
+            ``samples_per_sec``, and ``bytes_per_sec``; and a ``histogram`` with the counts of
+            ``data_wait`` and ``compute`` times per bin, whose upper edges are
+            ``bin_upper_edges_secs``.
+        """
+        total_secs = self._wait_secs + self._compute_secs
+        return {
+            "batches": self._batches,
+            "samples": self._samples,
+            "bytes": self._nbytes,
+            "data_wait_secs": self._wait_secs,
+            "compute_secs": self._compute_secs,
+            "stall_fraction": self._wait_secs / total_secs if total_secs else 0.0,
+            "max_data_wait_secs": self._max_wait_secs,
+            "batches_per_sec": self._batches / total_secs if total_secs else 0.0,
+            "samples_per_sec": self._samples / total_secs if total_secs else 0.0,
+            "bytes_per_sec": self._nbytes / total_secs if total_secs else 0.0,
+            "histogram": {
+                "bin_upper_edges_secs": [HISTOGRAM_MIN_SECS * 2**i for i in range(HISTOGRAM_BINS - 1)] + [None],
+                "data_wait": list(self._wait_histogram),
+                "compute": list(self._compute_histogram),
+            },
+        }
@@ -0,0 +1,151 @@
+"""Device timing for the PyTorch instrumentation.
+
+Work on accelerators is asynchronous: a forward returns once its kernels are queued, so host
+timestamps taken around it measure the launch, not the execution, unless the host waits for
+the device. The ``DeviceTimer`` records device events around the forward instead, without
+waiting, and fills in the elapsed times later, when the messages are published by the
+interceptor's flush thread, where waiting for the device does not stall training. CUDA and
+ROCm devices are timed with ``torch.cuda.Event``; devices whose work is synchronous with the
+host, e.g., CPU, are timed with the host clock and resolved right away.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from time import perf_counter
+from typing import Dict, List, Tuple, Union
+
+from flowcept.commons.flowcept_logger import FlowceptLogger
+
+DEVICE_TIMING = "device_timing"
+
+
+class HostTimingBackend:
+    """Times work that is synchronous with the host, e.g., on CPU, with the host clock."""
+
+    def __init__(self, device: str = "cpu"):
+        self.device = device
+
+    def record(self):
+        """Mark the current point of the work."""
+        return perf_counter()
+
+    def elapsed(self, start, end, wait: bool = False) -> float:
+        """Get the seconds between two marks."""
+        return end - start
+
+
+class CUDATimingBackend:
+    """Times CUDA or ROCm work with events on the current stream, without waiting for the device."""
+
+    def __init__(self, device: str):
+        import torch
+
+        self.device = device
+        self._torch_device = torch.device(device)
+
+    def record(self):
+        """Mark the current point of the work queued on the device."""
+        import torch
+
+        event = torch.cuda.Event(enable_timing=True)
+        event.record(torch.cuda.current_stream(self._torch_device))
+        return event
+
+    def elapsed(self, start, end, wait: bool = False) -> float:
+        """Get the seconds between two marks, or None if the device did not reach `end` and not `wait`."""
+        if not end.query():
+            if not wait:
+                return None
+            end.synchronize()
+        return start.elapsed_time(end) / 1000
+
+
+def timing_backend_for(device) -> Union[HostTimingBackend, CUDATimingBackend]:
+    """Get the timing backend for a device, e.g., a ``torch.device`` or a string like ``"cuda:0"``."""
+    device = str(device)
+    if device.startswith("cuda"):  # PyTorch exposes ROCm devices as cuda devices too.
+        return CUDATimingBackend(device)
+    return HostTimingBackend(device)
+
+
+class DeviceTimer:
+    """Times work on devices and adds the durations to the messages that describe the work.
+
+    The duration is added to a message as ``{"device_timing": {"device": ..., "duration": ...}}``,
+    in seconds, either by `stop` or, for asynchronous devices, by `resolve`, which is meant to
+    be an interceptor's publish callback. Messages that are not published through that
+    callback (e.g., written to a shared memory ring or dropped from a backlog) would keep
+    their device events pending forever, so pending work is dropped after `max_flushes`
+    calls of `resolve`, or, oldest first, when more than `max_pending` are waiting.
+
+    Parameters
+    ----------
+    max_pending : int, optional
+        Max number of pending durations. Defaults to 4096.
+    max_flushes : int, optional
+        Number of `resolve` calls after which a pending duration is dropped. Defaults to 64, since
+        tasks may be held for a while before they are published, e.g., by the tensor statistics.
+    """
+
+    def __init__(self, max_pending: int = 4096, max_flushes: int = 64):
+        self._backends: Dict[str, object] = {}
+        # Message id -> (backend, start, end, number of resolve calls when it was stopped), oldest first.
+        self._pending: "OrderedDict[str, Tuple[object, object, object, int]]" = OrderedDict()
+        self._lock = Lock()
+        self._max_pending = max(1, max_pending)
+        self._max_flushes = max(1, max_flushes)
+        self._flushes = 0
+        self.dropped = 0
+        self.logger = FlowceptLogger()
+
+    def start(self, device) -> Tuple[object, object]:
+        """Mark the start of the work on a device.
+
+        Returns
+        -------
+        tuple
+            The mark, to be given to `stop`.
+        """
+        key = str(device)
+        backend = self._backends.get(key)
+        if backend is None:
+            backend = self._backends[key] = timing_backend_for(key)
+        return backend, backend.record()
+
+    def stop(self, message: Dict, mark: Tuple[object, object]):
+        """Mark the end of the work started at `mark` and add its duration to `message` now or on `resolve`."""
+        backend, start = mark
+        end = backend.record()
+        duration = backend.elapsed(start, end)
+        if duration is None:
+            with self._lock:
+                self._pending[message["task_id"]] = (backend, start, end, self._flushes)
+                if len(self._pending) > self._max_pending:
+                    self._pending.popitem(last=False)
+                    self.dropped += 1
+        else:
+            message[DEVICE_TIMING] = {"device": backend.device, "duration": duration}
+
+    def resolve(self, messages: List[Dict]):
+        """Add the durations of the pending work to the messages, waiting for the devices if needed."""
+        if not self._pending:
+            return
+        with self._lock:
+            self._flushes += 1
+            resolved = [(m, self._pending.pop(m.get("task_id"), None)) for m in messages]
+            self._expire()
+        for message, pending in resolved:
+            if pending is None:
+                continue
+            backend, start, end, _ = pending
+            try:
+                message[DEVICE_TIMING] = {"device": backend.device, "duration": backend.elapsed(start, end, wait=True)}
+            except Exception as e:
+                self.logger.exception(e)
+
+    def _expire(self):
+        oldest_kept = self._flushes - self._max_flushes
+        pending = self._pending
+        while pending and next(iter(pending.values()))[3] < oldest_kept:
+            pending.popitem(last=False)
+            self.dropped += 1
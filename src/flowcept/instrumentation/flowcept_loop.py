@@ -1,12 +1,13 @@
 """FlowCept Loop module."""
 
+import sys
 import uuid
 from time import time
 from typing import Union, Sized, Iterator, Dict
 
 from flowcept import Flowcept
 from flowcept.commons.vocabulary import Status
-from flowcept.configs import INSTRUMENTATION_ENABLED
+from flowcept.configs import INSTRUMENTATION_ENABLED, LOOP_BLOCK_SIZE
 from flowcept.flowceptor.adapters.instrumentation_interceptor import InstrumentationInterceptor
 
 
@@ -21,8 +22,8 @@ class FlowceptLoop:
     Parameters
     ----------
     items : typing.Union[Sized, int, Iterator]
-        The items to iterate over. Must either be an iterable with a `__len__` method or an integer
-        representing the range of iteration.
+        The items to iterate over. Must either be an iterable with a `__len__` method, an
+        iterator, or an integer representing the range of iteration.
     loop_name : str, optional
         A descriptive name for the loop (default is "loop").
     item_name : str, optional
@@ -32,17 +33,24 @@ class FlowceptLoop:
     workflow_id : str, optional
         The workflow ID to associate with this loop. If not provided, it will be generated or
         inferred from the current workflow context.
+    items_length : int, optional
+        The number of items of an iterator. If not given, the iterator is consumed in
+        streaming mode.
 
     Raises
     ------
     Exception
-        If `items` is not an iterable with a `__len__` method or an integer.
+        If `items` is not an iterable with a `__len__` method, an iterator, or an integer.
 
     Notes
     -----
     This class integrates with the `Flowcept` system for telemetry and tracking, ensuring
     detailed monitoring of loops and their iterations. It is designed for cases where
     capturing granular runtime behavior of loops is critical.
+
+    In streaming mode, items are never materialized, so generators and unbounded streams are
+    supported. The end of the loop is detected by `StopIteration`, and `len` returns the number
+    of items consumed so far.
     """
 
     _interceptor = InstrumentationInterceptor.get_instance()
@@ -75,17 +83,8 @@ class FlowceptLoop:
             self._iterator = iter(it)
             self._max = len(it)
         elif isinstance(items, Iterator):
-            if items_length > 0:
-                self._iterator = items
-                self._max = items_length
-            else:
-                # TODO: think of a better way to do it
-                from flowcept.commons.flowcept_logger import FlowceptLogger
-
-                FlowceptLogger().warning("If you know the length size of this iterator, lease inform it.")
-                items = list(items)
-                self._iterator = iter(items)
-                self._max = len(items)
+            self._iterator = items
+            self._max = items_length
         else:
             raise Exception("Not supported iterator items type.")
 
@@ -93,7 +92,7 @@ class FlowceptLoop:
         self._group_id = group_id  # str(id(self))
         self.enabled = True
         self.end_iter = self._end_iter
-        self._next_func = self._our_next
+        self._next_func = self._our_next if self._max > 0 else self._streaming_next
         self._next_counter = 0
         self._last_iteration_task = None
         self._loop_name = loop_name
@@ -128,7 +127,11 @@ class FlowceptLoop:
             # End loop
             self._capture_iteration_bounds()
 
-        self._current_item = next(self._iterator)
+        try:
+            self._current_item = next(self._iterator)
+        except StopIteration:
+            self._last_iteration_task = None  # Already intercepted, so `close` has nothing left to do.
+            raise
 
         if self._next_counter == 0:
             # Begin loop
@@ -139,6 +142,21 @@ class FlowceptLoop:
         self._next_counter += 1
         return self._current_item
 
+    def _streaming_next(self):
+        try:
+            self._current_item = next(self._iterator)
+        except StopIteration:
+            # End loop
+            if self._last_iteration_task is not None:
+                self._end_iteration_task(self._last_iteration_task)
+                self._last_iteration_task = None
+            raise
+
+        self._capture_iteration_bounds()
+        self._next_counter += 1
+        self._max = self._next_counter
+        return self._current_item
+
     def _capture_iteration_bounds(self):
         if self._last_iteration_task is not None:
             self._end_iteration_task(self._last_iteration_task)
@@ -168,6 +186,12 @@ class FlowceptLoop:
     def _do_nothing_in_end_iter(self, *args, **kwargs):
         pass
 
+    def close(self):
+        """Intercept the iteration in progress. Only needed if the loop is exited early, e.g., with ``break``."""
+        if self.enabled and self._last_iteration_task is not None:
+            self._end_iteration_task(self._last_iteration_task)
+            self._last_iteration_task = None
+
     def _end_iter(self, generated_value: Dict):
         """
         Finalizes the current iteration by associating generated values with the iteration metadata.
@@ -183,6 +207,11 @@ class FlowceptLoop:
         """
         self._current_iteration_task["generated"] = generated_value
 
+    def set_iteration_field(self, key: str, value):
+        """Set a field of the current iteration's task, e.g., a summary computed by an inner loop."""
+        if self.enabled:
+            self._current_iteration_task[key] = value
+
 
 class FlowceptLightweightLoop:
     """
@@ -207,6 +236,12 @@ class FlowceptLightweightLoop:
     workflow_id : str, optional
         The workflow ID to associate with this loop. If not provided, it will be generated or
         inferred from the current workflow context.
+    items_length : int, optional
+        The number of items of an iterator. If not given, the iterator is consumed in
+        streaming mode and `len` returns the number of items consumed so far.
+    batch_size : int, optional
+        Number of iteration tasks preallocated and intercepted at once (default is
+        ``instrumentation.loop_block_size``, capped by the number of items).
 
     Raises
     ------
@@ -231,15 +266,17 @@ class FlowceptLightweightLoop:
         workflow_id=None,
         items_length=0,
         capture_enabled=True,
+        batch_size=LOOP_BLOCK_SIZE,
     ):
         if isinstance(items, Iterator):
             self._iterator = items
         else:
             self._iterator = iter(items)
 
-        self._max = items_length or len(items)
+        self._max = items_length or (len(items) if hasattr(items, "__len__") else 0)
+        is_empty = not self._max and hasattr(items, "__len__")
 
-        if not (INSTRUMENTATION_ENABLED and capture_enabled and self._max):
+        if not (INSTRUMENTATION_ENABLED and capture_enabled) or is_empty:
             # These do_nothing functions help reduce overhead if no instrumentation is needed
             # because we do this if not enabled only here and never again.
             self._next_func = self._do_nothing_next
@@ -250,7 +287,10 @@ class FlowceptLightweightLoop:
 
         self.enabled = True
         self._next_func = self._our_next
+        self._streaming = not self._max
         self._next_counter = -1
+        self._batch_start = 0
+        self._batch_size = max(1, min(self._max, batch_size) if self._max else batch_size)
         self._current_item = None
         self._loop_name = loop_name
         self._item_name = item_name
@@ -266,12 +306,17 @@ class FlowceptLightweightLoop:
         }
         if parent_task_id is not None:
             task_obj["parent_task_id"] = parent_task_id
-        self._current_iteration_tasks = []
-        for i in range(self._max):
-            new_task = dict(task_obj)
+        self._task_template = task_obj
+        self._current_iteration_tasks = self._new_batch()
+
+    def _new_batch(self):
+        batch = []
+        for i in range(self._batch_start, self._batch_start + self._batch_size):
+            new_task = dict(self._task_template)
             new_task["task_id"] = self._group_id + str(i)
             new_task["used"] = {"i": i, self._item_name: None}
-            self._current_iteration_tasks.append(new_task)
+            batch.append(new_task)
+        return batch
 
     def __iter__(self):
         return self
@@ -294,20 +339,36 @@ class FlowceptLightweightLoop:
 
     def _our_next(self):
         # Basic idea: the beginning of the current iteration is the end of the last
-        if self._next_counter == self._max - 1:
-            # End loop
-            self._capture_iteration_bounds()
-            FlowceptLightweightLoop._interceptor.intercept_many(self._current_iteration_tasks)
-
-        self._current_item = next(self._iterator)
+        try:
+            self._current_item = next(self._iterator)
+        except StopIteration:
+            self.close()
+            raise
 
         self._next_counter += 1
+        if self._next_counter - self._batch_start == self._batch_size:
+            FlowceptLightweightLoop._interceptor.intercept_many(self._current_iteration_tasks)
+            self._batch_start = self._next_counter
+            self._current_iteration_tasks = self._new_batch()
+        if self._streaming:
+            self._max = self._next_counter + 1
 
         self._capture_iteration_bounds()
         return self._current_item
 
     def _capture_iteration_bounds(self):
-        self._current_iteration_tasks[self._next_counter]["used"][self._item_name] = self._current_item
+        self._current_iteration_tasks[self._next_counter - self._batch_start]["used"][self._item_name] = (
+            self._current_item
+        )
+
+    def close(self):
+        """Intercept the used iterations of the current batch. Only needed if the loop is exited early."""
+        if not self.enabled:
+            return
+        used_tasks = self._current_iteration_tasks[: self._next_counter - self._batch_start + 1]
+        if used_tasks:
+            FlowceptLightweightLoop._interceptor.intercept_many(used_tasks)
+        self._current_iteration_tasks = []
 
     def end_iter(self, generated_value: Dict):
         """
@@ -322,4 +383,310 @@ class FlowceptLightweightLoop:
            A dictionary containing the generated values for the current iteration. These values
            will be stored in the `generated` field of the iteration's metadata.
         """
-        self._current_iteration_tasks[self._next_counter]["generated"] = generated_value
+        self._current_iteration_tasks[self._next_counter - self._batch_start]["generated"] = generated_value
+
+    def set_iteration_field(self, key: str, value):
+        """Set a field of the current iteration's task, e.g., a summary computed by an inner loop."""
+        if self.enabled and self._next_counter >= 0:
+            self._current_iteration_tasks[self._next_counter - self._batch_start][key] = value
+
+
+def _summarize_item(item):
+    """Get a compact, serializable summary of a loop item."""
+    if item is None or isinstance(item, (str, bool, int, float)):
+        return item
+    shape = getattr(item, "shape", None)
+    if shape is not None:
+        return {"type": type(item).__name__, "shape": list(shape), "dtype": str(getattr(item, "dtype", ""))}
+    if isinstance(item, (tuple, list)):
+        return [_summarize_item(i) for i in item]
+    return type(item).__name__
+
+
+class FlowceptColumnarLoop:
+    """
+    A utility class to wrap and instrument loops, storing iterations in columns.
+
+    Instead of one task dict per iteration, the `FlowceptColumnarLoop` records the iteration
+    index, start/end timestamps, a summary of each item, and the values given to `end_iter`
+    in preallocated NumPy arrays, which grow by doubling up to `block_size` rows. Every
+    `block_size` iterations (and at the end of the loop), one ``task_block`` message is
+    intercepted with all of these columns. Depending on ``db_buffer.expand_task_blocks``,
+    the consumer either expands the block into one iteration task per row, with the same
+    task ids the other loop classes generate, or stores it as a single document.
+
+    Telemetry is captured once per block rather than once per iteration. The loop end is
+    detected by `StopIteration`, so the length of the items does not need to be known. With
+    ``db_buffer.expand_task_blocks`` disabled, the query layer can still expand the stored
+    blocks into iteration tasks, lazily (see `flowcept.commons.query_utils.iter_expanded_tasks`).
+
+    Parameters
+    ----------
+    items : typing.Union[Sized, int, Iterator]
+        The items to iterate over, or an integer representing the range of iteration.
+    loop_name : str, optional
+        A descriptive name for the loop (default is "loop").
+    item_name : str, optional
+        The name used for each item in the telemetry (default is "item").
+    parent_task_id : str, optional
+        The ID of the parent task associated with the loop, if applicable (default is None).
+    workflow_id : str, optional
+        The workflow ID to associate with this loop. If not provided, it will be generated or
+        inferred from the current workflow context.
+    items_length : int, optional
+        The number of items, if `items` has no `__len__`. If neither is given, `__len__`
+        returns the number of items consumed so far.
+    block_size : int, optional
+        Number of iterations per intercepted block (default is ``instrumentation.loop_block_size``).
+        If None, the whole loop is intercepted as one block.
+
+    Notes
+    -----
+    Numeric items and numeric generated values are stored in float arrays (missing values
+    are NaN); other values are kept in object arrays. Items that are not scalars are replaced
+    by a summary (e.g., type, shape, and dtype for arrays and tensors). If the loop is exited
+    with ``break``, call `close` to intercept the pending iterations.
+    """
+
+    _interceptor = InstrumentationInterceptor.get_instance()
+
+    def __init__(
+        self,
+        items: Union[Sized, Iterator, int],
+        loop_name="loop",
+        item_name="item",
+        parent_task_id=None,
+        workflow_id=None,
+        items_length=0,
+        capture_enabled=True,
+        block_size=LOOP_BLOCK_SIZE,
+    ):
+        if isinstance(items, int):
+            items = range(items)
+        self._iterator = iter(items)
+        self._max = items_length or (len(items) if hasattr(items, "__len__") else 0)
+
+        if not (INSTRUMENTATION_ENABLED and capture_enabled):
+            self._next_func = self._do_nothing_next
+            self.end_iter = self._do_nothing_in_end_iter
+            self.enabled = False
+            self.get_current_iteration_id = lambda: ""
+            return
+
+        import numpy as np
+
+        self.enabled = True
+        self._next_func = self._our_next
+        self._loop_name = loop_name
+        self._item_name = item_name
+        self._act_id = loop_name + "_iteration"
+        self._parent_task_id = parent_task_id
+        self._group_id = str(id(self) + id(self._iterator) + id(parent_task_id))
+        self.workflow_id = workflow_id or Flowcept.current_workflow_id or str(uuid.uuid4())
+        self._block_size = sys.maxsize if block_size is None else max(1, block_size)
+        self._next_counter = -1
+        self._rows = 0
+        self._capacity = min(self._block_size, self._max or 1024, 1 << 16)  # Grows by doubling.
+        self._i = np.empty(self._capacity, dtype=np.int64)
+        self._started_at = np.empty(self._capacity, dtype=np.float64)
+        self._ended_at = np.empty(self._capacity, dtype=np.float64)
+        self._items = None
+        self._item_type = None
+        self._item_is_numeric = False
+        self._generated = {}
+        self._fields = {}
+        self._telemetry_at_start = None
+        self._row_open = False
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __len__(self):
+        if not self._max and self.enabled:
+            return self._next_counter + 1  # Streaming: the number of items consumed so far.
+        return self._max
+
+    def __next__(self):
+        return self._next_func()
+
+    def get_current_iteration_id(self):
+        """Get current iteration's task id."""
+        return self._group_id + str(self._next_counter)
+
+    def _do_nothing_next(self):
+        return next(self._iterator)
+
+    def _do_nothing_in_end_iter(self, *args, **kwargs):
+        pass
+
+    def _our_next(self):
+        # Basic idea: the beginning of the current iteration is the end of the last
+        if self._row_open:
+            self._ended_at[self._rows - 1] = time()
+            self._row_open = False
+        try:
+            item = next(self._iterator)
+        except StopIteration:
+            self.close()
+            raise
+
+        self._next_counter += 1
+        if self._rows == self._block_size:
+            self._emit_block()
+        if self._rows == self._capacity:
+            self._grow()
+        row = self._rows
+        if row == 0:
+            tel = FlowceptColumnarLoop._interceptor.telemetry_capture.capture()
+            self._telemetry_at_start = tel.to_dict() if tel else None
+        self._i[row] = self._next_counter
+        items = self._items
+        if items is not None and type(item) is self._item_type and self._item_is_numeric:
+            try:
+                items[row] = item
+            except OverflowError:
+                self._items = self._set_value(items, row, item, is_item=True)
+                self._item_is_numeric = False
+        elif items is not None and type(item) is self._item_type:
+            items[row] = _summarize_item(item)
+        else:
+            self._items = self._set_value(items, row, item, is_item=True)
+            self._item_type = type(item)
+            self._item_is_numeric = self._items.dtype.kind != "O"
+        self._started_at[row] = time()
+        self._rows += 1
+        self._row_open = True
+        self._capture_iteration_bounds()
+        return item
+
+    def _capture_iteration_bounds(self):
+        # Called at the beginning of each iteration, as in the other loop classes, for subclasses to extend.
+        pass
+
+    def _new_column(self, value, is_item=False):
+        import numpy as np
+
+        if isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)):
+            if is_item and isinstance(value, (int, np.integer)):
+                return np.empty(self._capacity, dtype=np.int64)
+            return np.full(self._capacity, np.nan, dtype=np.float64)
+        return np.full(self._capacity, None, dtype=object)
+
+    def _set_value(self, column, row, value, is_item=False):
+        if column is None:
+            column = self._new_column(value, is_item)
+        if column.dtype.kind != "O":
+            try:
+                if isinstance(value, (bool, str)):
+                    raise TypeError
+                column[row] = value
+                if column.dtype.kind == "i" and column[row] != value:
+                    raise TypeError  # e.g., a float item in an int column
+                return column
+            except (TypeError, ValueError, OverflowError):
+                column = column.astype(object)
+        column[row] = _summarize_item(value) if is_item else value
+        return column
+
+    def _grow(self):
+        import numpy as np
+
+        new_capacity = min(2 * self._capacity, self._block_size)
+
+        def grow(column):
+            fill = None if column.dtype.kind == "O" else np.nan
+            if column.dtype.kind == "i":
+                grown = np.empty(new_capacity, dtype=column.dtype)
+            else:
+                grown = np.full(new_capacity, fill, dtype=column.dtype)
+            grown[: self._capacity] = column
+            return grown
+
+        self._i, self._started_at, self._ended_at = grow(self._i), grow(self._started_at), grow(self._ended_at)
+        if self._items is not None:
+            self._items = grow(self._items)
+        for columns in (self._generated, self._fields):
+            for key in columns:
+                columns[key] = grow(columns[key])
+        self._capacity = new_capacity
+
+    def _emit_block(self):
+        import numpy as np
+
+        rows = self._rows
+        first_i = int(self._i[0])
+        block = {
+            "type": "task_block",
+            "task_id": f"{self._group_id}_block_{first_i}",
+            "workflow_id": self.workflow_id,
+            "activity_id": self._act_id,
+            "group_id": self._group_id,
+            "status": Status.FINISHED.value,
+            "started_at": float(self._started_at[0]),
+            "ended_at": float(self._ended_at[rows - 1]),
+            "columns": {
+                "i": self._i[:rows].tolist(),
+                "started_at": self._started_at[:rows].tolist(),
+                "ended_at": self._ended_at[:rows].tolist(),
+                "used": {self._item_name: self._items[:rows].tolist()},
+                "generated": {key: column[:rows].tolist() for key, column in self._generated.items()},
+            },
+        }
+        if self._fields:
+            block["columns"]["fields"] = {key: column[:rows].tolist() for key, column in self._fields.items()}
+        if self._parent_task_id is not None:
+            block["parent_task_id"] = self._parent_task_id
+        if self._telemetry_at_start is not None:
+            block["telemetry_at_start"] = self._telemetry_at_start
+            tel = FlowceptColumnarLoop._interceptor.telemetry_capture.capture()
+            if tel:
+                block["telemetry_at_end"] = tel.to_dict()
+        FlowceptColumnarLoop._interceptor.intercept(block)
+
+        self._rows = 0
+        for column in self._generated.values():
+            column.fill(None if column.dtype.kind == "O" else np.nan)
+        for column in self._fields.values():
+            column.fill(None)
+
+    def close(self):
+        """Intercept the iterations that were not intercepted yet. Only needed if the loop is exited early."""
+        if not self.enabled or self._closed:
+            return
+        self._closed = True
+        if self._row_open:
+            self._ended_at[self._rows - 1] = time()
+            self._row_open = False
+        if self._rows:
+            self._emit_block()
+
+    def end_iter(self, generated_value: Dict):
+        """
+        Finalizes the current iteration by associating generated values with the iteration metadata.
+
+        Parameters
+        ----------
+        generated_value : dict
+           A dictionary containing the generated values for the current iteration. Each key
+           becomes a column of the block's `generated` field.
+        """
+        row = self._rows - 1
+        generated = self._generated
+        for key, value in generated_value.items():
+            column = generated.get(key)
+            if type(value) is float and column is not None and column.dtype.kind == "f":
+                column[row] = value  # Fast path for the most common case
+            else:
+                generated[key] = self._set_value(column, row, value)
+
+    def set_iteration_field(self, key: str, value):
+        """Set a field of the current iteration's task, e.g., a summary computed by an inner loop."""
+        import numpy as np
+
+        if not self.enabled or not self._rows:
+            return
+        column = self._fields.get(key)
+        if column is None:
+            column = self._fields[key] = np.full(self._capacity, None, dtype=object)
+        column[self._rows - 1] = value
@@ -9,6 +9,7 @@ from flowcept.commons.flowcept_dataclasses.task_object import (
 )
 from flowcept.commons.vocabulary import Status
 from flowcept.commons.flowcept_logger import FlowceptLogger
+from flowcept.commons.task_id_generator import new_task_id
 
 from flowcept.commons.utils import replace_non_serializable
 from flowcept.configs import (
@@ -50,7 +51,7 @@ def telemetry_flowcept_task(func=None):
             task_obj["type"] = "task"
             task_obj["started_at"] = time()
             task_obj["activity_id"] = func.__qualname__
-            task_obj["task_id"] = str(task_obj["started_at"])
+            task_obj["task_id"] = new_task_id()
             _thread_local._flowcept_current_context_task_id = task_obj["task_id"]
             task_obj["workflow_id"] = kwargs.pop("workflow_id", Flowcept.current_workflow_id)
             task_obj["used"] = kwargs
@@ -137,7 +138,7 @@ def flowcept_task(func=None, **decorator_kwargs):
             task_obj.campaign_id = handled_args.pop("campaign_id", Flowcept.campaign_id)
             task_obj.used = handled_args
             task_obj.started_at = time()
-            task_obj.task_id = str(task_obj.started_at)
+            task_obj.task_id = new_task_id()
             _thread_local._flowcept_current_context_task_id = task_obj.task_id
             task_obj.telemetry_at_start = interceptor.telemetry_capture.capture()
             try:
@@ -1,12 +1,14 @@
 """Flowcept's module for Pytorch instrumentation."""
 
-from time import time
-from types import MethodType
+import hashlib
+from time import perf_counter, time
 
 import numpy as np
 
+from flowcept.commons.task_id_generator import new_task_id
+from flowcept.commons.telemetry_series import TelemetrySeriesEncoder
 from flowcept.commons.utils import replace_non_serializable
-from typing import Dict, Union, Sized, Iterator
+from typing import Dict, List, Tuple, Union, Sized, Iterator
 import uuid
 
 import torch
@@ -26,9 +28,161 @@ from flowcept.configs import (
 from flowcept.flowcept_api.flowcept_controller import Flowcept
 from flowcept.flowceptor.adapters.base_interceptor import BaseInterceptor
 from flowcept.flowceptor.adapters.instrumentation_interceptor import InstrumentationInterceptor
+from flowcept.instrumentation.device_timing import DeviceTimer
 from flowcept.instrumentation.flowcept_task import get_current_context_task_id
+from flowcept.instrumentation.tensor_stats import TensorStatsEngine
 
 TORCH_CONFIG = INSTRUMENTATION.get("torch")
+LAYERS_MODES = {"layers", "layers_and_telemetry"}
+
+# Hashes of the model profiles this process already sent.
+_sent_model_profile_hashes = set()
+
+
+def model_architecture_hash(model: nn.Module, root_name: str = None) -> str:
+    """
+    Hash the structure of a module tree.
+
+    The hash covers, for each submodule, its name, type, settings (its ``extra_repr``
+    and public scalar attributes), and the shapes and types of its parameters and buffers,
+    but not their values. Models built with the same architecture get the same hash.
+
+    Parameters
+    ----------
+    model : nn.Module
+        The root of the module tree.
+    root_name : str, optional
+        The name of the root's type. Defaults to its class name.
+
+    Returns
+    -------
+    str
+        A hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    for name, module in model.named_modules():
+        module_type = root_name if (not name and root_name) else f"{type(module).__module__}.{type(module).__name__}"
+        attrs = sorted(
+            (k, v)
+            for k, v in vars(module).items()
+            if not k.startswith("_") and (v is None or isinstance(v, (bool, int, float, str)))
+        )
+        digest.update(f"{name}|{module_type}|{module.extra_repr()}|{attrs}|".encode())
+        for tensors in (module.named_parameters(recurse=False), module.named_buffers(recurse=False)):
+            for tensor_name, tensor in tensors:
+                digest.update(f"{tensor_name}:{tuple(tensor.shape)}:{tensor.dtype};".encode())
+    return digest.hexdigest()
+
+
+def _output_shape(result):
+    if isinstance(result, torch.Tensor):
+        return list(result.shape)
+    elif isinstance(result, (list, tuple)):
+        return [_output_shape(r) for r in result]
+    return None
+
+
+class LayerTimingsRecorder:
+    """Gathers the child layer calls of one parent forward into preallocated arrays.
+
+    Each call of a captured layer takes one slot, holding the layer, its start and end times,
+    its output shape, and optionally the telemetry at its end. The arrays start with one slot
+    per layer and double when a forward calls more layers, e.g., when a layer is reused, so
+    recording allocates nothing in the steady state.
+
+    Parameters
+    ----------
+    modules : list of (str, nn.Module)
+        The captured layers and their qualified names.
+    telemetry_capture : TelemetryCapture, optional
+        If set, telemetry is captured at the end of each layer call.
+    """
+
+    def __init__(self, modules: List[Tuple[str, nn.Module]], telemetry_capture=None):
+        self._names = [name for name, _ in modules]
+        self._types = [module.__class__.__name__ for _, module in modules]
+        self._indices = {id(module): i for i, (_, module) in enumerate(modules)}
+        self._telemetry_capture = telemetry_capture
+        self._n = 0
+        self._t0 = 0.0
+        self._open_slots: List[int] = []  # Nested calls end in the reverse order they started.
+        self._allocate(max(1, len(modules)))
+
+    def _allocate(self, capacity: int):
+        n = self._n
+        layers, starts, ends = np.empty(capacity, dtype=np.int32), np.empty(capacity), np.empty(capacity)
+        if n:
+            layers[:n], starts[:n], ends[:n] = self._layers[:n], self._starts[:n], self._ends[:n]
+        self._layers, self._starts, self._ends = layers, starts, ends
+        self._shapes = (self._shapes[:n] if n else []) + [None] * (capacity - n)
+        self._telemetry = (self._telemetry[:n] if n else []) + [None] * (capacity - n)
+
+    def reset(self):
+        """Start recording a new parent forward."""
+        self._n = 0
+        self._open_slots.clear()
+        self._t0 = perf_counter()
+
+    def start(self, module: nn.Module):
+        """Record the start of a layer call."""
+        slot = self._n
+        if slot == len(self._starts):
+            self._allocate(2 * slot)
+        self._layers[slot] = self._indices[id(module)]
+        self._open_slots.append(slot)
+        self._n += 1
+        self._starts[slot] = perf_counter()
+
+    def end(self, result):
+        """Record the end of the last started layer call."""
+        t = perf_counter()
+        slot = self._open_slots.pop()
+        self._ends[slot] = t
+        self._shapes[slot] = _output_shape(result)
+        if self._telemetry_capture is not None:
+            tel = self._telemetry_capture.capture()
+            self._telemetry[slot] = tel.to_dict() if tel else None
+
+    def to_columns(self) -> Dict:
+        """
+        Get the recorded layer calls as columns.
+
+        Returns
+        -------
+        dict
+            ``{"name", "type", "offset", "duration", "output_shape"}``, each a list with one
+            item per layer call, in call order. Offsets are seconds since the parent forward
+            started. With telemetry, ``"telemetry_at_end"`` holds the telemetry of the calls
+            delta-encoded as telemetry blocks (see ``flowcept.commons.telemetry_series``), whose
+            ``first_index`` is the call index: successive calls only store what changed, instead
+            of one full telemetry dictionary each.
+        """
+        n = self._n
+        layers, starts = self._layers[:n].tolist(), self._starts[:n]
+        columns = {
+            "name": [self._names[i] for i in layers],
+            "type": [self._types[i] for i in layers],
+            "offset": (starts - self._t0).tolist(),
+            "duration": (self._ends[:n] - starts).tolist(),
+            "output_shape": self._shapes[:n],
+        }
+        if self._telemetry_capture is not None:
+            columns["telemetry_at_end"] = self._encode_telemetry(n)
+        return columns
+
+    def _encode_telemetry(self, n: int) -> List[Dict]:
+        encoder = TelemetrySeriesEncoder("layers", block_size=n)
+        blocks = []
+        for i in range(n):
+            if self._telemetry[i] is None:
+                blocks.append(encoder.flush())  # Rows of a block are consecutive calls.
+                continue
+            blocks.extend(encoder.add(i, self._ends[i].item(), self._telemetry[i]))
+        blocks.append(encoder.flush())
+        blocks = [block for block in blocks if block is not None]
+        for block in blocks:
+            del block["type"], block["series_id"], block["block_id"]
+        return blocks
 
 
 def flowcept_torch(cls):
@@ -107,8 +261,9 @@ def flowcept_torch(cls):
     """
 
     class TorchModuleWrapper(cls):
-        _original_children_forward_functions: Dict = {}
         _interceptor: BaseInterceptor = None
+        _tensor_stats: TensorStatsEngine = None
+        _device_timer: DeviceTimer = None
 
         def __init__(self, *args, **kwargs):
             super(TorchModuleWrapper, self).__init__(*args, **kwargs)
@@ -125,21 +280,50 @@ def flowcept_torch(cls):
                 self.forward = self._our_forward_parent
             self._epochs_at_every = TORCH_CONFIG.get("capture_epochs_at_every", 1)
             self._children_mode = None
-            self._should_update_children_forward = False
             self._children_tensor_inspection_enabled = False
+            # Children are captured by forward hooks, registered once. They only act while this flag is set,
+            # i.e., during the parent forwards that are captured, so toggling the capture is O(1).
+            self._capturing_children = False
+            self._children_hook_handles = []
             if self._children_enabled:
                 self._children_mode = TORCH_CONFIG.get("children_mode", None)
-                self._children_tensor_inspection_enabled = "inspection" in self._children_mode
                 if self._children_mode is None:
                     raise Exception("You enabled children mode, but did not specify which mode.")
+                if self._children_mode in LAYERS_MODES and not self._parent_enabled:
+                    # The layer calls are only reset and emitted with the parent forward tasks.
+                    raise Exception(
+                        f"Children mode {self._children_mode} adds the layers to the parent forward tasks, "
+                        "so it requires capturing the parent too, e.g., with what: parent_and_children."
+                    )
+                self._children_tensor_inspection_enabled = "inspection" in self._children_mode
 
-                self._child_forward_func = _get_our_child_forward_func(self._children_mode)
-                for name, child in self.named_children():
-                    child.__dict__["_parent_module"] = self
-                    TorchModuleWrapper._original_children_forward_functions[child.__class__] = child.__class__.forward
-                    child.forward = MethodType(self._child_forward_func, child)
+                self._child_capture_func = _get_child_capture_func(self._children_mode)
+                self._capturing_children = not self._parent_enabled
+                children = list(self._get_children_to_capture(TORCH_CONFIG.get("children_max_depth", 1)))
+                for _, child in children:
+                    self._children_hook_handles.append(child.register_forward_hook(self._child_forward_hook))
 
             TorchModuleWrapper._interceptor = InstrumentationInterceptor.get_instance()
+            self._layer_timings = None
+            if self._children_mode in LAYERS_MODES:
+                # Layer calls go into the parent forward task instead of one task each.
+                telemetry_capture = None
+                if "telemetry" in self._children_mode:
+                    telemetry_capture = TorchModuleWrapper._interceptor.telemetry_capture
+                self._layer_timings = LayerTimingsRecorder(children, telemetry_capture)
+                for _, child in children:
+                    self._children_hook_handles.append(child.register_forward_pre_hook(self._child_forward_pre_hook))
+            if TorchModuleWrapper._tensor_stats is None:
+                # Tasks with tensor inspections are delivered through the engine, which may hold them
+                # until their statistics are copied from the device.
+                TorchModuleWrapper._tensor_stats = TensorStatsEngine(
+                    TorchModuleWrapper._interceptor.intercept, TORCH_CONFIG.get("tensor_stats_flush_every", 16)
+                )
+                TorchModuleWrapper._interceptor.add_stop_callback(TorchModuleWrapper._tensor_stats.flush)
+            if TorchModuleWrapper._device_timer is None and TORCH_CONFIG.get("device_timing", True):
+                # On accelerators, forward durations are resolved from device events when the tasks are flushed.
+                TorchModuleWrapper._device_timer = DeviceTimer()
+                TorchModuleWrapper._interceptor.add_publish_callback(TorchModuleWrapper._device_timer.resolve)
             self._current_epoch = -1
 
             self._module_name = cls.__name__
@@ -149,6 +333,7 @@ def flowcept_torch(cls):
             self.parent_task_id = kwargs.get(
                 "parent_task_id", get_current_context_task_id()
             )  # to be used by forward layers
+            self._parent_iteration = None
             self.parent_workflow_id = kwargs.get("parent_workflow_id", Flowcept.current_workflow_id)
             self._campaign_id = kwargs.get("campaign_id", Flowcept.campaign_id)
             if kwargs.get("save_workflow", True):
@@ -161,7 +346,7 @@ def flowcept_torch(cls):
                 return super(TorchModuleWrapper, self).forward(*args, **kwargs)
 
             started_at = time()
-            self._current_forward_task_id = str(started_at)
+            self._current_forward_task_id = new_task_id()
             custom_metadata = {}
             if hasattr(self, "training"):
                 custom_metadata["is_training"] = self.training
@@ -183,10 +368,21 @@ def flowcept_torch(cls):
             }
             if kwargs is not None:
                 forward_task["used"].update(kwargs)
-
-            self._enable_children_forward()
-            y = super(TorchModuleWrapper, self).forward(*args, **kwargs)
-            self._disable_children_forward()
+            if self._parent_iteration is not None:
+                forward_task["parent_iteration"] = self._parent_iteration
+
+            self._capturing_children = self._children_enabled
+            if self._layer_timings is not None:
+                self._layer_timings.reset()
+            device_timer = TorchModuleWrapper._device_timer
+            if device_timer is not None:
+                device_mark = device_timer.start(self._forward_device(args))
+            try:
+                y = super(TorchModuleWrapper, self).forward(*args, **kwargs)
+            finally:
+                self._capturing_children = False
+            if device_timer is not None:
+                device_timer.stop(forward_task, device_mark)
 
             if self._current_epoch < 1:
                 forward_task["generated"] = {"tensor": _inspect_torch_tensor(y)}
@@ -194,21 +390,40 @@ def flowcept_torch(cls):
             tel = TorchModuleWrapper._interceptor.telemetry_capture.capture()
             if tel:
                 forward_task["telemetry_at_end"] = tel.to_dict()
+            if self._layer_timings is not None:
+                forward_task["layers"] = self._layer_timings.to_columns()
 
-            TorchModuleWrapper._interceptor.intercept(forward_task)
+            TorchModuleWrapper._tensor_stats.submit(forward_task)
 
             return y
 
-        def _enable_children_forward(self):
-            if "children" in TORCH_CONFIG.get("what", "parent_only") and "telemetry" in TORCH_CONFIG["children_mode"]:
-                if self._epochs_at_every > 1 and self._should_update_children_forward:
-                    self._update_children_with_our_forward()
-
-        def _disable_children_forward(self):
-            if "children" in TORCH_CONFIG.get("what", "parent_only") and "telemetry" in TORCH_CONFIG["children_mode"]:
-                if self._epochs_at_every > 1 and self._should_update_children_forward:
-                    self._update_children_with_original_forward()
-                self._should_update_children_forward = True
+        def _forward_device(self, args):
+            """Get the device of the forward's first tensor argument, or else of the module's parameters."""
+            for arg in args:
+                if isinstance(arg, torch.Tensor):
+                    return arg.device
+            param = next(self.parameters(), None)
+            return param.device if param is not None else "cpu"
+
+        def _get_children_to_capture(self, max_depth=1):
+            """Get the names and submodules down to `max_depth` levels below this module, or all if it is None."""
+            for name, module in self.named_modules():
+                if name and (max_depth is None or name.count(".") < max_depth):
+                    yield name, module
+
+        def _child_forward_pre_hook(self, child, args):
+            if self._capturing_children:
+                self._layer_timings.start(child)
+
+        def _child_forward_hook(self, child, args, result):
+            if self._capturing_children:
+                self._child_capture_func(self, child, args, result)
+
+        def _remove_children_hooks(self):
+            self._capturing_children = False
+            for handle in self._children_hook_handles:
+                handle.remove()
+            self._children_hook_handles = []
 
         def _get_profile(self):
             nparams = 0
@@ -234,30 +449,29 @@ def flowcept_torch(cls):
 
             return this_result
 
-        def _update_children_with_our_forward(self):
-            for name, child in self.named_children():
-                child.forward = MethodType(self._child_forward_func, child)
-
-        def _update_children_with_original_forward(self):
-            for name, child in self.named_children():
-                original = TorchModuleWrapper._original_children_forward_functions[child.__class__]
-                child.forward = MethodType(original, child)
-
         def _disable_children_tensor_inspection(self):
             self._children_tensor_inspection_enabled = False
             if self._children_mode in {"lightweight", "tensor_inspection"}:
-                self._update_children_with_original_forward()
-                # If we get to the original children forwards here, we should stick with them.
-                self._should_update_children_forward = False
+                # Nothing else to capture from the children.
+                self._remove_children_hooks()
             elif self._children_mode == "telemetry_and_tensor_inspection":
-                self._child_forward_func = _get_our_child_forward_func(mode="telemetry")
-                if self._epochs_at_every == 1:
-                    self._update_children_with_our_forward()
-            else:
-                return
+                self._child_capture_func = _get_child_capture_func(mode="telemetry")
+
+        def new_batch(self, parent_task_id, parent_iteration=None):
+            """
+            Set the batch iteration task as the parent of the next forward tasks.
 
-        def new_batch(self, parent_task_id):
+            Parameters
+            ----------
+            parent_task_id : str
+                The task ID of the batch iteration.
+            parent_iteration : dict, optional
+                The ``group_id`` and index ``i`` of the batch iteration, given by loops that store
+                their iterations in columnar blocks, so forward tasks can be linked to a row of a
+                block that was not expanded into tasks.
+            """
             self.parent_task_id = parent_task_id
+            self._parent_iteration = parent_iteration
 
         def new_epoch(self, parent_task_id):
             """
@@ -278,6 +492,9 @@ def flowcept_torch(cls):
             when capturing telemetry or workflow execution data.
             """
             self.parent_task_id = parent_task_id
+            self._parent_iteration = None
+            if TorchModuleWrapper._tensor_stats is not None:
+                TorchModuleWrapper._tensor_stats.flush()
             if self._children_tensor_inspection_enabled and self._current_epoch >= 0:
                 self._disable_children_tensor_inspection()
             self._current_epoch += 1
@@ -296,16 +513,25 @@ def flowcept_torch(cls):
             workflow_obj.used = {"capture_at_every": self._epochs_at_every}
 
             if self._should_get_profile:
-                profile = self._get_profile()
-                _custom_metadata["model_profile"] = profile
+                # Identical models, e.g., in hyperparameter sweeps, share one profile, stored once in the
+                # model_profiles collection and referenced by its hash.
+                profile_hash = model_architecture_hash(self, root_name=self._module_name)
+                if profile_hash not in _sent_model_profile_hashes:
+                    _sent_model_profile_hashes.add(profile_hash)
+                    profile_msg = self._get_profile()
+                    profile_msg.update({"type": "model_profile", "profile_hash": profile_hash})
+                    TorchModuleWrapper._interceptor.intercept(profile_msg)
+                _custom_metadata["model_profile"] = {"profile_hash": profile_hash}
 
             workflow_obj.custom_metadata = _custom_metadata
             TorchModuleWrapper._interceptor.send_workflow_message(workflow_obj)
             return workflow_obj.workflow_id
 
-    def _inspect_inner_modules(model, modules_dict={}, in_named=None, first_level_child=True):
+    def _inspect_inner_modules(model, modules_dict=None, in_named=None, first_level_child=True):
         if not isinstance(model, nn.Module):
             return
+        if modules_dict is None:
+            modules_dict = {}
         key = f"{model.__class__.__name__}_{id(model)}"
         modules_dict[key] = {
             "type": model.__class__.__name__,
@@ -319,34 +545,28 @@ def flowcept_torch(cls):
             _inspect_inner_modules(module, modules_dict, in_named=name, first_level_child=False)
         return modules_dict
 
-    def _get_our_child_forward_func(mode):
-        """Pick the torch_task function."""
+    def _get_child_capture_func(mode):
+        """Pick the function capturing a child forward, called by the forward hooks as f(parent, child, args, y)."""
         if "telemetry" in mode and TELEMETRY_CAPTURE is None:
             raise Exception(
                 "Your telemetry settings are null but you chose a telemetry mode. Please revise your settings."
             )
         elif mode == "lightweight":
-            return _our_forward_lightweight
+            return _capture_lightweight
         elif mode == "tensor_inspection":
-            return _our_forward_tensor_inspection
+            return _capture_tensor_inspection
         elif mode == "telemetry":
-            return _our_forward_telemetry
+            return _capture_telemetry
         elif mode == "telemetry_and_tensor_inspection":
-            return _our_forward_telemetry_tensor_inspection
+            return _capture_telemetry_tensor_inspection
+        elif mode in LAYERS_MODES:
+            return _capture_layer
         else:
             raise NotImplementedError(f"There is no torch instrumentation mode {mode}")
 
     # TODO: move these functions to inside the wrapper class
     def _inspect_torch_tensor(tensor: torch.Tensor):
-        _id = id(tensor)
-        tensor_inspection = {"id": _id}
-        tensor_inspection["is_sparse"] = tensor.is_sparse
-        tensor_inspection["shape"] = list(tensor.shape)
-        tensor_inspection["device"] = str(tensor.device)
-        tensor_inspection["nbytes"] = tensor.nbytes
-        tensor_inspection["numel"] = tensor.numel()
-        tensor_inspection["density"] = torch.nonzero(tensor).size(0) / tensor.numel()
-        return tensor_inspection
+        return TorchModuleWrapper._tensor_stats.inspect(tensor)
 
     def _get_forward_used_args(module, tensor):
         used = {"tensor": _inspect_torch_tensor(tensor)}
@@ -362,59 +582,54 @@ def flowcept_torch(cls):
 
     CHILD_FORWARD = "child_forward"
 
-    def _our_forward_lightweight(self, *args, **kwargs):
-        result = TorchModuleWrapper._original_children_forward_functions[self.__class__](self, *args, **kwargs)
+    def _capture_layer(parent, child, args, result):
+        parent._layer_timings.end(result)
+
+    def _capture_lightweight(parent, child, args, result):
         task_dict = dict(
             subtype=CHILD_FORWARD,
-            workflow_id=self._parent_module.workflow_id,
-            parent_task_id=self._parent_module._current_forward_task_id,
-            activity_id=self.__class__.__name__,
+            workflow_id=parent.workflow_id,
+            parent_task_id=parent._current_forward_task_id,
+            activity_id=child.__class__.__name__,
             status=Status.FINISHED.value,
         )
         TorchModuleWrapper._interceptor.intercept(task_dict)
-        return result
 
-    def _our_forward_telemetry(self, *args, **kwargs):
-        result = TorchModuleWrapper._original_children_forward_functions[self.__class__](self, *args, **kwargs)
+    def _capture_telemetry(parent, child, args, result):
         task_dict = dict(
             subtype=CHILD_FORWARD,
-            workflow_id=self._parent_module.workflow_id,
-            parent_task_id=self._parent_module._current_forward_task_id,
-            activity_id=self.__class__.__name__,
+            workflow_id=parent.workflow_id,
+            parent_task_id=parent._current_forward_task_id,
+            activity_id=child.__class__.__name__,
             status=Status.FINISHED.value,
             telemetry_at_end=TorchModuleWrapper._interceptor.telemetry_capture.capture().to_dict(),
         )
         TorchModuleWrapper._interceptor.intercept(task_dict)
-        return result
 
-    def _our_forward_telemetry_tensor_inspection(self, *args, **kwargs):
-        result = TorchModuleWrapper._original_children_forward_functions[self.__class__](self, *args, **kwargs)
+    def _capture_telemetry_tensor_inspection(parent, child, args, result):
         task_dict = dict(
             subtype=CHILD_FORWARD,
-            workflow_id=self._parent_module.workflow_id,
-            parent_task_id=self._parent_module._current_forward_task_id,
-            activity_id=self.__class__.__name__,
+            workflow_id=parent.workflow_id,
+            parent_task_id=parent._current_forward_task_id,
+            activity_id=child.__class__.__name__,
             status=Status.FINISHED.value,
             telemetry_at_end=TorchModuleWrapper._interceptor.telemetry_capture.capture().to_dict(),
-            used=_get_forward_used_args(self, args[0]),
+            used=_get_forward_used_args(child, args[0]),
             generated={"tensor": _inspect_torch_tensor(result)},
         )
-        TorchModuleWrapper._interceptor.intercept(task_dict)
-        return result
+        TorchModuleWrapper._tensor_stats.submit(task_dict)
 
-    def _our_forward_tensor_inspection(self, *args, **kwargs):
-        result = TorchModuleWrapper._original_children_forward_functions[self.__class__](self, *args, **kwargs)
+    def _capture_tensor_inspection(parent, child, args, result):
         task_dict = dict(
             subtype=CHILD_FORWARD,
-            workflow_id=self._parent_module.workflow_id,
-            parent_task_id=self._parent_module._current_forward_task_id,
-            activity_id=self.__class__.__name__,
+            workflow_id=parent.workflow_id,
+            parent_task_id=parent._current_forward_task_id,
+            activity_id=child.__class__.__name__,
             status=Status.FINISHED.value,
-            used=_get_forward_used_args(self, args[0]),
+            used=_get_forward_used_args(child, args[0]),
             generated={"tensor": _inspect_torch_tensor(result)},
         )
-        TorchModuleWrapper._interceptor.intercept(task_dict)
-        return result
+        TorchModuleWrapper._tensor_stats.submit(task_dict)
 
     return TorchModuleWrapper
 
@@ -425,6 +640,10 @@ def _get_parent_loop_class(epoch_or_batch):
         from flowcept.instrumentation.flowcept_loop import FlowceptLightweightLoop
 
         parent_class = FlowceptLightweightLoop
+    elif loop_mode == "columnar":
+        from flowcept.instrumentation.flowcept_loop import FlowceptColumnarLoop
+
+        parent_class = FlowceptColumnarLoop
     else:
         from flowcept.instrumentation.flowcept_loop import FlowceptLoop
 
@@ -436,7 +655,12 @@ def _create_epoch_loop_class():
     parent_class = _get_parent_loop_class(epoch_or_batch="epoch")
 
     class FlowceptEpochLoop(parent_class):
-        """Specialization of FlowceptLoop for Epoch Loops."""
+        """Specialization of FlowceptLoop for Epoch Loops.
+
+        The batch loops of an epoch are closed (see `FlowceptBatchLoop.close`) when the next
+        epoch starts, when the epoch loop ends, or when the epoch loop is closed, so batch
+        loops exited with ``break`` are finalized too.
+        """
 
         ACTIVITY_ID = "epochs_loop"
 
@@ -448,6 +672,7 @@ def _create_epoch_loop_class():
             workflow_id=None,
             capture_enabled=True,
         ):
+            self._batch_loops = []
             if not capture_enabled or TORCH_CONFIG.get("epoch_loop", None) is None or not INSTRUMENTATION_ENABLED:
                 super().__init__(items=items, capture_enabled=False)
                 return
@@ -459,6 +684,27 @@ def _create_epoch_loop_class():
                 workflow_id=workflow_id,
             )
             self.model = model
+            self._unwrapped_next = self._next_func
+            self._next_func = self._next_closing_batch_loops
+
+        def _next_closing_batch_loops(self):
+            # Before the epoch iteration advances, so the batch loops can still set fields of the current one.
+            self._close_batch_loops()
+            return self._unwrapped_next()
+
+        def _add_batch_loop(self, batch_loop):
+            self._close_batch_loops()
+            self._batch_loops.append(batch_loop)
+
+        def _close_batch_loops(self):
+            for batch_loop in self._batch_loops:
+                batch_loop.close()
+            self._batch_loops.clear()
+
+        def close(self):
+            """Close the batch loops of the current epoch and intercept the pending epoch iterations."""
+            self._close_batch_loops()
+            super().close()
 
         def _capture_iteration_bounds(self):
             super()._capture_iteration_bounds()
@@ -469,6 +715,7 @@ def _create_epoch_loop_class():
 
 def _create_batch_loop_class():
     parent_class = _get_parent_loop_class(epoch_or_batch="batch")
+    is_columnar = TORCH_CONFIG.get("batch_loop", None) == "columnar"
 
     class FlowceptBatchLoop(parent_class):
         """
@@ -501,6 +748,22 @@ def _create_batch_loop_class():
         -----
         To disable loop capture entirely, set `epochs_loop` to `None` during initialization.
 
+        Unless ``dataloader_stats`` is disabled, the time waiting for each batch is measured
+        apart from the time of the loop body, and, at the end of the loop, a summary with the
+        totals, the throughput, the estimated bytes, and histograms of both times is set as the
+        ``<step>_dataloader`` field of the epoch iteration task (see
+        `flowcept.instrumentation.dataloader_stats.DataLoaderStats.summary`), or when the loop is
+        closed, if it was exited early.
+
+        With ``batch_loop: columnar``, the batches are recorded in columns and intercepted as one
+        ``task_block`` per loop, i.e., per epoch, or per ``batch_loop_block_size`` batches. The
+        forward tasks then also have a ``parent_iteration`` field with the ``group_id`` and the
+        index ``i`` of their batch, which identify its row in the block.
+
+        A batch loop exited early, e.g., with ``break``, is closed when the next batch loop of
+        the epoch loop is created or when the epoch loop advances or ends. `close` can also be
+        called directly.
+
         See Also
         --------
         FlowceptLoop : The base class for implementing loops.
@@ -518,6 +781,8 @@ def _create_batch_loop_class():
             capture_enabled=True,
         ):
             self._epochs_loop = epochs_loop
+            self._profiler_capture = None
+            self._dataloader_stats = None
             if (
                 (not capture_enabled)
                 or (self._epochs_loop is None)
@@ -527,6 +792,9 @@ def _create_batch_loop_class():
                 super().__init__(items=items, items_length=items_length, capture_enabled=False)
                 return
             self.activity_id = f"{step}_batch"
+            loop_kwargs = {}
+            if is_columnar:
+                loop_kwargs["block_size"] = TORCH_CONFIG.get("batch_loop_block_size", None)
             super().__init__(
                 items,
                 loop_name=self.activity_id,
@@ -534,12 +802,66 @@ def _create_batch_loop_class():
                 parent_task_id=parent_task_id or self._epochs_loop.get_current_iteration_id(),
                 workflow_id=workflow_id or epochs_loop.workflow_id,
                 items_length=items_length,
+                **loop_kwargs,
+            )
+            if TORCH_CONFIG.get("dataloader_stats", True):
+                from flowcept.instrumentation.dataloader_stats import DataLoaderStats
+
+                self._dataloader_stats_field = f"{step}_dataloader"
+                self._dataloader_stats = DataLoaderStats(on_end=self._set_dataloader_stats)
+                self._iterator = self._dataloader_stats.wrap(self._iterator)
+            self._profiler_capture = self._create_profiler_capture()
+            if self._profiler_capture is not None:
+                self._unprofiled_next = self._next_func
+                self._next_func = self._profiled_next
+            self._epochs_loop._add_batch_loop(self)
+
+        def _set_dataloader_stats(self, summary: Dict):
+            self._epochs_loop.set_iteration_field(self._dataloader_stats_field, summary)
+
+        def _create_profiler_capture(self):
+            profiler_conf = TORCH_CONFIG.get("profiler", None) or {}
+            model = self._epochs_loop.model
+            default_epochs_at_every = TORCH_CONFIG.get("capture_epochs_at_every", 1)
+            epochs_at_every = profiler_conf.get("capture_epochs_at_every", default_epochs_at_every)
+            if not profiler_conf.get("enabled", False) or getattr(model, "_current_epoch", 0) % epochs_at_every != 0:
+                return None
+            from flowcept.instrumentation.torch_profiler import TorchProfilerCapture
+
+            modules = [(getattr(model, "_module_name", model.__class__.__name__), model)]
+            modules.extend(model._get_children_to_capture(TORCH_CONFIG.get("children_max_depth", 1)))
+            return TorchProfilerCapture(
+                modules,
+                profiler_conf,
+                FlowceptBatchLoop._interceptor.intercept,
+                workflow_id=self.workflow_id,
+                parent_task_id=self._epochs_loop.get_current_iteration_id(),
             )
 
+        def _profiled_next(self):
+            try:
+                item = self._unprofiled_next()
+            except StopIteration:
+                self.close()
+                raise
+            self._profiler_capture.step(self.get_current_iteration_id())
+            return item
+
+        def close(self):
+            """Stop the profiler, report the data loader statistics, and intercept the pending batch iterations."""
+            if self._profiler_capture is not None:
+                self._profiler_capture.stop()
+                self._profiler_capture = None
+                self._next_func = self._unprofiled_next
+            if self._dataloader_stats is not None:
+                self._dataloader_stats.close()
+            super().close()
+
         def _capture_iteration_bounds(self):
             super()._capture_iteration_bounds()
             if self._epochs_loop is not None:
-                self._epochs_loop.model.new_batch(self.get_current_iteration_id())
+                parent_iteration = {"group_id": self._group_id, "i": self._next_counter} if is_columnar else None
+                self._epochs_loop.model.new_batch(self.get_current_iteration_id(), parent_iteration)
 
     return FlowceptBatchLoop
 
@@ -4,6 +4,7 @@ from typing import Dict
 from flowcept.commons.flowcept_dataclasses.task_object import (
     TaskObject,
 )
+from flowcept.commons.task_id_generator import new_task_id
 from flowcept.commons.vocabulary import Status
 from flowcept.configs import INSTRUMENTATION_ENABLED
 from flowcept.flowcept_api.flowcept_controller import Flowcept
@@ -22,7 +23,8 @@ class FlowceptTask(object):
     Parameters
     ----------
     task_id : str, optional
-        Unique identifier for the task. If not provided, it defaults to the current timestamp.
+        Unique identifier for the task. If not provided, a new one is generated with the configured
+        task id generator.
     workflow_id : str, optional
         ID of the workflow to which this task belongs. Defaults to the current workflow ID from
         Flowcept.
@@ -68,7 +70,7 @@ class FlowceptTask(object):
         self._task.telemetry_at_start = FlowceptTask._interceptor.telemetry_capture.capture()
         self._task.activity_id = activity_id
         self._task.started_at = time()
-        self._task.task_id = task_id or str(self._task.started_at)
+        self._task.task_id = task_id or new_task_id()
         self._task.workflow_id = workflow_id or Flowcept.current_workflow_id
         self._task.campaign_id = campaign_id or Flowcept.campaign_id
         self._task.used = used
@@ -0,0 +1,188 @@
+"""Tensor statistics for the PyTorch instrumentation.
+
+Tensor inspection summarizes a tensor with its density, min, max, mean, L2 norm, and NaN and
+Inf counts. They are computed with reductions into one small vector on the tensor's device,
+so inspecting a tensor does not wait for the device. On CPU, the vector is read right away,
+and NaNs and Infs are only counted if the sum or the norm is not finite. On accelerators, the
+``TensorStatsEngine`` keeps the vectors on the device and holds back the tasks that refer to
+them; every ``flush_every`` tasks, the vectors are stacked into one buffer that is copied to
+the host asynchronously, and the tasks are delivered, with their statistics filled in, once
+the copy completes.
+"""
+
+from typing import Callable, Dict, List, Tuple
+
+import torch
+
+STAT_FIELDS = ("density", "min", "max", "mean", "norm", "nan_count", "inf_count")
+# Number of elements of an integer tensor converted at once to compute its sum and norm.
+_CONVERSION_CHUNK_NUMEL = 1 << 20
+
+
+def _accumulator_dtype(device: torch.device) -> torch.dtype:
+    return torch.float32 if device.type == "mps" else torch.float64  # MPS has no float64.
+
+
+def tensor_stats_vector(tensor: torch.Tensor) -> torch.Tensor:
+    """
+    Compute the statistics of a tensor without synchronizing with its device.
+
+    Parameters
+    ----------
+    tensor : torch.Tensor
+        A non-empty tensor, dense or sparse.
+
+    Returns
+    -------
+    torch.Tensor
+        A vector on the tensor's device, with the values of ``STAT_FIELDS`` in order.
+    """
+    numel = tensor.numel()
+    x = tensor.detach()
+    if x.is_sparse:
+        x = x.coalesce().values()
+    x = x.reshape(-1)
+    if x.is_complex():
+        x = x.abs()
+    acc = _accumulator_dtype(x.device)
+    _min, _max = torch.aminmax(x)
+    if x.numel() < numel:
+        # A sparse tensor's implicit zeros take part in its min and max.
+        _min, _max = torch.clamp(_min, max=0), torch.clamp(_max, min=0)
+    _sum, norm = _sum_and_norm(x, acc)
+    stats = torch.stack([torch.count_nonzero(x).to(acc) / numel, _min.to(acc), _max.to(acc), _sum / numel, norm])
+    if not x.is_floating_point():
+        nonfinite_counts = torch.zeros(2, dtype=acc, device=x.device)
+    elif x.device.type != "cpu":
+        nonfinite_counts = torch.stack([torch.isnan(x).sum(), torch.isinf(x).sum()]).to(acc)
+    elif torch.isfinite(stats[3:]).all():
+        # A NaN or an Inf would make the sum NaN or infinite, so there are none to count.
+        nonfinite_counts = torch.zeros(2, dtype=acc)
+    else:
+        nonfinite = x[~torch.isfinite(x)]
+        nan_count = torch.isnan(nonfinite).sum()
+        nonfinite_counts = torch.stack([nan_count, nonfinite.numel() - nan_count]).to(acc)
+    return torch.cat([stats, nonfinite_counts])
+
+
+def _sum_and_norm(x: torch.Tensor, acc: torch.dtype) -> Tuple[torch.Tensor, torch.Tensor]:
+    if x.is_floating_point():
+        if x.device.type == "cpu" and x.dtype != torch.float64:
+            # On CPU, reducing in float32 is much faster than converting to float64; the float64
+            # reductions are only done if a float32 one overflows or the tensor has NaNs or Infs.
+            _sum, norm = x.sum(dtype=torch.float32), torch.linalg.vector_norm(x, dtype=torch.float32)
+            if torch.isfinite(_sum) and torch.isfinite(norm):
+                return _sum.to(acc), norm.to(acc)
+        return x.sum(dtype=acc), torch.linalg.vector_norm(x, dtype=acc)
+    # Integer and boolean tensors are converted to the accumulator dtype one chunk at a time.
+    _sum = torch.zeros((), dtype=acc, device=x.device)
+    sum_of_squares = torch.zeros((), dtype=acc, device=x.device)
+    for chunk in x.split(_CONVERSION_CHUNK_NUMEL):
+        chunk = chunk.to(acc)
+        _sum += chunk.sum()
+        sum_of_squares += torch.dot(chunk, chunk)
+    return _sum, sum_of_squares.sqrt()
+
+
+def _fill(inspection: Dict, values: List[float]):
+    inspection.update(zip(STAT_FIELDS, values))
+    inspection["nan_count"] = int(inspection["nan_count"])
+    inspection["inf_count"] = int(inspection["inf_count"])
+
+
+class TensorStatsEngine:
+    """Inspects tensors and delivers the tasks that refer to the inspections.
+
+    Parameters
+    ----------
+    deliver : callable
+        Called with each task once its inspections are complete, e.g., an interceptor's
+        ``intercept``.
+    flush_every : int, optional
+        Number of tasks with pending statistics that are gathered before their statistics
+        are copied from the device. Defaults to 16.
+    """
+
+    def __init__(self, deliver: Callable[[Dict], None], flush_every: int = 16):
+        self._deliver = deliver
+        self._flush_every = max(1, flush_every)
+        self._pending: List[Tuple[Dict, torch.Tensor]] = []  # Inspections of the next submitted task.
+        self._batch_stats: List[Tuple[Dict, torch.Tensor]] = []
+        self._batch_tasks: List[Dict] = []
+        self._in_flight: List[Tuple[object, torch.Tensor, List[Dict], List[Dict]]] = []
+
+    def inspect(self, tensor: torch.Tensor) -> Dict:
+        """Get the inspection of a tensor. On accelerators, its statistics are filled in later."""
+        inspection = {
+            "id": id(tensor),
+            "is_sparse": tensor.is_sparse,
+            "shape": list(tensor.shape),
+            "device": str(tensor.device),
+            "nbytes": tensor.element_size() * tensor.numel(),
+            "numel": tensor.numel(),
+        }
+        if not inspection["numel"]:
+            return inspection
+        stats = tensor_stats_vector(tensor)
+        if stats.device.type == "cpu":
+            _fill(inspection, stats.tolist())
+        else:
+            self._pending.append((inspection, stats))
+        return inspection
+
+    def submit(self, task: Dict):
+        """Deliver a task now, or once the statistics of the tensors it inspected are copied."""
+        self.poll()
+        if not self._pending:
+            self._deliver(task)
+            return
+        self._batch_stats.extend(self._pending)
+        self._pending = []
+        self._batch_tasks.append(task)
+        if len(self._batch_tasks) >= self._flush_every:
+            self._copy_batch()
+
+    def _copy_batch(self):
+        if not self._batch_stats:
+            return
+        inspections = [inspection for inspection, _ in self._batch_stats]
+        device_buffer = torch.stack([stats for _, stats in self._batch_stats])
+        if device_buffer.device.type == "cuda":
+            host_buffer = torch.empty(device_buffer.shape, dtype=device_buffer.dtype, pin_memory=True)
+            host_buffer.copy_(device_buffer, non_blocking=True)
+            event = torch.cuda.Event()
+            event.record()
+        else:
+            host_buffer, event = device_buffer.cpu(), None
+        self._in_flight.append((event, host_buffer, inspections, self._batch_tasks))
+        self._batch_stats, self._batch_tasks = [], []
+
+    def poll(self, wait: bool = False):
+        """Deliver the tasks whose statistics arrived on the host, in order.
+
+        Parameters
+        ----------
+        wait : bool, optional
+            Whether to wait for all the copies in flight.
+        """
+        while self._in_flight:
+            event, host_buffer, inspections, tasks = self._in_flight[0]
+            if event is not None:
+                if wait:
+                    event.synchronize()
+                elif not event.query():
+                    return
+            self._in_flight.pop(0)
+            for inspection, values in zip(inspections, host_buffer.tolist()):
+                _fill(inspection, values)
+            for task in tasks:
+                self._deliver(task)
+
+    def flush(self):
+        """Copy all pending statistics and deliver all held tasks."""
+        if self._pending:
+            # Inspections not yet submitted with a task are completed, but there is no task to deliver.
+            self._batch_stats.extend(self._pending)
+            self._pending = []
+        self._copy_batch()
+        self.poll(wait=True)
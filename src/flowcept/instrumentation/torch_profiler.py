@@ -0,0 +1,185 @@
+"""torch.profiler capture mode for the PyTorch instrumentation.
+
+A ``FlowceptBatchLoop`` can run ``torch.profiler`` over windows of batches, following a
+wait/warmup/active schedule. The forward of the model and of its captured submodules are
+marked as profiler ranges, because the profiler only attributes operators to modules for
+TorchScript models. At the end of each window, the trace is summarized into one
+``torch_profile`` task whose ``generated`` field has the CPU time, memory allocations, and
+FLOP estimates per module and the most expensive operators, and whose ``used`` field lists
+the task ids of the profiled batches. It works on CPU-only machines; CUDA activity is
+profiled too when a GPU is available.
+"""
+
+from functools import partial
+from time import time
+from typing import Callable, Dict, List, Tuple
+
+import torch
+from torch import nn
+from torch.profiler import ProfilerAction, ProfilerActivity, record_function
+
+from flowcept.commons.task_id_generator import new_task_id
+from flowcept.commons.vocabulary import Status
+
+MODULE_RANGE_PREFIX = "flowcept.module:"
+TORCH_PROFILE = "torch_profile"
+
+
+def _descendant_flops(event) -> int:
+    flops = 0
+    for child in event.cpu_children:
+        flops += (child.flops or 0) + _descendant_flops(child)
+    return flops
+
+
+def summarize_profile(prof: torch.profiler.profile, max_operators: int = 20) -> Dict:
+    """
+    Summarize a profiler trace per module and per operator.
+
+    Parameters
+    ----------
+    prof : torch.profiler.profile
+        A profiler whose trace is ready.
+    max_operators : int, optional
+        Number of operators with the largest self CPU time to keep. Defaults to 20.
+
+    Returns
+    -------
+    dict
+        ``{"modules": {name: summary}, "operators": [summary]}``. Module summaries include
+        their submodules and have ``calls``, ``cpu_time_us``, ``cpu_memory_bytes``, and
+        ``flops``; operator summaries also have ``name`` and ``self_cpu_time_us``. Times are
+        in microseconds.
+    """
+    modules = {}
+    for event in prof.events():
+        if not event.name.startswith(MODULE_RANGE_PREFIX):
+            continue
+        summary = modules.setdefault(
+            event.name[len(MODULE_RANGE_PREFIX) :], {"calls": 0, "cpu_time_us": 0, "cpu_memory_bytes": 0, "flops": 0}
+        )
+        summary["calls"] += 1
+        summary["cpu_time_us"] += event.cpu_time_total
+        summary["cpu_memory_bytes"] += event.cpu_memory_usage
+        summary["flops"] += _descendant_flops(event)
+
+    operators = [e for e in prof.key_averages() if not e.key.startswith((MODULE_RANGE_PREFIX, "ProfilerStep"))]
+    operators.sort(key=lambda e: e.self_cpu_time_total, reverse=True)
+    return {
+        "modules": modules,
+        "operators": [
+            {
+                "name": e.key,
+                "calls": e.count,
+                "cpu_time_us": e.cpu_time_total,
+                "self_cpu_time_us": e.self_cpu_time_total,
+                "cpu_memory_bytes": e.cpu_memory_usage,
+                "flops": e.flops,
+            }
+            for e in operators[:max_operators]
+        ],
+    }
+
+
+class TorchProfilerCapture:
+    """Runs torch.profiler over windows of batches and emits one summary task per window.
+
+    Parameters
+    ----------
+    modules : list of (str, nn.Module)
+        The modules whose forwards are summarized, and their names.
+    conf : dict
+        The ``instrumentation.torch.profiler`` settings.
+    deliver : callable
+        Called with each summary task, e.g., an interceptor's ``intercept``.
+    workflow_id : str
+        The workflow of the summary tasks.
+    parent_task_id : str, optional
+        The parent of the summary tasks, e.g., the epoch iteration task.
+    """
+
+    def __init__(
+        self,
+        modules: List[Tuple[str, nn.Module]],
+        conf: Dict,
+        deliver: Callable[[Dict], None],
+        workflow_id: str,
+        parent_task_id: str = None,
+    ):
+        self._deliver = deliver
+        self._workflow_id = workflow_id
+        self._parent_task_id = parent_task_id
+        self._max_operators = conf.get("max_operators", 20)
+        self._schedule = torch.profiler.schedule(
+            wait=conf.get("wait", 1),
+            warmup=conf.get("warmup", 1),
+            active=conf.get("active", 3),
+            repeat=conf.get("repeat", 1),
+        )
+        activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+        self._profiler = torch.profiler.profile(
+            activities=activities,
+            schedule=self._schedule,
+            on_trace_ready=self._emit_summary,
+            profile_memory=conf.get("profile_memory", True),
+            with_flops=conf.get("with_flops", True),
+            record_shapes=conf.get("record_shapes", False),
+        )
+        self._step = 0
+        self._window_batch_ids: List[str] = []
+        self._window_started_at = None
+        self._open_ranges: List[record_function] = []
+        self._hook_handles = []
+        for name, module in modules:
+            enter_range = partial(self._enter_range, MODULE_RANGE_PREFIX + name)
+            self._hook_handles.append(module.register_forward_pre_hook(enter_range))
+            self._hook_handles.append(module.register_forward_hook(self._exit_range))
+
+    def _enter_range(self, range_name, module, args):
+        profiler_range = record_function(range_name)
+        profiler_range.__enter__()
+        self._open_ranges.append(profiler_range)
+
+    def _exit_range(self, module, args, result):
+        if self._open_ranges:
+            self._open_ranges.pop().__exit__(None, None, None)
+
+    def step(self, batch_task_id: str):
+        """Mark the start of a batch, starting the profiler at the first one."""
+        if self._step == 0:
+            self._profiler.start()
+        else:
+            self._profiler.step()
+        if self._schedule(self._step) in {ProfilerAction.RECORD, ProfilerAction.RECORD_AND_SAVE}:
+            if not self._window_batch_ids:
+                self._window_started_at = time()
+            self._window_batch_ids.append(batch_task_id)
+        self._step += 1
+
+    def stop(self):
+        """Stop the profiler, summarizing the window in progress, if any, and remove the hooks."""
+        if self._step:
+            self._profiler.stop()
+            self._step = 0
+        for handle in self._hook_handles:
+            handle.remove()
+        self._hook_handles = []
+
+    def _emit_summary(self, prof: torch.profiler.profile):
+        task = {
+            "task_id": new_task_id(),
+            "workflow_id": self._workflow_id,
+            "activity_id": TORCH_PROFILE,
+            "subtype": TORCH_PROFILE,
+            "started_at": self._window_started_at,
+            "ended_at": time(),
+            "used": {"batch_task_ids": self._window_batch_ids},
+            "generated": summarize_profile(prof, self._max_operators),
+            "status": Status.FINISHED.value,
+        }
+        if self._parent_task_id is not None:
+            task["parent_task_id"] = self._parent_task_id
+        self._window_batch_ids = []
+        self._deliver(task)
@@ -6,7 +6,7 @@ import unittest
 
 from flowcept.commons.vocabulary import Status
 from flowcept import FlowceptLoop, Flowcept
-from flowcept.instrumentation.flowcept_loop import FlowceptLightweightLoop
+from flowcept.instrumentation.flowcept_loop import FlowceptLightweightLoop, FlowceptColumnarLoop
 
 TIME_TO_SLEEP = 0.001
 
@@ -15,6 +15,8 @@ class LoopTests(unittest.TestCase):
     def flowcept_loop_types(self, flowcept_loop_type):
         if flowcept_loop_type == "lightweight":
             loop_class = FlowceptLightweightLoop
+        elif flowcept_loop_type == "columnar":
+            loop_class = FlowceptColumnarLoop
         else:
             loop_class = FlowceptLoop
 
@@ -124,6 +126,61 @@ class LoopTests(unittest.TestCase):
     def test_loops(self):
         self.flowcept_loop_types(flowcept_loop_type="default")
         self.flowcept_loop_types(flowcept_loop_type="lightweight")
+        self.flowcept_loop_types(flowcept_loop_type="columnar")
+
+    def test_columnar_loop_blocks(self):
+        number_of_items = 25
+        with Flowcept():
+            loop = FlowceptColumnarLoop(items=iter(range(number_of_items)), loop_name="epochs", item_name="epoch",
+                                        block_size=10)
+            for e in loop:
+                loop.end_iter({"loss": random.random() + 0.1} if e % 2 else {"accuracy": 1})
+
+        docs = Flowcept.db.query(filter={"workflow_id": Flowcept.current_workflow_id})
+        assert len(docs) == number_of_items
+        sorted_tasks = sorted(docs, key=lambda x: x['used']['i'])
+        for i in range(number_of_items):
+            t = sorted_tasks[i]
+            assert t["task_id"] == loop._group_id + str(i)
+            assert t["activity_id"] == "epochs_iteration"
+            assert t["used"]["epoch"] == i
+            assert t["status"] == Status.FINISHED.value
+            if i % 2:
+                assert t["generated"]["loss"] > 0 and "accuracy" not in t["generated"]
+            else:
+                assert t["generated"]["accuracy"] == 1 and "loss" not in t["generated"]
+
+    def test_columnar_loop_len_when_streaming(self):
+        with Flowcept():
+            loop = FlowceptColumnarLoop(items=iter(range(5)), loop_name="epochs", item_name="epoch")
+            assert len(loop) == 0
+            for e in loop:
+                assert len(loop) == e + 1
+        assert len(loop) == 5
+
+    def test_columnar_loop_single_block(self):
+        number_of_items = 30
+        with Flowcept():
+            loop = FlowceptColumnarLoop(items=range(number_of_items), loop_name="batches", item_name="batch",
+                                        block_size=None)
+            for b in loop:
+                loop.end_iter({"loss": 1.0 / (b + 1)})
+
+        # Whether the block was expanded when stored or not, the query layer gives one task per iteration.
+        tasks = list(Flowcept.db.iterate_tasks(filter={"workflow_id": Flowcept.current_workflow_id}))
+        assert len(tasks) == number_of_items
+        assert {t["task_id"] for t in tasks} == {loop._group_id + str(i) for i in range(number_of_items)}
+        task = Flowcept.db.get_iteration_task(loop._group_id, 7)
+        assert task["used"]["batch"] == 7 and task["generated"]["loss"] == 1.0 / 8
+
+    def test_set_iteration_field(self):
+        for loop_class in (FlowceptLoop, FlowceptLightweightLoop, FlowceptColumnarLoop):
+            with Flowcept():
+                loop = loop_class(items=range(3), loop_name="epochs", item_name="epoch")
+                for e in loop:
+                    loop.set_iteration_field("train_dataloader", {"batches": e})
+            docs = Flowcept.db.query(filter={"workflow_id": Flowcept.current_workflow_id})
+            assert sorted(d["train_dataloader"]["batches"] for d in docs) == [0, 1, 2]
 
     def test_flowcept_loop_generator(self):
         number_of_epochs = 1
@@ -153,3 +210,22 @@ class LoopTests(unittest.TestCase):
             assert t["used"]["i"] == i
             assert t["used"]["epoch"] == i
             assert t["status"] == Status.FINISHED.value
+
+    def test_streaming_loops(self):
+        number_of_items = 23
+        for loop_class in [FlowceptLoop, FlowceptLightweightLoop]:
+            kwargs = {"batch_size": 10} if loop_class is FlowceptLightweightLoop else {}
+            with Flowcept():
+                loop = loop_class(items=(i * 2 for i in range(number_of_items)), loop_name="stream",
+                                  item_name="value", **kwargs)
+                for value in loop:
+                    loop.end_iter({"half": value // 2})
+            assert len(loop) == number_of_items
+            docs = Flowcept.db.query(filter={"workflow_id": Flowcept.current_workflow_id})
+            assert len(docs) == number_of_items
+            sorted_tasks = sorted(docs, key=lambda x: x['used']['i'])
+            for i in range(number_of_items):
+                t = sorted_tasks[i]
+                assert t["used"]["value"] == i * 2
+                assert t["generated"]["half"] == i
+                assert t["status"] == Status.FINISHED.value
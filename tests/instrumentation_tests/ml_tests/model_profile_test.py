@@ -0,0 +1,19 @@
+import unittest
+
+from torch import nn
+
+from flowcept.instrumentation.flowcept_torch import model_architecture_hash
+
+
+def build_mlp(hidden):
+    return nn.Sequential(nn.Linear(8, hidden), nn.ReLU(), nn.Linear(hidden, 2))
+
+
+class ModelProfileTests(unittest.TestCase):
+    def test_architecture_hash(self):
+        # Same architecture, different weights.
+        assert model_architecture_hash(build_mlp(16)) == model_architecture_hash(build_mlp(16))
+        assert model_architecture_hash(build_mlp(16)) != model_architecture_hash(build_mlp(32))
+        dropout_01, dropout_05 = nn.Sequential(nn.Dropout(0.1)), nn.Sequential(nn.Dropout(0.5))
+        assert model_architecture_hash(dropout_01) != model_architecture_hash(dropout_05)
+        assert model_architecture_hash(build_mlp(16), "A") != model_architecture_hash(build_mlp(16), "B")
@@ -0,0 +1,52 @@
+import math
+import unittest
+
+import torch
+
+from flowcept.instrumentation.tensor_stats import TensorStatsEngine
+
+
+class TensorStatsTests(unittest.TestCase):
+    def test_cpu_inspection(self):
+        delivered = []
+        engine = TensorStatsEngine(delivered.append)
+        tensor = torch.tensor([[0.0, 3.0], [-4.0, 0.0], [float("nan"), float("inf")]])
+        inspection = engine.inspect(tensor)
+        assert inspection["shape"] == [3, 2] and inspection["numel"] == 6
+        assert inspection["density"] == torch.nonzero(tensor).size(0) / tensor.numel()
+        assert inspection["nan_count"] == 1 and inspection["inf_count"] == 1
+
+        finite = engine.inspect(torch.tensor([0.0, 3.0, -4.0, 0.0]))
+        assert finite["density"] == 0.5
+        assert (finite["min"], finite["max"], finite["mean"]) == (-4.0, 3.0, -0.25)
+        assert math.isclose(finite["norm"], 5.0)
+        assert (finite["nan_count"], finite["inf_count"]) == (0, 0)
+
+        # The float32 norm overflows, so it is computed in float64.
+        large = engine.inspect(torch.tensor([3e30, -4e30]))
+        assert math.isclose(large["norm"], 5e30, rel_tol=1e-6) and large["inf_count"] == 0
+
+        # On CPU, the statistics are ready right away, so tasks are not held.
+        task = {"used": {"tensor": finite}}
+        engine.submit(task)
+        assert delivered == [task]
+
+    def test_sparse_and_integer_tensors(self):
+        engine = TensorStatsEngine(lambda task: None)
+        sparse = torch.tensor([[0, 2], [0, 0]]).to_sparse()
+        inspection = engine.inspect(sparse)
+        assert inspection["density"] == 0.25
+        assert (inspection["min"], inspection["max"]) == (0.0, 2.0)
+        integer = engine.inspect(torch.tensor([3, -4, 0, 0]))
+        assert (integer["mean"], integer["norm"], integer["nan_count"]) == (-0.25, 5.0, 0)
+        assert "density" not in engine.inspect(torch.empty(0))
+
+    @unittest.skipIf(not torch.cuda.is_available(), "No GPU")
+    def test_gpu_tasks_held_until_flush(self):
+        delivered = []
+        engine = TensorStatsEngine(delivered.append, flush_every=4)
+        task = {"used": {"tensor": engine.inspect(torch.ones(10, device="cuda"))}}
+        engine.submit(task)
+        assert delivered == [] and "density" not in task["used"]["tensor"]
+        engine.flush()
+        assert delivered == [task] and task["used"]["tensor"]["density"] == 1.0
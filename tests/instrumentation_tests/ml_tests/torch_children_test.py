@@ -0,0 +1,119 @@
+import unittest
+from time import sleep
+from unittest.mock import patch
+
+import torch
+from torch import nn
+
+from flowcept.commons.telemetry_series import decode_block, fill_schema
+from flowcept.flowceptor.adapters.base_interceptor import BaseInterceptor
+from flowcept.instrumentation.flowcept_torch import TORCH_CONFIG, flowcept_torch
+
+
+class Net(nn.Module):
+    def __init__(self, **kwargs):
+        super().__init__()
+        self.fc = nn.Linear(4, 4)
+        self.block = nn.Sequential(nn.Linear(4, 4), nn.ReLU())
+
+    def forward(self, x):
+        return self.block(self.fc(x))
+
+
+def _hook_count(model):
+    return sum(len(m._forward_hooks) + len(m._forward_pre_hooks) for m in model.modules())
+
+
+class TorchChildrenTests(unittest.TestCase):
+    def setUp(self):
+        self.captured = []
+        patcher = patch.object(BaseInterceptor, "intercept", lambda _, msg: self.captured.append(msg))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _model(self, mode, depth, what="parent_and_children"):
+        torch_config = {"what": what, "children_mode": mode, "children_max_depth": depth}
+        with patch.dict(TORCH_CONFIG, torch_config):
+            model = flowcept_torch(Net)(save_workflow=False)
+        model.workflow_id = "wf"
+        return model
+
+    def _forward(self, model):
+        self.captured.clear()
+        model(torch.ones(2, 4))
+        parents = [t for t in self.captured if t.get("subtype") == "parent_forward"]
+        assert len(parents) == 1
+        children = [t for t in self.captured if t.get("subtype") == "child_forward"]
+        assert all(t["parent_task_id"] == parents[0]["task_id"] for t in children)
+        return parents[0], children
+
+    def test_children_per_mode_and_depth(self):
+        expected = {
+            1: ["Linear", "Sequential"],
+            None: ["Linear", "Linear", "ReLU", "Sequential"],  # In the order the forwards end.
+        }
+        for mode in ("lightweight", "tensor_inspection", "telemetry", "telemetry_and_tensor_inspection"):
+            for depth, activities in expected.items():
+                with self.subTest(mode=mode, depth=depth):
+                    model = self._model(mode, depth)
+                    _, children = self._forward(model)
+                    assert [t["activity_id"] for t in children] == activities
+                    for task in children:
+                        assert ("telemetry_at_end" in task) == ("telemetry" in mode)
+                        assert ("generated" in task) == ("inspection" in mode)
+                        if "inspection" in mode:
+                            assert task["generated"]["tensor"]["shape"] == [2, 4]
+
+    def test_children_hooks_removed(self):
+        model = self._model("tensor_inspection", None)
+        assert _hook_count(model) == 4
+        model.new_epoch("epoch_0")
+        assert len(self._forward(model)[1]) == 4
+        # Tensors are only inspected in the first epoch; then there is nothing left to capture from the children.
+        model.new_epoch("epoch_1")
+        assert _hook_count(model) == 0 and model._children_hook_handles == []
+        assert self._forward(model)[1] == []
+
+        model = self._model("layers", None)
+        assert _hook_count(model) == 8
+        model._remove_children_hooks()
+        assert _hook_count(model) == 0
+        parent, children = self._forward(model)
+        assert children == [] and parent["layers"]["name"] == []
+
+    def test_layers_columns(self):
+        model = self._model("layers", None)
+        first, children = self._forward(model)
+        assert children == []
+        layers = first["layers"]
+        # Layers are listed in the order their forwards start; "block" wraps "block.0" and "block.1".
+        assert layers["name"] == ["fc", "block", "block.0", "block.1"]
+        assert layers["type"] == ["Linear", "Sequential", "Linear", "ReLU"]
+        assert layers["output_shape"] == [[2, 4]] * 4
+        assert "telemetry_at_end" not in layers
+        offsets, durations = layers["offset"], layers["duration"]
+        assert all(d >= 0 for d in durations) and offsets == sorted(offsets)
+        assert offsets[2] + durations[2] <= offsets[1] + durations[1]  # block.0 ends within block.
+
+        # Each forward only has its own calls, with offsets from its own start.
+        sleep(0.2)
+        second = self._forward(model)[0]["layers"]
+        assert second["name"] == layers["name"]
+        assert second["offset"][0] < 0.2
+
+    def test_layers_and_telemetry_columns(self):
+        model = self._model("layers_and_telemetry", 1)
+        blocks = self._forward(model)[0]["layers"]["telemetry_at_end"]
+        assert [(b["first_index"], len(b["sampled_at"])) for b in blocks] == [(0, 2)]
+        rows = decode_block(blocks[0]).tolist()
+        telemetry = [fill_schema(blocks[0]["schema"], row, set(blocks[0]["int_columns"])) for row in rows]
+        assert all(t["process"]["pid"] == telemetry[0]["process"]["pid"] for t in telemetry)
+
+    def test_layers_modes_require_the_parent(self):
+        for mode in ("layers", "layers_and_telemetry"):
+            with self.subTest(mode=mode), self.assertRaises(Exception):
+                self._model(mode, None, what="children")
+        # Without layers, the children can be captured alone.
+        self.captured.clear()
+        self._model("lightweight", None, what="children")(torch.ones(2, 4))
+        assert [t["activity_id"] for t in self.captured] == ["Linear", "Linear", "ReLU", "Sequential"]
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import patch
+
+import torch
+from torch import nn
+
+from flowcept.flowceptor.adapters.base_interceptor import BaseInterceptor
+from flowcept.instrumentation.flowcept_torch import (
+    TORCH_CONFIG,
+    FlowceptEpochLoop,
+    _create_batch_loop_class,
+    flowcept_torch,
+)
+
+
+class Net(nn.Module):
+    def __init__(self, **kwargs):
+        super().__init__()
+        self.fc = nn.Linear(4, 4)
+
+    def forward(self, x):
+        return self.fc(x)
+
+
+class TorchLoopsTests(unittest.TestCase):
+    def setUp(self):
+        self.captured = []
+        for name, patched in (
+            ("intercept", lambda _, msg: self.captured.append(msg)),
+            ("intercept_many", lambda _, msgs: self.captured.extend(msgs)),
+        ):
+            patcher = patch.object(BaseInterceptor, name, patched)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        with patch.dict(TORCH_CONFIG, {"what": "parent_only", "batch_loop": "columnar", "batch_loop_block_size": None}):
+            self.batch_loop_class = _create_batch_loop_class()
+        self.model = flowcept_torch(Net)(save_workflow=False)
+        self.model.workflow_id = "wf"
+
+    def _blocks(self):
+        return [t for t in self.captured if t.get("type") == "task_block"]
+
+    def test_columnar_batch_loop_flushed_after_break(self):
+        epochs_loop = FlowceptEpochLoop(range(2), model=self.model, workflow_id="wf")
+        epoch_ids = []
+        for epoch in epochs_loop:
+            # The block of the previous epoch's batch loop was intercepted when this epoch started.
+            assert len(self._blocks()) == epoch
+            epoch_ids.append(epochs_loop.get_current_iteration_id())
+            for i, batch in enumerate(self.batch_loop_class([torch.ones(2, 4)] * 5, epochs_loop)):
+                self.model(batch)
+                if i == 2:
+                    break
+        blocks = self._blocks()
+        assert [b["columns"]["i"] for b in blocks] == [[0, 1, 2], [0, 1, 2]]
+        assert [b["parent_task_id"] for b in blocks] == epoch_ids
+        forwards = [t for t in self.captured if t.get("subtype") == "parent_forward"]
+        group_id = blocks[0]["group_id"]
+        assert [f["parent_iteration"] for f in forwards[:3]] == [{"group_id": group_id, "i": i} for i in range(3)]
+
+    def test_dataloader_stats_reported_after_break(self):
+        epochs_loop = FlowceptEpochLoop(range(2), model=self.model, workflow_id="wf")
+        for epoch in epochs_loop:
+            for i, batch in enumerate(self.batch_loop_class([torch.ones(2, 4)] * 5, epochs_loop)):
+                self.model(batch)
+                if i == 2:
+                    break
+            if not epoch:
+                for batch in self.batch_loop_class([torch.ones(2, 4)] * 2, epochs_loop, step="eval"):
+                    self.model(batch)
+        epochs = [t for t in self.captured if t.get("activity_id") == "epochs_loop_iteration"]
+        assert [e["train_dataloader"]["batches"] for e in epochs] == [3, 3]
+        assert epochs[0]["eval_dataloader"]["batches"] == 2 and "eval_dataloader" not in epochs[1]
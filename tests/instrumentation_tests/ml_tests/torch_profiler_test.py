@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import patch
+
+import torch
+from torch import nn
+
+from flowcept.flowceptor.adapters.base_interceptor import BaseInterceptor
+from flowcept.instrumentation.flowcept_torch import (
+    TORCH_CONFIG,
+    FlowceptBatchLoop,
+    FlowceptEpochLoop,
+    flowcept_torch,
+)
+from flowcept.instrumentation.torch_profiler import TORCH_PROFILE
+
+
+class Net(nn.Module):
+    def __init__(self, **kwargs):
+        super().__init__()
+        self.fc = nn.Linear(4, 4)
+
+    def forward(self, x):
+        return self.fc(x)
+
+
+def _hook_count(model):
+    return sum(len(m._forward_hooks) + len(m._forward_pre_hooks) for m in model.modules())
+
+
+class TorchProfilerTests(unittest.TestCase):
+    def setUp(self):
+        self.captured = []
+        for name, patched in (
+            ("intercept", lambda _, msg: self.captured.append(msg)),
+            ("intercept_many", lambda _, msgs: self.captured.extend(msgs)),
+        ):
+            patcher = patch.object(BaseInterceptor, name, patched)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        profiler_conf = {"enabled": True, "wait": 0, "warmup": 0, "active": 3, "repeat": 1, "profile_memory": False}
+        patcher = patch.dict(TORCH_CONFIG, {"what": "parent_only", "profiler": profiler_conf})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _profiles(self):
+        return [t for t in self.captured if t.get("subtype") == TORCH_PROFILE]
+
+    def test_profiler_stopped_after_break(self):
+        model = flowcept_torch(Net)(save_workflow=False)
+        model.workflow_id = "wf"
+        epochs_loop = FlowceptEpochLoop(range(2), model=model, workflow_id="wf")
+        batch_ids = []
+        for epoch in epochs_loop:
+            # The capture of the previous epoch was stopped when this one started.
+            assert _hook_count(model) == 0
+            assert len(self._profiles()) == epoch
+            if epoch:
+                assert self._profiles()[0]["used"]["batch_task_ids"] == batch_ids
+            for i, batch in enumerate(FlowceptBatchLoop([torch.ones(2, 4)] * 5, epochs_loop)):
+                if not epoch:
+                    batch_ids.append(model.parent_task_id)
+                model(batch)
+                if i == 1:
+                    break  # In the middle of the active window.
+            assert _hook_count(model) == 4  # The model and its child fc.
+        assert _hook_count(model) == 0
+        assert len(self._profiles()) == 2
+
+    def test_new_batch_loop_and_close_stop_the_profiler(self):
+        model = flowcept_torch(Net)(save_workflow=False)
+        model.workflow_id = "wf"
+        epochs_loop = FlowceptEpochLoop(range(1), model=model, workflow_id="wf")
+        for _ in epochs_loop:
+            train_ids = []
+            for i, batch in enumerate(FlowceptBatchLoop([torch.ones(2, 4)] * 5, epochs_loop)):
+                train_ids.append(model.parent_task_id)
+                model(batch)
+                if i == 1:
+                    break
+            eval_loop = FlowceptBatchLoop([torch.ones(2, 4)] * 5, epochs_loop, step="eval")
+            # The train loop's profiler was stopped, emitting its partial window, and the eval loop hooked the model.
+            profiles = self._profiles()
+            assert len(profiles) == 1 and profiles[0]["used"]["batch_task_ids"] == train_ids
+            assert profiles[0]["parent_task_id"] == epochs_loop.get_current_iteration_id()
+            assert profiles[0]["generated"]["modules"]["Net"]["calls"] == 2
+            assert _hook_count(model) == 4  # The model and its child fc.
+            next(eval_loop)
+            eval_loop.close()
+            assert _hook_count(model) == 0
+            assert len(self._profiles()) == 2
@@ -0,0 +1,71 @@
+import os
+import unittest
+from threading import Lock, Thread
+
+from flowcept.commons.autoflush_buffer import ThreadLocalAutoflushBuffer
+
+
+class TestThreadLocalAutoflushBuffer(unittest.TestCase):
+    def setUp(self):
+        self.flushed = []
+        self._lock = Lock()
+
+    def _flush(self, batch):
+        with self._lock:
+            self.flushed.extend(batch)
+
+    def test_all_threads_are_flushed(self):
+        buffer = ThreadLocalAutoflushBuffer(max_size=10, flush_interval=0.01, flush_function=self._flush)
+
+        def produce(tid):
+            for i in range(1000):
+                buffer.append((tid, i))
+            buffer.extend([(tid, i) for i in range(1000, 1100)])
+
+        threads = [Thread(target=produce, args=(t,)) for t in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        buffer.stop()
+
+        assert sorted(self.flushed) == sorted((t, i) for t in range(8) for i in range(1100))
+        for t in range(8):
+            per_thread = [i for tid, i in self.flushed if tid == t]
+            assert per_thread == sorted(per_thread)
+        stats = buffer.stats()
+        total = stats["retired_appended"] + sum(s["appended"] for s in stats["threads"])
+        assert total == 8 * 1100
+        assert all(s["backlog"] == 0 for s in stats["threads"])
+
+    def test_backlog_limit_drops_and_counts(self):
+        # A long interval and a large max_size keep the flusher idle while we append.
+        buffer = ThreadLocalAutoflushBuffer(max_size=1000, flush_interval=60, flush_function=self._flush, max_backlog=5)
+        for i in range(8):
+            buffer.append(i)
+        buffer.extend([8, 9])
+        stats = buffer.stats()["threads"][0]
+        assert stats["appended"] == 5
+        assert stats["dropped"] == 5
+        assert stats["backlog"] == 5
+        buffer.stop()
+        assert self.flushed == [0, 1, 2, 3, 4]
+
+    @unittest.skipIf(not hasattr(os, "fork"), "Fork is not available")
+    def test_fork_reinitializes_buffers(self):
+        read_fd, write_fd = os.pipe()
+        buffer = ThreadLocalAutoflushBuffer(max_size=1000, flush_interval=60, flush_function=self._flush)
+        buffer.append("parent")
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            buffer.append("child")
+            buffer.stop()
+            os.write(write_fd, ",".join(self.flushed).encode())
+            os._exit(0)
+        os.close(write_fd)
+        child_flushed = os.read(read_fd, 1024).decode()
+        os.waitpid(pid, 0)
+        buffer.stop()
+        assert child_flushed == "child"
+        assert self.flushed == ["parent"]
@@ -0,0 +1,92 @@
+import unittest
+from unittest.mock import patch
+
+import torch
+
+from flowcept.commons.daos.docdb_dao.lmdb_dao import LMDBDAO
+from flowcept.flowcept_api.checkpoint_store import CheckpointStore
+
+
+def _state_dict():
+    return {
+        "bf16": torch.arange(12, dtype=torch.bfloat16).reshape(3, 4),
+        "chunked": torch.arange(100, dtype=torch.float32),  # 400 bytes: 7 chunks of 64 bytes.
+        "non_contiguous": torch.arange(20, dtype=torch.int64).reshape(4, 5).t(),
+        "scalar": torch.tensor(3.5),
+        "epoch": 7,
+        "config": {"lr": 0.1, "layers": [4, 4]},
+    }
+
+
+class CheckpointStoreTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.dao = LMDBDAO()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.dao.close()  # The environment can only be open once per process.
+
+    def _assert_tensors_equal(self, expected, actual):
+        assert actual.dtype == expected.dtype and actual.shape == expected.shape
+        assert torch.equal(actual, expected)
+
+    def test_save_and_load(self):
+        state_dict = _state_dict()
+        store = CheckpointStore(self.dao, chunk_size=64)
+        checkpoint_id = store.save(state_dict, workflow_id="wf", wait=True)
+        manifest = store.get(checkpoint_id).manifest
+        assert {t["name"]: len(t["chunks"]) for t in manifest["tensors"]} == {
+            "bf16": 1,
+            "chunked": 7,
+            "non_contiguous": 3,
+            "scalar": 1,
+        }
+        loaded = store.load(checkpoint_id)
+        assert set(loaded) == set(state_dict)
+        for name in ("bf16", "chunked", "non_contiguous", "scalar"):
+            self._assert_tensors_equal(state_dict[name], loaded[name])
+        assert loaded["epoch"] == 7 and loaded["config"] == {"lr": 0.1, "layers": [4, 4]}
+
+    def test_partial_load(self):
+        state_dict = _state_dict()
+        store = CheckpointStore(self.dao, chunk_size=64)
+        checkpoint_id = store.save(state_dict, wait=True)
+        with patch.object(self.dao, "get_chunks", wraps=self.dao.get_chunks) as get_chunks:
+            loaded = store.load(checkpoint_id, names=["scalar", "chunked"])
+        assert set(loaded) == {"scalar", "chunked"}
+        self._assert_tensors_equal(state_dict["chunked"], loaded["chunked"])
+        assert len(get_chunks.call_args.args[0]) == 8  # Only the chunks of the selected tensors.
+
+    def test_dedup(self):
+        puts = []  # (chunks given, chunks newly stored) per put_chunks call.
+        put_chunks = self.dao.put_chunks
+
+        def counting_put_chunks(chunks):
+            n_new = put_chunks(chunks)
+            puts.append((len(chunks), n_new))
+            return n_new
+
+        state_dict = {"w": torch.randn(64), "frozen": torch.randn(64)}
+        store = CheckpointStore(self.dao, chunk_size=64)
+        with patch.object(self.dao, "put_chunks", counting_put_chunks):
+            store.save(state_dict, wait=True)
+            assert puts == [(8, 8)]
+            puts.clear()
+            store.save(state_dict, wait=True)
+            assert puts == []
+            state_dict["w"] += 1
+            store.save(state_dict, wait=True)
+            assert puts == [(4, 4)]  # Only "w" changed.
+            # Another store does not know the chunks, but they are not stored again either.
+            puts.clear()
+            CheckpointStore(self.dao, chunk_size=64).save(state_dict, wait=True)
+            assert puts == [(8, 0)]
+
+    def test_failed_snapshot_is_not_pending(self):
+        store = CheckpointStore(self.dao)
+        with patch.object(torch.Tensor, "contiguous", side_effect=RuntimeError("out of memory")):
+            with self.assertRaises(RuntimeError):
+                store.save({"w": torch.ones(8)})
+        assert store._pending_bytes == 0 and not store._pending_ids
+        store.wait()
@@ -0,0 +1,50 @@
+import unittest
+from time import sleep
+
+import numpy as np
+
+from flowcept.instrumentation.dataloader_stats import DataLoaderStats, estimate_nbytes
+
+
+class DataLoaderStatsTest(unittest.TestCase):
+    def test_estimate_nbytes(self):
+        batch = (np.zeros((8, 3, 4), dtype=np.float32), np.zeros(8, dtype=np.int64))
+        assert estimate_nbytes(batch) == (8 * 3 * 4 * 4 + 8 * 8, 8)
+        assert estimate_nbytes({"x": batch[0], "label": "cat"}) == (8 * 3 * 4 * 4, 8)
+        assert estimate_nbytes("not a batch") == (0, 0)
+
+    def test_wait_and_compute_times(self):
+        def slow_loader():
+            for _ in range(3):
+                sleep(0.02)
+                yield np.zeros((4, 2), dtype=np.float64)
+
+        summaries = []
+        loader = DataLoaderStats(on_end=summaries.append).wrap(slow_loader())
+        for _ in loader:
+            sleep(0.005)
+
+        assert len(summaries) == 1
+        summary = summaries[0]
+        assert (summary["batches"], summary["samples"], summary["bytes"]) == (3, 12, 3 * 64)
+        assert summary["data_wait_secs"] >= 0.06 and summary["compute_secs"] >= 0.015
+        assert summary["data_wait_secs"] > summary["compute_secs"] and summary["stall_fraction"] > 0.5
+        histogram = summary["histogram"]
+        assert sum(histogram["data_wait"]) == 3 and sum(histogram["compute"]) == 3
+        assert len(histogram["bin_upper_edges_secs"]) == len(histogram["data_wait"])
+
+    def test_close_after_break(self):
+        summaries = []
+        loader = DataLoaderStats(on_end=summaries.append).wrap(iter([np.zeros(4)] * 5))
+        for i, _ in enumerate(loader):
+            if i == 1:
+                break
+        loader.close()
+        loader.close()
+        assert len(summaries) == 1
+        assert summaries[0]["batches"] == 2 and sum(summaries[0]["histogram"]["compute"]) == 2
+
+        loader.wrap(iter([np.zeros(4)]))
+        list(loader)
+        loader.close()
+        assert len(summaries) == 2
@@ -0,0 +1,61 @@
+import unittest
+from time import sleep
+
+from flowcept.instrumentation.device_timing import DEVICE_TIMING, DeviceTimer, HostTimingBackend, timing_backend_for
+
+
+class FakeAsyncBackend:
+    """Stands for a device whose work completes only when the host waits for it."""
+
+    device = "fake:0"
+
+    def __init__(self):
+        self.waited = False
+
+    def record(self):
+        return 0
+
+    def elapsed(self, start, end, wait=False):
+        if not wait:
+            return None
+        self.waited = True
+        return 0.5
+
+
+class DeviceTimingTest(unittest.TestCase):
+    def test_cpu_timing_is_resolved_right_away(self):
+        assert isinstance(timing_backend_for("cpu"), HostTimingBackend)
+        timer = DeviceTimer()
+        task = {"task_id": "t1"}
+        mark = timer.start("cpu")
+        sleep(0.01)
+        timer.stop(task, mark)
+        assert task[DEVICE_TIMING]["device"] == "cpu"
+        assert task[DEVICE_TIMING]["duration"] >= 0.01
+        timer.resolve([task])  # Nothing pending.
+
+    def test_async_timing_is_resolved_on_publish(self):
+        timer = DeviceTimer()
+        backend = timer._backends["fake:0"] = FakeAsyncBackend()
+        task = {"task_id": "t2"}
+        timer.stop(task, timer.start("fake:0"))
+        assert DEVICE_TIMING not in task and not backend.waited
+
+        timer.resolve([{"task_id": "other"}, task])
+        assert task[DEVICE_TIMING] == {"device": "fake:0", "duration": 0.5} and backend.waited
+        assert not timer._pending
+
+    def test_pending_timings_are_bounded(self):
+        timer = DeviceTimer(max_pending=3, max_flushes=2)
+        timer._backends["fake:0"] = FakeAsyncBackend()
+        for i in range(5):
+            timer.stop({"task_id": f"t{i}"}, timer.start("fake:0"))
+        assert list(timer._pending) == ["t2", "t3", "t4"] and timer.dropped == 2
+
+        # Tasks that are never published, e.g., written to the shared memory ring, expire.
+        timer.resolve([])
+        timer.stop({"task_id": "t5"}, timer.start("fake:0"))
+        timer.resolve([])
+        task = {"task_id": "t5"}
+        timer.resolve([task])  # The third flush since t2-t4 were stopped.
+        assert DEVICE_TIMING in task and not timer._pending and timer.dropped == 5
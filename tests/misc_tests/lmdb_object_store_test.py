@@ -0,0 +1,39 @@
+import pickle
+import unittest
+from uuid import uuid4
+
+from flowcept.commons.daos.docdb_dao.lmdb_dao import LMDBDAO
+
+
+class LMDBObjectStoreTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.dao = LMDBDAO()
+        cls.dao._object_inline_max_bytes = 16
+        cls.dao._object_chunk_size = 10
+
+    def test_inline_and_chunked_objects(self):
+        wf_id, task_id = str(uuid4()), str(uuid4())
+        small = self.dao.save_or_update_object(b"small", None, task_id, wf_id, "blob", {"a": 1}, False, False)
+        large_data = bytes(range(95))
+        large = self.dao.save_or_update_object(large_data, None, None, wf_id, "blob", None, False, False)
+
+        docs = {doc["object_id"]: doc for doc in self.dao.object_query({"workflow_id": wf_id})}
+        assert set(docs) == {small, large}
+        assert docs[small]["data"] == b"small" and docs[small]["custom_metadata"] == {"a": 1}
+        assert "data" not in docs[large] and docs[large]["data_size"] == 95
+        assert len(list(self.dao.iter_file_chunks(docs[large]["file_id"]))) == 10
+        assert self.dao.get_file_data(docs[large]["file_id"]) == large_data
+        by_task = self.dao.query(collection="objects", filter={"task_id": task_id})
+        assert [doc["object_id"] for doc in by_task] == [small]
+
+    def test_update_replaces_data_and_indexes(self):
+        object_id, old_wf_id, new_wf_id = str(uuid4()), str(uuid4()), str(uuid4())
+        self.dao.save_or_update_object(bytes(50), object_id, None, old_wf_id, None, None, False, False)
+        old_file_id = self.dao.object_query({"object_id": object_id})[0]["file_id"]
+        self.dao.save_or_update_object({"x": 1}, object_id, None, new_wf_id, None, None, True, True)
+
+        assert self.dao.object_query({"workflow_id": old_wf_id}) == []
+        assert self.dao.get_file_data(old_file_id) is None
+        doc = self.dao.object_query({"workflow_id": new_wf_id})[0]
+        assert doc["pickle"] and pickle.loads(doc["data"]) == {"x": 1}
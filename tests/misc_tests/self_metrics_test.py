@@ -0,0 +1,66 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from flowcept.commons.self_metrics import Histogram, MetricsExporter, MetricsRegistry
+
+
+class TestSelfMetrics(unittest.TestCase):
+    def test_histogram_percentiles(self):
+        hist = Histogram("latency")
+        values = [random.randint(1, 5_000_000) for _ in range(10_000)]
+        for v in values:
+            hist.record_value(v)
+        summary = hist.snapshot(reset=True)
+        values.sort()
+        assert summary["count"] == len(values)
+        assert summary["sum"] == sum(values)
+        assert summary["min"] == values[0] and summary["max"] == values[-1]
+        for field, p in Histogram.PERCENTILES.items():
+            exact = values[max(1, round(len(values) * p / 100)) - 1]
+            assert abs(summary[field] - exact) <= exact / 128 + 1, (field, summary[field], exact)
+        assert hist.snapshot()["count"] == 0
+
+        hist.record(0.0025)
+        assert hist.snapshot()["p50"] == 2500
+
+    def test_registry_snapshot(self):
+        registry = MetricsRegistry()
+        registry.counter("published").inc(3)
+        registry.counter("published").inc()
+        registry.counter("never_incremented")
+        registry.gauge("depth").set(7)
+        registry.histogram("rtt").record(0.001)
+        snapshot = registry.snapshot()
+        assert snapshot["counters"] == {"published": 4}
+        assert snapshot["gauges"] == {"depth": 7}
+        assert snapshot["histograms"]["rtt"]["count"] == 1
+        # Histograms cover the interval since the previous snapshot; counters are cumulative.
+        snapshot = registry.snapshot()
+        assert snapshot["counters"] == {"published": 4}
+        assert snapshot["histograms"] == {}
+
+    def test_exporter(self):
+        registry = MetricsRegistry()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            exporter = MetricsExporter(registry, interval=60, file_path=os.path.join(tmp_dir, "metrics_{pid}.jsonl"))
+            first, second = [], []
+            exporter.add_publisher(first.append)
+            exporter.add_publisher(second.append)
+            registry.histogram("rtt").record(0.001)
+            exporter.export()
+            assert len(first) == 1 and not second
+            assert first[0]["type"] == "flowcept_metrics"
+            assert first[0]["histograms"]["rtt"]["count"] == 1
+
+            exporter.remove_publisher(first.append)
+            assert exporter._thread is not None
+            exporter.remove_publisher(second.append)  # The last one gets a final export.
+            assert exporter._thread is None
+            assert len(second) == 1
+
+            with open(os.path.join(tmp_dir, f"metrics_{os.getpid()}.jsonl")) as f:
+                lines = [json.loads(line) for line in f]
+            assert [m["metrics_id"] for m in lines] == [first[0]["metrics_id"], second[0]["metrics_id"]]
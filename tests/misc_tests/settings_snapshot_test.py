@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flowcept import configs
+from flowcept.commons.settings_snapshot import (
+    SNAPSHOT_ENV_VAR,
+    SNAPSHOT_TARGETS,
+    freeze_settings,
+    load_settings_snapshot,
+    release_settings_snapshots,
+)
+
+_CHILD_CODE = (
+    "import json; from flowcept import configs; "
+    "print(json.dumps([configs.settings, configs.SETTINGS_PATH]))"
+)
+
+
+class TestSettingsSnapshot(unittest.TestCase):
+    def tearDown(self):
+        release_settings_snapshots()
+        os.environ.pop(SNAPSHOT_ENV_VAR, None)
+
+    def test_targets(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for target in SNAPSHOT_TARGETS:
+                ref = freeze_settings(target, path=os.path.join(tmp_dir, "settings.msgpack"), export=False)
+                assert ref.startswith(target if target != "env" else "b64")
+                settings, settings_path = load_settings_snapshot(ref)
+                assert settings == configs.settings
+                assert settings_path == configs.SETTINGS_PATH
+        with self.assertRaises(ValueError):
+            freeze_settings("file")
+        with self.assertRaises(ValueError):
+            load_settings_snapshot("http://nope")
+
+    def test_child_loads_snapshot_without_the_settings_file(self):
+        frozen = dict(configs.settings, extra_metadata={"frozen": True})
+        with patch.object(configs, "settings", frozen), patch.object(configs, "SETTINGS_PATH", "/frozen.yaml"):
+            freeze_settings("shm")
+        env = dict(os.environ, FLOWCEPT_SETTINGS_CACHE="false")
+        out = subprocess.run([sys.executable, "-c", _CHILD_CODE], env=env, capture_output=True, text=True, check=True)
+        settings, settings_path = json.loads(out.stdout.strip().splitlines()[-1])
+        assert settings["extra_metadata"]["frozen"]
+        assert settings_path == "/frozen.yaml"
+        # The block outlives the child: it is released by its creator only.
+        assert load_settings_snapshot(os.environ[SNAPSHOT_ENV_VAR])[0] == frozen
+
+    def test_settings_cache_is_opt_in_and_keeps_int_keys(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, patch.dict(os.environ, {"HOME": tmp_dir}):
+            settings_path = os.path.join(tmp_dir, "settings.yaml")
+            with open(settings_path, "w") as f:
+                f.write("ranks:\n  0: head\n  1: worker\n")
+            cache_dir = os.path.join(tmp_dir, ".flowcept", "cache")
+            with patch.dict(os.environ, {"FLOWCEPT_SETTINGS_CACHE": ""}):
+                configs._load_settings(settings_path)
+            assert not os.path.exists(cache_dir)
+            with patch.dict(os.environ, {"FLOWCEPT_SETTINGS_CACHE": "true"}):
+                parsed = configs._load_settings(settings_path)
+                assert len(os.listdir(cache_dir)) == 1
+                assert configs._load_settings(settings_path) == parsed == {"ranks": {0: "head", 1: "worker"}}
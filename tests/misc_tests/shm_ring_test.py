@@ -0,0 +1,98 @@
+import os
+import unittest
+
+from flowcept.commons.shm_ring import SharedMemoryRing
+from flowcept.flowceptor.adapters.shm_sidecar import ShmSidecarPublisher
+
+
+class _ListInterceptor:
+    """Minimal stand-in for the parent interceptor: it only collects what it receives."""
+
+    def __init__(self):
+        self.buffer = []
+        self._shm_sidecar = None
+        self._is_shm_child = False
+
+    def intercept(self, msg):
+        self.buffer.append(msg)
+
+    def intercept_many(self, msgs):
+        self.buffer.extend(msgs)
+
+    def set_buffer(self, buffer):
+        self.intercept = buffer.append
+        self.intercept_many = buffer.extend
+
+
+class TestSharedMemoryRing(unittest.TestCase):
+    def test_wraparound_and_full_ring(self):
+        ring = SharedMemoryRing(64)
+        try:
+            for n in range(20):
+                records = [bytes([n, i]) * (i + 1) for i in range(3)]
+                for r in records:
+                    assert ring.write(r)
+                assert ring.read_all() == records
+            assert ring.write(b"x" * 40)
+            assert not ring.write(b"y" * 40)
+            assert not ring.write(b"z" * 100)
+            ring.record_drop()
+            assert ring.dropped == 1
+            assert ring.read_all() == [b"x" * 40]
+            assert ring.read_all() == []
+        finally:
+            ring.unlink()
+
+    @unittest.skipIf(not hasattr(os, "fork"), "Fork is not available")
+    def test_sidecar_drains_forked_children(self):
+        interceptor = _ListInterceptor()
+        sidecar = ShmSidecarPublisher(interceptor, ring_size_mb=1, drain_interval=0.01).start()
+        pids = []
+        for child in range(4):
+            pid = os.fork()
+            if pid == 0:
+                for i in range(500):
+                    interceptor.intercept({"child": child, "i": i})
+                interceptor.intercept_many([{"child": child, "i": i} for i in range(500, 600)])
+                os._exit(0)
+            pids.append(pid)
+        for pid in pids:
+            os.waitpid(pid, 0)
+        interceptor.intercept({"child": "parent", "i": 0})
+        sidecar.stop()
+
+        received = [(m["child"], m["i"]) for m in interceptor.buffer if m["child"] != "parent"]
+        assert sorted(received) == sorted((c, i) for c in range(4) for i in range(600))
+        for c in range(4):
+            per_child = [i for child, i in received if child == c]
+            assert per_child == list(range(600))
+        assert interceptor.buffer.count({"child": "parent", "i": 0}) == 1
+
+    @unittest.skipIf(not hasattr(os, "fork"), "Fork is not available")
+    def test_sidecar_stops_when_a_killed_child_holds_the_lock(self):
+        import signal
+        from time import time
+
+        interceptor = _ListInterceptor()
+        sidecar = ShmSidecarPublisher(interceptor, ring_size_mb=1, drain_interval=0.01, lock_timeout=0.1).start()
+        pid = os.fork()
+        if pid == 0:
+            sidecar._ring._lock.acquire()
+            os.kill(os.getpid(), signal.SIGKILL)
+        os.waitpid(pid, 0)
+        t0 = time()
+        sidecar.stop()
+        assert time() - t0 < 5
+
+    def test_read_times_out_while_the_lock_is_held(self):
+        ring = SharedMemoryRing(64)
+        try:
+            assert ring.write(b"x")
+            ring._lock.acquire()
+            with self.assertRaises(TimeoutError):
+                ring.read_all(timeout=0.01)
+            assert not ring.record_drop(timeout=0.01)
+            ring._lock.release()
+            assert ring.read_all(timeout=0.01) == [b"x"]
+        finally:
+            ring.unlink()
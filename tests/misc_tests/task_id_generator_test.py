@@ -0,0 +1,61 @@
+import os
+import unittest
+import uuid
+from time import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flowcept.commons.task_id_generator import (
+    new_counter_task_id,
+    new_uuid7_task_id,
+    task_id_from_bytes,
+    task_id_to_bytes,
+)
+
+
+class TestTaskIdGenerator(unittest.TestCase):
+    def test_uuid7_ids_are_unique_and_sorted(self):
+        ids = [new_uuid7_task_id() for _ in range(10_000)]
+        assert len(set(ids)) == len(ids)
+        assert ids == sorted(ids)
+        parsed = uuid.UUID(ids[0])
+        assert parsed.version == 7
+        assert parsed.variant == uuid.RFC_4122
+
+    def test_ids_are_unique_across_threads(self):
+        def gen(_):
+            return [new_uuid7_task_id() for _ in range(2_000)] + [new_counter_task_id() for _ in range(2_000)]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            ids = [i for batch in executor.map(gen, range(8)) for i in batch]
+        assert len(set(ids)) == len(ids)
+
+    def test_binary_roundtrip(self):
+        uuid7_ids = [new_uuid7_task_id() for _ in range(100)]
+        counter_ids = [new_counter_task_id() for _ in range(100)]
+        for task_id in uuid7_ids + counter_ids:
+            assert task_id_from_bytes(task_id_to_bytes(task_id)) == task_id
+        assert len(task_id_to_bytes(uuid7_ids[0])) == 16
+        assert len(task_id_to_bytes(counter_ids[0])) == 20
+        assert [task_id_to_bytes(i) for i in counter_ids] == sorted(task_id_to_bytes(i) for i in counter_ids)
+        assert counter_ids == sorted(counter_ids)
+        with self.assertRaises(ValueError):
+            task_id_to_bytes("1700000000.123")
+
+    def test_counter_ids_start_with_the_process_start_time(self):
+        prefix, seq = new_counter_task_id().split("-")
+        assert len(prefix) == 28 and len(seq) == 12
+        assert 0 <= time() * 1000 - int(prefix[:12], 16) < 24 * 3600 * 1000
+
+    @unittest.skipIf(not hasattr(os, "fork"), "Fork is not available")
+    def test_forked_child_does_not_reuse_ids(self):
+        read_fd, write_fd = os.pipe()
+        parent_id = new_counter_task_id()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            os.write(write_fd, new_counter_task_id().encode())
+            os._exit(0)
+        os.close(write_fd)
+        child_id = os.read(read_fd, 64).decode()
+        os.waitpid(pid, 0)
+        assert parent_id.split("-")[0] != child_id.split("-")[0]
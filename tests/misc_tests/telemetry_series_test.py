@@ -0,0 +1,81 @@
+import json
+import pathlib
+import unittest
+
+from flowcept.commons.query_utils import calculate_telemetry_diff_for_docs
+from flowcept.commons.telemetry_series import (
+    TelemetrySeriesEncoder,
+    decode_block,
+    fill_schema,
+    telemetry_diffs,
+)
+
+SAMPLE_DATA = pathlib.Path(__file__).parent.parent / "api" / "sample_data_with_telemetry_and_rai.json"
+
+
+def _assert_close(test, expected, actual):
+    if isinstance(expected, dict):
+        test.assertEqual(expected.keys(), actual.keys())
+        for k in expected:
+            _assert_close(test, expected[k], actual[k])
+    elif isinstance(expected, list):
+        test.assertEqual(len(expected), len(actual))
+        for e, a in zip(expected, actual):
+            _assert_close(test, e, a)
+    elif isinstance(expected, float):
+        test.assertAlmostEqual(expected, actual, delta=1e-6 * max(1.0, abs(expected)))
+    else:
+        test.assertEqual(expected, actual)
+
+
+class TestTelemetrySeries(unittest.TestCase):
+    def setUp(self):
+        with open(SAMPLE_DATA) as f:
+            docs = json.load(f)
+        self.docs = [d for d in docs if "telemetry_at_start" in d and "telemetry_at_end" in d]
+
+    def _encode(self, block_size):
+        encoder = TelemetrySeriesEncoder("series", block_size)
+        blocks, ref_docs = [], []
+        for i, doc in enumerate(self.docs):
+            blocks.extend(encoder.add(2 * i, doc["started_at"], doc["telemetry_at_start"]))
+            blocks.extend(encoder.add(2 * i + 1, doc["ended_at"], doc["telemetry_at_end"]))
+            ref_doc = dict(doc)
+            ref_doc["telemetry_at_start"] = {"series_id": "series", "sample_index": 2 * i}
+            ref_doc["telemetry_at_end"] = {"series_id": "series", "sample_index": 2 * i + 1}
+            ref_docs.append(ref_doc)
+        blocks.append(encoder.flush())
+        return [b for b in blocks if b is not None], ref_docs
+
+    def test_roundtrip(self):
+        blocks, _ = self._encode(block_size=64)
+        assert len(blocks) == 1
+        values = decode_block(blocks[0])
+        assert values.shape[0] == 2 * len(self.docs)
+        for i, doc in enumerate(self.docs):
+            row = values[2 * i + 1].tolist()
+            rebuilt = fill_schema(blocks[0]["schema"], row, set(blocks[0]["int_columns"]))
+            _assert_close(self, doc["telemetry_at_end"], rebuilt)
+
+    def test_diffs_match_full_telemetry(self):
+        expected = calculate_telemetry_diff_for_docs(self.docs)
+        for block_size in (64, 3):
+            blocks, ref_docs = self._encode(block_size)
+            actual = calculate_telemetry_diff_for_docs(ref_docs, blocks)
+            for e, a in zip(expected, actual):
+                _assert_close(self, e["telemetry_diff"], a["telemetry_diff"])
+
+    def test_layout_change_starts_new_block(self):
+        encoder = TelemetrySeriesEncoder("s", 10)
+        assert encoder.add(0, 0.0, {"cpu": {"user": 1.0}, "cmd": "a"}) == []
+        assert encoder.add(1, 1.0, {"cpu": {"user": 1.5}, "cmd": "a"}) == []
+        blocks = encoder.add(2, 2.0, {"cpu": {"user": 2.0, "system": 1}, "cmd": "a"})
+        assert len(blocks) == 1 and blocks[0]["deltas"] == [{"c": [0], "d": [0.5]}]
+        blocks.append(encoder.flush())
+        assert blocks[1]["first_index"] == 2
+
+        refs = [{"series_id": "s", "sample_index": i} for i in range(3)]
+        diffs = telemetry_diffs(
+            [refs[0], refs[1], refs[0]], [refs[1], refs[2], {"series_id": "x", "sample_index": 0}], blocks
+        )
+        assert diffs == [{"cpu": {"user": 0.5}, "cmd": "a"}, None, None]
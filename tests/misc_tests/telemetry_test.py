@@ -1,6 +1,46 @@
+import os
+import sys
+import types
 import unittest
+from collections import Counter
+from time import sleep
+from unittest.mock import patch
 
-from flowcept.flowceptor.telemetry_capture import TelemetryCapture
+from flowcept.commons.flowcept_dataclasses.workflow_object import WorkflowObject
+from flowcept.flowceptor.adapters.base_interceptor import BaseInterceptor
+from flowcept.commons.flowcept_dataclasses.telemetry import Telemetry, TelemetrySnapshotRef
+from flowcept.flowceptor.telemetry_capture import GPUCapture, TelemetryCapture
+
+
+def _fake_pynvml(calls: Counter):
+    """Build a fake pynvml module with two GPUs that counts the calls to each function."""
+
+    def counted(name, result):
+        def func(*args):
+            calls[name] += 1
+            return result(*args) if callable(result) else result
+
+        return func
+
+    return types.SimpleNamespace(
+        NVML_TEMPERATURE_GPU=0,
+        nvmlInit=counted("nvmlInit", None),
+        nvmlShutdown=counted("nvmlShutdown", None),
+        nvmlDeviceGetCount=counted("nvmlDeviceGetCount", 2),
+        nvmlDeviceGetHandleByIndex=counted("nvmlDeviceGetHandleByIndex", lambda ix: f"handle_{ix}"),
+        nvmlDeviceGetMemoryInfo=counted("nvmlDeviceGetMemoryInfo", types.SimpleNamespace(used=42)),
+        nvmlDeviceGetTemperature=counted("nvmlDeviceGetTemperature", 60),
+        nvmlDeviceGetPowerUsage=counted("nvmlDeviceGetPowerUsage", 100),
+        nvmlDeviceGetName=counted("nvmlDeviceGetName", lambda device: f"fake {device}"),
+    )
+
+
+def _key_tree(value):
+    if isinstance(value, dict):
+        return {k: _key_tree(v) for k, v in value.items()}
+    elif isinstance(value, list) and value:
+        return [_key_tree(value[0])]
+    return None
 
 
 class TestTelemetry(unittest.TestCase):
@@ -9,3 +49,205 @@ class TestTelemetry(unittest.TestCase):
         telemetry = tele_capture.capture()
         assert telemetry.to_dict()
         tele_capture.shutdown_gpu_telemetry()
+
+    def test_sampler(self):
+        conf = {"mem": True, "cpu": True, "sampler": {"enabled": True, "interval_secs": 0.01, "ring_size": 4}}
+        tele_capture = TelemetryCapture(conf)
+        tele_capture.start_sampler()
+        try:
+            first = tele_capture.capture()
+            assert isinstance(first, Telemetry)
+            assert first.to_dict()["memory"]
+            sleep(0.1)
+            assert tele_capture.capture() is not first
+            assert tele_capture._sampler.get(0) is None  # Overwritten in the ring
+        finally:
+            tele_capture.stop_sampler()
+        assert isinstance(tele_capture.capture(), Telemetry)
+
+    def test_sampler_by_reference(self):
+        published = []
+        conf = {
+            "mem": True,
+            "sampler": {"enabled": True, "interval_secs": 60, "ring_size": 4, "by_reference": True},
+        }
+        tele_capture = TelemetryCapture(conf)
+        tele_capture.start_sampler(published.append)
+        try:
+            refs = [tele_capture.capture().to_dict() for _ in range(3)]
+            assert all(TelemetrySnapshotRef.is_ref(r) for r in refs)
+            assert refs[0] == refs[1] == refs[2]
+            assert len(published) == 1
+            snapshot = published[0]
+            assert snapshot["type"] == "telemetry_snapshot"
+            assert (snapshot["series_id"], snapshot["sample_index"]) == (refs[0]["series_id"], 0)
+            assert snapshot["telemetry"]["memory"]
+
+            tele_capture._sampler._sample()
+            assert tele_capture.capture().to_dict()["sample_index"] == 1
+            assert len(published) == 2
+        finally:
+            tele_capture.stop_sampler()
+
+    def test_sampler_disabled_by_default(self):
+        tele_capture = TelemetryCapture({"mem": True})
+        tele_capture.start_sampler()
+        assert tele_capture._sampler is None
+
+    def test_sampler_delta_encoding(self):
+        published = []
+        conf = {
+            "mem": True,
+            "process_info": True,
+            "sampler": {
+                "enabled": True,
+                "interval_secs": 60,
+                "ring_size": 4,
+                "by_reference": True,
+                "delta_encoding": True,
+                "delta_block_size": 2,
+            },
+        }
+        tele_capture = TelemetryCapture(conf)
+        tele_capture.start_sampler(published.append)
+        try:
+            start = tele_capture.capture().to_dict()
+            for _ in range(2):
+                tele_capture._sampler._sample()
+            end = tele_capture.capture().to_dict()
+        finally:
+            tele_capture.stop_sampler()
+        assert (start["sample_index"], end["sample_index"]) == (0, 2)
+        assert [m["type"] for m in published] == ["telemetry_block", "telemetry_block"]
+        assert [len(m["sampled_at"]) for m in published] == [2, 1]
+        assert published[1]["block_id"] == f"{start['series_id']}_2"
+
+    def test_profiles(self):
+        tele_capture = TelemetryCapture({"profile": "minimal", "mem": False, "gpu": None})
+        assert [name for name, _, _ in tele_capture._collectors] == ["cpu"]
+        tele_capture = TelemetryCapture({"profile": "full", "gpu": None})
+        assert set(tele_capture.capture().to_dict()) == {"cpu", "process", "memory", "disk", "network"}
+        with self.assertRaises(Exception):
+            TelemetryCapture({"profile": "everything"})
+
+    def test_cost_accounting(self):
+        conf = {"mem": True, "cpu": True, "cost_accounting": {"enabled": True}}
+        tele_capture = TelemetryCapture(conf)
+        for _ in range(3):
+            tele_capture.capture()
+        costs = tele_capture.get_collector_costs()
+        assert set(costs) == {"cpu", "mem"}
+        assert costs["mem"]["calls"] == 3 and costs["mem"]["mean_ms"] > 0
+        assert TelemetryCapture({"mem": True}).get_collector_costs() is None
+
+    def test_cost_budget_disables_collectors(self):
+        conf = {"mem": True, "cost_accounting": {"enabled": True, "budget_ms": 0, "warmup_captures": 2}}
+        tele_capture = TelemetryCapture(conf)
+        assert tele_capture.capture().to_dict()["memory"]
+        assert tele_capture.capture().to_dict()["memory"]
+        assert tele_capture.get_collector_costs()["mem"]["disabled"]
+        assert tele_capture.capture().to_dict() == {}
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "The procfs backend only works on Linux.")
+    def test_procfs_backend_schema(self):
+        conf = {"cpu": True, "per_cpu": True, "mem": True, "network": True, "process_info": True, "gpu": None}
+        expected = TelemetryCapture(conf).capture().to_dict()
+        actual = TelemetryCapture(dict(conf, backend="procfs")).capture().to_dict()
+        actual["process"].pop("cgroup", None)
+        assert _key_tree(actual) == _key_tree(expected)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "The procfs backend only works on Linux.")
+    def test_procfs_file_grows_buffer(self):
+        from flowcept.flowceptor.telemetry_procfs import ProcFile
+
+        f = ProcFile("/proc/self/cmdline", size=2)
+        try:
+            with open("/proc/self/cmdline", "rb") as expected:
+                assert f.read() == expected.read()
+            assert f.read() == f.read()
+        finally:
+            f.close()
+
+    def test_machine_info_cached_with_id(self):
+        conf = {"machine_info": True, "gpu": None}
+        machine_id, info = TelemetryCapture(conf).get_machine_id_and_info()
+        assert len(machine_id) == 64 and info["hostname"]
+        assert TelemetryCapture(conf).get_machine_id_and_info() == (machine_id, info)
+        assert TelemetryCapture(conf).capture_machine_info() is info
+        assert TelemetryCapture({"mem": True}).get_machine_id_and_info() is None
+
+    def test_machine_id_does_not_depend_on_the_process(self):
+        conf = {"machine_info": True, "gpu": None}
+        machine_id, _ = TelemetryCapture(conf).get_machine_id_and_info()
+        cache = dict(TelemetryCapture._MACHINE_INFO_CACHE)
+        try:
+            TelemetryCapture._MACHINE_INFO_CACHE.clear()  # As in another rank on the same host.
+            with patch.dict("os.environ", {"RANK": "3", "LOCAL_RANK": "3"}):
+                other_id, other_info = TelemetryCapture(conf).get_machine_id_and_info()
+        finally:
+            TelemetryCapture._MACHINE_INFO_CACHE.clear()
+            TelemetryCapture._MACHINE_INFO_CACHE.update(cache)
+        assert other_id == machine_id
+        assert other_info["environment"]["RANK"] == "3"
+
+    def test_workflow_only_keeps_the_machine_id(self):
+        interceptor = BaseInterceptor()
+        interceptor.telemetry_capture = TelemetryCapture({"machine_info": True, "gpu": None})
+        interceptor._mq_dao.buffer = []
+        captured = []
+        with (
+            patch.object(BaseInterceptor, "intercept", lambda _, msg: captured.append(msg)),
+            patch.object(BaseInterceptor, "_sent_machine_ids", set()),
+            patch.object(BaseInterceptor, "_sent_process_keys", set()),
+            patch.dict(TelemetryCapture._MACHINE_INFO_CACHE, clear=True),
+            patch.dict("os.environ", {"RANK": "3"}),
+        ):
+            for _ in range(2):
+                interceptor.send_workflow_message(WorkflowObject())
+            machine_id = interceptor.telemetry_capture.get_machine_id_and_info()[0]
+        workflows = [m for m in captured if m.get("type") == "workflow"]
+        assert len(workflows) == 2
+        for workflow in workflows:
+            assert list(workflow["machine_info"].values()) == [{"machine_id": machine_id, "rank_env": {"RANK": "3"}}]
+        # The machine and process info are only sent once, and the environment only with the process info.
+        [machine] = [m for m in captured if m.get("type") == "machine_info"]
+        [process] = [m for m in captured if m.get("type") == "process_info"]
+        assert "environment" not in machine and "process" not in machine
+        assert process["process_key"] == f"{machine_id}_{os.getpid()}" and process["environment"]["RANK"] == "3"
+
+    def test_gpu_lazy_init_with_fake_nvml(self):
+        GPUCapture._initialized = False  # Other tests may have tried to initialize the real libraries.
+        calls = Counter()
+        fake_modules = {"amdsmi": None, "pynvml": _fake_pynvml(calls)}
+        with patch.dict(sys.modules, fake_modules), patch.dict("os.environ", {"CUDA_VISIBLE_DEVICES": ""}):
+            tele_capture = TelemetryCapture({"gpu": ["used", "temperature", "power", "name", "ix"]})
+            assert calls["nvmlInit"] == 0
+            try:
+                for _ in range(3):
+                    gpu = tele_capture.capture().to_dict()["gpu"]
+                expected = {"used": 42, "temperature": 60, "power": 100, "name": "fake handle_1", "gpu_ix": 1}
+                assert gpu["gpu_1"] == expected
+                assert calls["nvmlInit"] == 1
+                assert calls["nvmlDeviceGetHandleByIndex"] == 2
+                assert calls["nvmlDeviceGetName"] == 2
+                assert calls["nvmlDeviceGetMemoryInfo"] == 6
+            finally:
+                tele_capture.shutdown_gpu_telemetry()
+            assert calls["nvmlShutdown"] == 1 and GPUCapture.GPU_VENDOR is None
+
+    def test_gpu_poller_with_fake_nvml(self):
+        GPUCapture._initialized = False  # Other tests may have tried to initialize the real libraries.
+        calls = Counter()
+        fake_modules = {"amdsmi": None, "pynvml": _fake_pynvml(calls)}
+        conf = {"gpu": ["used"], "gpu_poller": {"enabled": True, "interval_secs": 60}}
+        with patch.dict(sys.modules, fake_modules), patch.dict("os.environ", {"CUDA_VISIBLE_DEVICES": ""}):
+            tele_capture = TelemetryCapture(conf)
+            try:
+                first = tele_capture.capture().to_dict()["gpu"]
+                assert first == {"gpu_0": {"used": 42}, "gpu_1": {"used": 42}}
+                assert tele_capture.capture().to_dict()["gpu"] is first
+                assert calls["nvmlDeviceGetMemoryInfo"] == 2  # Only the poller's first sample
+            finally:
+                tele_capture.stop_sampler()
+                tele_capture.shutdown_gpu_telemetry()
+            assert tele_capture._gpu_poller is None